@@ -0,0 +1,77 @@
+import pygame
+
+
+SNAP_MS = 80            # Расхождение, при котором часы прыгают к позиции музыки сразу
+SMOOTHING = 0.1         # Доля расхождения, убираемая за одно новое показание get_pos()
+START_HOLD_MS = 1000    # Сколько ждать, пока музыка начнёт играть (буфер грузится)
+CALIBRATION_HITS = 20   # По стольким попаданиям подстраивается оффсет карты
+
+
+class AudioClock:
+    """Игровое время по позиции музыки.
+
+    mixer.music.get_pos() обновляется рывками (по буферам звука), поэтому
+    между показаниями время продолжается по системному таймеру, а
+    расхождение убирается плавно. Пока музыка не начала играть, время стоит.
+    Время не идёт назад. Итоговое время = позиция музыки + global_offset + map_offset.
+
+    tick() вызывается раз в кадр, остальные читают clock.time.
+    """
+
+    def __init__(self, global_offset=0, map_offset=0, calibrate=False,
+                 get_audio_pos=None, get_ticks=None):
+        self.global_offset = global_offset
+        self.map_offset = map_offset
+        self.calibrate = calibrate  # Подстраивать map_offset по ошибкам попаданий
+        self.get_audio_pos = get_audio_pos or pygame.mixer.music.get_pos
+        self.get_ticks = get_ticks or pygame.time.get_ticks
+        self.hit_errors = []
+        self.start()
+
+    @property
+    def offset(self):
+        return self.global_offset + self.map_offset
+
+    def start(self):
+        """Вызывается сразу после mixer.music.play()"""
+        self.wall_start = self.get_ticks()
+        self.drift = 0.0        # Поправка системного таймера к позиции музыки
+        self.last_pos = None
+        self.started = False
+        self.audio_time = 0.0
+        self.time = self.offset
+
+    def tick(self):
+        wall = self.get_ticks() - self.wall_start
+        pos = self.get_audio_pos()
+
+        if pos < 0:
+            # Музыки нет (или закончилась) - идём по системному таймеру
+            self.started = True
+        elif not self.started:
+            if pos > 0 or wall > START_HOLD_MS:
+                self.started = True
+                self.drift = pos - wall
+            else:
+                # Буфер ещё грузится - время стоит
+                self.drift = -wall
+        elif pos != self.last_pos:
+            # Новое показание: прыгаем при большом расхождении, иначе подтягиваемся
+            error = pos - (wall + self.drift)
+            self.drift += error if abs(error) > SNAP_MS else error * SMOOTHING
+        self.last_pos = pos
+
+        self.audio_time = max(self.audio_time, wall + self.drift)
+        self.time = self.audio_time + self.offset
+        return self.time
+
+    def record_hit_error(self, error):
+        """Ошибка попадания (время нажатия - время ноты) для автокалибровки"""
+        if not self.calibrate:
+            return
+        self.hit_errors.append(error)
+        if len(self.hit_errors) >= CALIBRATION_HITS:
+            # Стабильно поздние нажатия - игровое время опережает звук
+            errors = sorted(self.hit_errors)
+            self.map_offset -= errors[len(errors) // 2]
+            self.hit_errors = []
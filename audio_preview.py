@@ -0,0 +1,133 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from env import MAPS_DIR
+from osu_parser import OsuParser
+
+
+PREFETCH_RADIUS = 2                     # Сколько карт с каждой стороны от выбранной читаем заранее
+PREFETCH_WORKERS = 2
+PREFETCH_CACHE_BYTES = 96 * 1024 * 1024 # Сколько прочитанных треков держим в памяти
+
+
+def find_audio(map_folder, maps_dir=MAPS_DIR):
+    """Аудио мапсета по заголовкам его .osu (без разбора хит-объектов) или None"""
+    for beatmap in OsuParser.read_headers(os.path.join(maps_dir, map_folder)):
+        path = beatmap.audio_path
+        if path:
+            return path
+    return None
+
+
+def neighbours(items, index, radius=PREFETCH_RADIUS):
+    """Соседи items[index] от ближних к дальним, в пределах списка"""
+    result = []
+    for distance in range(1, radius + 1):
+        for i in (index + distance, index - distance):
+            if 0 <= i < len(items):
+                result.append(items[i])
+    return result
+
+
+class PreviewPlayer:
+    """Музыка выбранной карты в меню.
+
+    Выбранная карта и её соседи читаются с диска в пуле потоков: путь к
+    аудио из заголовков .osu, затем весь файл в память. Готовые треки лежат
+    в LRU-кэше, ограниченном по байтам. update() в главном потоке отдаёт
+    байты mixer.music.load через BytesIO - диск при смене выбора не трогается.
+    Если выбор сменился раньше, чем очередь дошла до карты, она пропускается.
+    """
+
+    def __init__(self, maps_dir=MAPS_DIR, cache_bytes=PREFETCH_CACHE_BYTES, workers=PREFETCH_WORKERS):
+        self.maps_dir = maps_dir
+        self.cache_bytes = cache_bytes
+        self.workers = workers
+        self.requested = None   # Карта, которая должна играть
+        self.playing = None
+        self.wanted = set()     # Карты последнего запроса - остальные из очереди не читаем
+        self.tracks = OrderedDict()     # папка -> (путь, байты) от давно нужных к недавним
+        self.cached_bytes = 0
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.pool = None        # Потоки создаются при первом запросе
+
+    def request(self, map_folder, prefetch=()):
+        """Играть map_folder; prefetch - карты, которые скоро могут понадобиться"""
+        self.requested = map_folder
+        folders = [map_folder] + [folder for folder in prefetch if folder != map_folder]
+        self.wanted = set(folders)
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="audio-prefetch")
+        for folder in folders:
+            with self.lock:
+                if folder in self.tracks:
+                    self.tracks.move_to_end(folder)
+                    continue
+                if folder in self.pending:
+                    continue
+                self.pending.add(folder)
+            # Выбранная карта идёт в очередь первой
+            self.pool.submit(self._load, folder)
+
+    def _load(self, map_folder):
+        if map_folder not in self.wanted:
+            with self.lock:
+                self.pending.discard(map_folder)
+            return
+        path = data = None
+        try:
+            path = find_audio(map_folder, self.maps_dir)
+            if path:
+                with open(path, 'rb') as f:
+                    data = f.read()
+        except OSError as e:
+            print(f"Ошибка чтения карты {map_folder}: {str(e)}")
+        with self.lock:
+            self.pending.discard(map_folder)
+            self.tracks[map_folder] = (path, data)
+            self.cached_bytes += len(data or b'')
+            self._evict()
+
+    def _evict(self):
+        # Выбрасываем давно не нужные треки, пока не уложимся в лимит
+        for folder in list(self.tracks):
+            if self.cached_bytes <= self.cache_bytes:
+                break
+            if folder in self.wanted:
+                continue
+            _, data = self.tracks.pop(folder)
+            self.cached_bytes -= len(data or b'')
+
+    def cached(self, map_folder):
+        """(путь, байты) уже прочитанного трека или None"""
+        with self.lock:
+            return self.tracks.get(map_folder)
+
+    def stop(self):
+        """Превью больше не нужно (началась игра) - отложенные результаты игнорируем"""
+        self.requested = None
+        self.playing = None
+        self.wanted = set()
+
+    def update(self):
+        """Вызывается раз в кадр из главного потока"""
+        map_folder = self.requested
+        if map_folder is None or map_folder == self.playing or not pygame.mixer.get_init():
+            return
+        track = self.cached(map_folder)
+        if track is None:
+            return  # Ещё читается
+        self.playing = map_folder
+        path, data = track
+        if not data:
+            return
+        try:
+            # Тип по расширению: SDL_mixer не всегда угадывает его по содержимому
+            pygame.mixer.music.load(io.BytesIO(data), os.path.splitext(path)[1][1:])
+            pygame.mixer.music.play(-1)  # Зацикливаем воспроизведение
+        except pygame.error as e:
+            print(f"Ошибка загрузки аудио: {str(e)}")
@@ -0,0 +1,46 @@
+import pygame
+from env import BACKGROUND_DIM, BACKGROUND_BLUR
+from osu_parser import OsuParser
+
+
+def load_background(beatmap, size, storyboard=None, dim=BACKGROUND_DIM, blur=BACKGROUND_BLUR):
+    """Фон игры для экрана size: картинка карты, готовая к одному blit, или None.
+
+    Картинка декодируется, обрезается под экран (как cover), размывается,
+    затемняется и переводится в формат дисплея один раз при загрузке карты.
+    В игре её рисует DirtyRenderer вместо заливки чёрным - отдельного
+    прохода отрисовки у фона нет. Если сторибоард сам рисует эту картинку,
+    фон не нужен. Видео-фоны не поддерживаются.
+    """
+    name = beatmap.events.get('background')
+    if storyboard is not None and storyboard.uses_file(name):
+        return None
+    path = OsuParser.resolve_file(beatmap.folder, name)
+    if path is None or dim >= 1:
+        return None
+    try:
+        image = pygame.image.load(path)
+    except (pygame.error, OSError) as e:
+        print(f"Ошибка загрузки фона: {str(e)}")
+        return None
+    if image.get_bitsize() not in (24, 32):
+        image = image.convert(32, 0)  # smoothscale умеет только 24/32 бита
+
+    # Масштабируем только ту часть картинки, что попадёт на экран
+    width, height = size
+    scale = max(width / image.get_width(), height / image.get_height())
+    crop_w = min(image.get_width(), max(1, round(width / scale)))
+    crop_h = min(image.get_height(), max(1, round(height / scale)))
+    crop = image.subsurface(((image.get_width() - crop_w) // 2, (image.get_height() - crop_h) // 2,
+                             crop_w, crop_h))
+    if blur > 1:
+        # Размытие - уменьшение и растягивание обратно с билинейной фильтрацией
+        crop = pygame.transform.smoothscale(crop, (max(1, width // blur), max(1, height // blur)))
+    surface = pygame.transform.smoothscale(crop, size)
+
+    brightness = round(255 * (1 - dim))
+    if brightness < 255:
+        surface.fill((brightness, brightness, brightness), special_flags=pygame.BLEND_MULT)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    return surface
@@ -0,0 +1,359 @@
+"""Замеры горячих путей игры: парсер, симуляция, ввод, отрисовка, сторибоард.
+
+Запуск без окна и звука (SDL dummy):
+
+    python benchmark.py                       # все размеры карт
+    python benchmark.py --save base.json      # сохранить как базовую линию
+    python benchmark.py --compare base.json   # сравнить с базовой линией
+
+Карты генерируются синтетически, от 100 до 50000 объектов, сторибоард -
+тоже (крупный вращающийся фон, зум, мерцающее свечение, частицы, анимация). Запуск игры
+меряется в отдельных процессах: время до первого кадра меню. Все данные
+(кэш карт, база и папки игрока) - во временной папке, настоящие не трогаются.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import subprocess
+import tempfile
+import platform
+import pygame
+from env import BASE_DIR, BENCHMARK_BASELINE
+import osu_parser
+from osu_parser import OsuParser
+from game_state import GameState
+from input_handler import InputHandler
+from settings_menu import SettingsMenu
+from map_pull import MapPull
+from storyboard import Storyboard, parse_storyboard
+
+
+BENCHMARK_SIZES = (100, 1000, 10000, 50000)
+SAMPLES = 2000            # Вызовов на замер покадровых функций
+PARSE_REPEATS = 3
+REGRESSION_RATIO = 1.25   # Во сколько раз медленнее базовой линии - уже регрессия
+SCREEN_SIZE = (1920, 1080)
+STARTUP_REPEATS = 5
+STORYBOARD_MS = 10000     # Длина синтетического сторибоарда
+STARTUP_TARGET_MS = 500   # Цель: меню на экране не позже 0.5 с от начала импорта main
+
+# Выполняется в свежем интерпретаторе; времена в мс от начала импорта main
+STARTUP_SCRIPT = """
+import os, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+game = main.Game()
+created = time.perf_counter()
+game.frame()
+finished = time.perf_counter()
+print(json.dumps({
+    'startup_import': (imported - started) * 1000,
+    'startup_init': (created - imported) * 1000,
+    'startup_first_frame': (game.first_frame_time - started) * 1000,
+    'startup_background': (finished - game.first_frame_time) * 1000,
+}), flush=True)
+os._exit(0)  # Фоновые задачи не ждём
+"""
+
+
+def synthetic_osu(count, seed=0):
+    """Текст .osu с count объектами: круги, слайдеры и изредка спиннеры"""
+    rng = random.Random(seed)
+    lines = [
+        "osu file format v14", "",
+        "[General]", "AudioFilename: audio.mp3", "",
+        "[Metadata]", f"Title:Benchmark {count}", "Version:Synthetic", "",
+        "[Difficulty]", "HPDrainRate:5", "CircleSize:4", "OverallDifficulty:8",
+        "ApproachRate:9", "SliderMultiplier:1.4", "SliderTickRate:1", "",
+        "[TimingPoints]", "0,300,4,2,0,60,1,0", "",
+        "[HitObjects]",
+    ]
+    time_ms = 1000
+    for i in range(count):
+        x, y = rng.randrange(32, 480), rng.randrange(32, 352)
+        if i % 97 == 96:
+            lines.append(f"256,192,{time_ms},12,0,{time_ms + 1000},0:0:0:0:")
+            time_ms += 1200
+        elif i % 5 == 4:
+            end_x, end_y = rng.randrange(32, 480), rng.randrange(32, 352)
+            mid_x, mid_y = (x + end_x) // 2 + 30, (y + end_y) // 2 - 30
+            lines.append(f"{x},{y},{time_ms},2,0,B|{mid_x}:{mid_y}|{end_x}:{end_y},1,140")
+            time_ms += 300
+        else:
+            lines.append(f"{x},{y},{time_ms},1,0,0:0:0:0:")
+            time_ms += 150
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_storyboard(folder, particles=100):
+    """Строки сторибоарда на STORYBOARD_MS; картинки для него кладутся в folder"""
+    images = {'bg.png': ((1920, 1080), 0), 'zoom.png': ((1280, 720), 0),
+              'glow.png': ((800, 800), pygame.SRCALPHA), 'dot.png': ((32, 32), pygame.SRCALPHA)}
+    images.update({f'frame{i}.png': ((200, 200), pygame.SRCALPHA) for i in range(8)})
+    for name, (size, flags) in images.items():
+        image = pygame.Surface(size, flags, 32)
+        image.fill((90, 140, 200, 160))
+        pygame.image.save(image, os.path.join(folder, name))
+    end = STORYBOARD_MS
+    lines = [
+        # Фон во весь экран медленно вращается - крупный поворот
+        'Sprite,Background,Centre,"bg.png",320,240', f' S,0,0,{end},0.5', f' R,0,0,{end},0,0.5',
+        # Медленный зум - новый масштаб почти каждый кадр
+        'Sprite,Background,Centre,"zoom.png",320,240', f' S,0,0,{end},0.4,0.6', f' F,0,0,{end},0.6',
+        # Свечение мерцает - вшитая в копию прозрачность меняется каждый кадр
+        'Sprite,Foreground,Centre,"glow.png",320,240', ' P,0,0,,A', f' S,0,0,{end},0.5,0.8',
+        f' L,0,{end // 1000}', '  F,0,0,500,0.2,1', '  F,0,500,1000,1,0.2',
+        'Animation,Foreground,Centre,"frame.png",320,240,8,50,LoopForever', f' F,0,0,{end},1',
+    ]
+    rng = random.Random(0)
+    for _ in range(particles):
+        start = rng.randrange(0, end - 2000)
+        x, y = rng.randrange(0, 640), rng.randrange(0, 480)
+        lines += ['Sprite,Foreground,Centre,"dot.png",0,0',
+                  f' M,0,{start},{start + 2000},{x},{y},{rng.randrange(0, 640)},{rng.randrange(0, 480)}',
+                  f' F,0,{start},{start + 2000},1,0']
+    return lines
+
+
+def measure(func, args_list):
+    """Время каждого вызова func(*args) в микросекундах -> сводка"""
+    timings = []
+    clock = time.perf_counter_ns
+    for args in args_list:
+        started = clock()
+        func(*args)
+        timings.append((clock() - started) / 1000)
+    return summarize(timings)
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    count = len(timings)
+    return {
+        'calls': count,
+        'mean_us': sum(timings) / count,
+        'median_us': timings[count // 2],
+        'p95_us': timings[min(count - 1, int(count * 0.95))],
+        'max_us': timings[-1],
+    }
+
+
+def sample_times(beatmap, samples=SAMPLES):
+    """Равномерные моменты от начала до конца карты"""
+    objs = beatmap.hit_objects
+    first, last = int(objs.start_time[0]) - 1000, int(objs.end_time.max()) + 500
+    step = max(1, (last - first) // samples)
+    return list(range(first, last, step))[:samples]
+
+
+def new_game_state(beatmap, settings_menu):
+    beatmap.hit_objects.reset_flags()
+    game_state = GameState(None, settings_menu)
+    game_state.apply_difficulty(beatmap.difficulty)
+    game_state.set_hit_objects(beatmap.hit_objects, beatmap.sliders)
+    game_state.build_atlas()
+    return game_state
+
+
+def bench_parser(folder):
+    """parse_map без кэша (каждый раз с нуля) и с дисковым кэшем"""
+    cache = osu_parser.map_cache
+    old_dir = cache.cache_dir
+    cache.cache_dir = os.path.join(folder, 'cache')
+    try:
+        cold = []
+        for _ in range(PARSE_REPEATS):
+            shutil.rmtree(cache.cache_dir, ignore_errors=True)
+            started = time.perf_counter_ns()
+            OsuParser.parse_map(folder)
+            cold.append((time.perf_counter_ns() - started) / 1000)
+        cached = measure(OsuParser.parse_map, [(folder,)] * PARSE_REPEATS)
+    finally:
+        cache.cache_dir = old_dir
+    return {'parse_map': summarize(cold), 'parse_map_cached': cached}
+
+
+def bench_gameplay(beatmap, screen, settings_menu):
+    results = {}
+    times = sample_times(beatmap)
+
+    game_state = new_game_state(beatmap, settings_menu)
+    results['update'] = measure(game_state.update, [(t,) for t in times])
+
+    # Ввод: кадр без нажатия (как почти всегда) и само нажатие на каждой ноте
+    game_state = new_game_state(beatmap, settings_menu)
+    events = [pygame.event.Event(pygame.MOUSEMOTION, pos=(960, 540), rel=(0, 0), buttons=(0, 0, 0))]
+    results['handle_input'] = measure(
+        lambda t: (game_state.update(t), InputHandler.handle_input(events, game_state, t)),
+        [(t,) for t in times]
+    )
+    objs = beatmap.hit_objects
+    presses = [(int(objs.start_time[i]), int(objs.x[i]), int(objs.y[i]))
+               for i in range(0, len(objs), max(1, len(objs) // SAMPLES))]
+    game_state = new_game_state(beatmap, settings_menu)
+    results['press'] = measure(
+        lambda t, x, y: (game_state.update(t), InputHandler.press(game_state, (x, y), t)),
+        presses
+    )
+
+    game_state = new_game_state(beatmap, settings_menu)
+    game_state.prepare_slider_bodies(times[0], None)
+
+    def draw(t):
+        game_state.update(t)
+        screen.fill((0, 0, 0))
+        game_state.draw(screen, t)
+        game_state.prepare_slider_bodies(t)
+    results['draw'] = measure(draw, [(t,) for t in times])
+    return results
+
+
+def bench_map_pull(count, screen):
+    """Кадр выбора карт со списком из count мапсетов при прокрутке"""
+    pull = MapPull(*SCREEN_SIZE)
+    pull.load_previews([f"map{i}" for i in range(count)])
+    # Превью уже в памяти - меряем отрисовку, а не диск
+    preview = pygame.Surface((pull.item_width, pull.item_height))
+    for i in range(count):
+        pull.thumbnails.cache[f"map{i}"] = preview
+    frames = min(SAMPLES, 600)
+
+    def frame(k):
+        if k % 30 == 0:
+            pull.update(1)
+        screen.fill((0, 0, 0))
+        pull.draw(screen)
+    return {'map_pull_draw': measure(frame, [(k,) for k in range(frames)])}
+
+
+def bench_storyboard(folder, screen, approximate=False):
+    """Кадр сторибоарда (нижние слои и Overlay) на STORYBOARD_MS с шагом в 16 мс"""
+    board = Storyboard(parse_storyboard(synthetic_storyboard(folder)), folder, approximate)
+    board.prepare(screen)
+    frames = min(SAMPLES, STORYBOARD_MS // 16)
+
+    def frame(t):
+        screen.fill((0, 0, 0))
+        board.draw(screen, t)
+        board.draw_overlay(screen, t)
+    return {'storyboard_draw': measure(frame, [(k * 16,) for k in range(frames)])}
+
+
+def bench_startup(repeats=STARTUP_REPEATS):
+    """Холодный запуск игры в новом процессе: {стадия: сводка}
+
+    Фоновые задачи запуска (импорт, сканирование библиотеки, звёзды) работают
+    с пустой временной папкой данных (POSU_DATA_DIR), а не с данными игрока.
+    """
+    data_dir = tempfile.mkdtemp()
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', POSU_DATA_DIR=data_dir)
+    samples = {}
+    try:
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=BASE_DIR, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            times = json.loads(output.strip().splitlines()[-1])
+            for name, value in times.items():
+                samples.setdefault(name, []).append(value * 1000)  # в мкс, как остальные замеры
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, log=print, startup_repeats=STARTUP_REPEATS):
+    """Все замеры: {имя: {размер: сводка}} плюс описание машины"""
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    settings_menu = SettingsMenu(*SCREEN_SIZE)
+    results = {}
+    tmp_dir = tempfile.mkdtemp()
+    # Синтетические карты не должны оседать в кэше игрока
+    cache_dir = osu_parser.map_cache.cache_dir
+    osu_parser.map_cache.cache_dir = os.path.join(tmp_dir, 'cache')
+    try:
+        for count in sizes:
+            folder = os.path.join(tmp_dir, str(count))
+            os.makedirs(folder)
+            with open(os.path.join(folder, 'map.osu'), 'w', encoding='utf-8') as f:
+                f.write(synthetic_osu(count, seed=count))
+            beatmap = OsuParser.parse_file(os.path.join(folder, 'map.osu'))
+
+            stages = bench_parser(folder)
+            stages.update(bench_gameplay(beatmap, screen, settings_menu))
+            stages.update(bench_map_pull(count, screen))
+            for name, summary in stages.items():
+                results.setdefault(name, {})[str(count)] = summary
+            log(f"{count} объектов: " + ", ".join(
+                f"{name} {summary['mean_us']:.1f}" for name, summary in stages.items()) + " мкс")
+
+        folder = os.path.join(tmp_dir, 'storyboard')
+        os.makedirs(folder)
+        # Точный сторибоард и с приближениями (STORYBOARD_APPROXIMATE)
+        for name, approximate in (('storyboard_draw', False), ('storyboard_draw_approximate', True)):
+            summary = bench_storyboard(folder, screen, approximate)['storyboard_draw']
+            results[name] = {'synthetic': summary}
+            log(f"{name}: кадр {summary['median_us'] / 1000:.1f} мс (p95 {summary['p95_us'] / 1000:.1f} мс)")
+    finally:
+        osu_parser.map_cache.cache_dir = cache_dir
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if startup_repeats:
+        startup = bench_startup(startup_repeats)
+        for name, summary in startup.items():
+            results[name] = {'cold': summary}
+        first_frame = startup['startup_first_frame']['median_us'] / 1000
+        status = "в пределах цели" if first_frame <= STARTUP_TARGET_MS else "НЕ укладывается в цель"
+        log(f"Запуск: первый кадр через {first_frame:.0f} мс ({status} {STARTUP_TARGET_MS} мс)")
+    return {
+        'machine': {'python': platform.python_version(), 'pygame': pygame.version.ver,
+                    'platform': platform.platform()},
+        'results': results,
+    }
+
+
+def compare(current, baseline, ratio=REGRESSION_RATIO):
+    """Регрессии: список (имя, размер, было мкс, стало мкс) по медиане"""
+    regressions = []
+    for name, sizes in current['results'].items():
+        for size, summary in sizes.items():
+            old = baseline['results'].get(name, {}).get(size)
+            if old and summary['median_us'] > old['median_us'] * ratio:
+                regressions.append((name, size, old['median_us'], summary['median_us']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры горячих путей posu")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(BENCHMARK_SIZES))
+    parser.add_argument('--save', nargs='?', const=BENCHMARK_BASELINE, help="сохранить базовую линию")
+    parser.add_argument('--compare', nargs='?', const=BENCHMARK_BASELINE, help="сравнить с базовой линией")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Базовая линия сохранена: {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline)
+        for name, size, old, new in regressions:
+            print(f"РЕГРЕССИЯ {name} [{size}]: {old:.1f} -> {new:.1f} мкс ({new / old:.2f}x)")
+        if regressions:
+            return 1
+        print("Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
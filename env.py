@@ -3,7 +3,33 @@ import os
 BUTTON_COLOR = (255, 255, 255)
 BUTTON_HOVER_COLOR = (200, 200, 200)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MAPS_DIR = os.path.join(BASE_DIR, "posu", "maps")
-IMPORT_DIR = os.path.join(BASE_DIR, "posu", "import")
-SKINS_DIR = os.path.join(BASE_DIR, "posu", "skins")
-FONTS_DIR = os.path.join(BASE_DIR, "fonts")
\ No newline at end of file
+# Данные игрока (карты, скины, база, кэш); POSU_DATA_DIR подменяет папку - так бенчмарк запуска не трогает настоящие
+DATA_DIR = os.environ.get("POSU_DATA_DIR") or os.path.join(BASE_DIR, "posu")
+MAPS_DIR = os.path.join(DATA_DIR, "maps")
+IMPORT_DIR = os.path.join(DATA_DIR, "import")
+SKINS_DIR = os.path.join(DATA_DIR, "skins")
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+LIBRARY_DB = os.path.join(DATA_DIR, "library.db")
+THUMBS_DIR = os.path.join(CACHE_DIR, "thumbs")
+REPLAYS_DIR = os.path.join(DATA_DIR, "replays")
+BENCHMARK_BASELINE = os.path.join(DATA_DIR, "benchmark_baseline.json")
+PROFILES_DIR = os.path.join(DATA_DIR, "profiles")
+PREVIEW_CACHE_BYTES = 64 * 1024 * 1024  # Сколько памяти можно отдать под превью
+FONTS_DIR = os.path.join(BASE_DIR, "fonts")
+# Выводить на экран только изменившиеся области вместо flip() всего кадра
+DIRTY_RECT_RENDERING = True
+SIMULATION_STEP_MS = 1     # Шаг симуляции в игре (1 мс = 1 кГц)
+GAMEPLAY_FPS_LIMIT = 0     # Ограничение FPS отрисовки в игре, 0 - без ограничения
+MENU_FPS_LIMIT = 120
+GLOBAL_AUDIO_OFFSET_MS = 0      # Общий оффсет звука в мс (+ - ноты раньше относительно музыки)
+AUTO_CALIBRATE_OFFSET = False   # Подстраивать оффсет карты по ошибкам попаданий
+RECORD_REPLAYS = True           # Записывать повторы в REPLAYS_DIR
+PROFILER_ENABLED = False        # Профайлер кадра (F3 - вкл/выкл и график, F4 - сохранить трейс)
+# Показывать сторибоарды карт (.osb и [Events] сложности). Пока p95 кадра сторибоарда
+# в benchmark.py (storyboard_draw) не укладывается в 16.7 мс - только по желанию
+STORYBOARDS_ENABLED = False
+# Приближённый сторибоард: шаги масштаба, угла, цвета и прозрачности копий и поворот
+# крупных спрайтов в половинном разрешении - быстрее, но не точно (benchmark.py меряет оба)
+STORYBOARD_APPROXIMATE = False
+BACKGROUND_DIM = 0.7            # Затемнение фона карты в игре (0 - как есть, 1 - чёрный)
+BACKGROUND_BLUR = 0             # Размытие фона: во сколько раз уменьшить перед растягиванием (0 - без)
@@ -0,0 +1,27 @@
+class FixedStepLoop:
+    """Симуляция с постоянным шагом, независимая от частоты кадров.
+
+    Каждый кадр steps(now) выдаёт времена всех тиков, накопившихся с прошлого
+    кадра. Если кадр застрял (загрузка, перетаскивание окна), лишние тики не
+    проигрываются по одному: симуляция сразу прыгает к now, а GameState.update
+    умеет обрабатывать большие шаги. Отрисовка идёт по своему времени кадра:
+    всё на экране - функция времени, так что кадр между тиками точен.
+    """
+
+    def __init__(self, step_ms=1, max_steps=250, start_time=0):
+        self.step_ms = step_ms
+        self.max_steps = max_steps
+        self.time = start_time  # Время последнего тика
+
+    def steps(self, now):
+        """Времена тиков до now включительно"""
+        behind = int((now - self.time) // self.step_ms)
+        if behind <= 0:
+            return []
+        if behind > self.max_steps:
+            self.time += (behind - 1) * self.step_ms
+            behind = 1
+        ticks = [self.time + (k + 1) * self.step_ms for k in range(behind)]
+        self.time = ticks[-1]
+        return ticks
+
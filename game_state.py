@@ -1,24 +1,49 @@
 import pygame
 import math
+import time
+import numpy as np
 from pygame.math import Vector2
 from settings_menu import *
+from hit_objects import *
+from timeline import Timeline
+from hit_index import HitTestIndex
+from slider_curves import SliderPath
+from hit_sprites import HitCircleAtlas
+from hud_text import GlyphAtlas, HudCounter
+
+
+# Дренаж HP за миллисекунду на единицу HPDrainRate - столько же, сколько
+# раньше снималось по 0.01 за кадр при 120 FPS
+HP_DRAIN_PER_MS = 0.01 * 120 / 1000
+SLIDER_BODY_AHEAD_MS = 2000     # За сколько до появления слайдера рисуем его тело
+SLIDER_BODY_BUDGET_MS = 2       # Время кадра на тела заранее (хотя бы одно за кадр)
 
 
 class GameState:
     def __init__(self, game, settings_menu):
-        self.active_objects = []
+        self.active_objects = slice(0, 0)  # Срез активных объектов в hit_objects
         
         self.game = game
         self.WH = (1920,1080)
         self.settings_menu = settings_menu
-        self.approach_circle_surface = pygame.Surface(self.WH, pygame.SRCALPHA)
-        self.font = pygame.font.Font(None, 24)  # Для счета
+        self.atlas = None  # Спрайты кругов, строятся под CS и AR карты при её загрузке (build_atlas)
+        self.drawn_rects = []  # Что нарисовано в текущем кадре (для DirtyRenderer)
+        self.audio_clock = None  # AudioClock игры - для автокалибровки оффсета
+        self.hitsounds = None  # HitSoundBank карты
+        self.storyboard = None  # Storyboard карты, если он есть и включён
+        self.background = None  # Затемнённый фон карты (background.py) - им стирает экран DirtyRenderer
+        self.font = pygame.font.Font(None, 36)  # Для счета
         self.combo_font = pygame.font.Font(None, 48)  # Для комбо
+        # Глифы HUD растеризуются один раз, счётчики пересобираются только при смене значения
+        hud_glyphs = GlyphAtlas(self.font, (255, 255, 255))
+        self.score_counter = HudCounter(hud_glyphs, "{:,}".format)
+        self.accuracy_counter = HudCounter(hud_glyphs, "{:.2f}%".format)
+        self.combo_counter = HudCounter(GlyphAtlas(self.combo_font, (255, 255, 255), (0, 0, 0)), "{}x".format)
         self.slider_body_width = 15
         self.slider_border_width = 3
 
         #self.hit_window = 1500
-        self.hit_objects = []  # Все объекты карты
+        self.hit_objects = HitObjectTable.empty()  # Все объекты карты
           # Объекты в процессе анимации
         self.animation_duration = 500
         self.approach_circle_color = (255, 255, 255)  # Белый цвет
@@ -47,75 +72,88 @@ class GameState:
         self.update_metrics()
         self.reset()
         
-    def draw_main_circle(self, obj, surface):
-        """Отрисовка основного круга"""
-        pygame.draw.circle(
-            surface,
+    def build_atlas(self):
+        """Отрисовываем круги под текущие CS и AR один раз на карту"""
+        base_radius = self.hitcircle_radius
+        # Подходный круг ноты начинает с progress = -approach_time / 100 (нота длится 100 мс)
+        self.atlas = HitCircleAtlas(
+            base_radius,
+            base_radius * 0.5,
+            base_radius * (1 + 0.5 * self.approach_time / 100),
             self.hitcircle_color,
-            (obj['x'], obj['y']),
-            int(self.hitcircle_radius),
-            2  # Толщина обводки
+            self.approach_circle_color,
+            self.fade_circle_color
         )
 
+    def draw_main_circle(self, pos, surface):
+        """Отрисовка основного круга"""
+        self.drawn_rects.append(self.atlas.blit_centered(surface, self.atlas.circle, pos))
+
         
-    def draw_approach_circle(self, obj, progress, surface):
+    def draw_approach_circle(self, pos, progress, surface):
         """Рисуем подходный круг с анимацией сжатия"""
         base_radius = self.hitcircle_radius
         target_radius = base_radius * 0.5  # Минимальный радиус
         current_radius = base_radius - (base_radius - target_radius) * progress
         
-        # Рисуем белое кольцо
-        pygame.draw.circle(
-            surface,
-            self.approach_circle_color,
-            (obj['x'], obj['y']),
-            int(current_radius),
-            2  # Толщина линии
-        )
+        # Белое кольцо ближайшего размера из атласа
+        self.drawn_rects.append(self.atlas.blit_centered(surface, self.atlas.approach_sprite(current_radius), pos))
 
-    def draw_fading_circle(self, obj, alpha, surface):
+    def draw_fading_circle(self, pos, alpha, surface):
         """Рисуем исчезающий круг после нажатия"""
-        fade_surface = pygame.Surface((200, 200), pygame.SRCALPHA)
-        pygame.draw.circle(
-            fade_surface,
-            (*self.fade_circle_color, alpha),  # RGBA
-            (100, 100),
-            self.hitcircle_radius,
-            2
-        )
-        surface.blit(fade_surface, (obj['x'] - 100, obj['y'] - 100))
+        self.drawn_rects.append(self.atlas.blit_centered(surface, self.atlas.fade_sprite(alpha), pos))
 
-    def draw_slider(self, obj, progress, surface):
+    def draw_slider(self, index, progress, current_time, surface):
         """Рисуем слайдер с анимированным ползунком"""
-        # Тело слайдера
-        pygame.draw.line(
-            surface,
-            self.slider_body_color,
-            (obj['start_x'], obj['start_y']),
-            (obj['end_x'], obj['end_y']),
-            self.slider_body_width
-        )
-
-        # Границы
-        pygame.draw.line(
-            surface,
-            self.slider_border_color,
-            (obj['start_x'], obj['start_y']),
-            (obj['end_x'], obj['end_y']),
-            self.slider_border_width
-        )
+        path = self.slider_paths.get(index)
+        if path is None:
+            return
+        
+        # Тело с границей отрисовано заранее (prepare_slider_bodies) - здесь только один blit
+        body, topleft = path.body(*self.slider_body_style())
+        self.drawn_rects.append(surface.blit(body, topleft))
 
-        # Ползунок
-        t = min(1.0, max(0.0, progress))
-        x = obj['start_x'] + (obj['end_x'] - obj['start_x']) * t
-        y = obj['start_y'] + (obj['end_y'] - obj['start_y']) * t
-        pygame.draw.circle(
-            surface,
-            self.slider_border_color,
-            (int(x), int(y)),
-            10  # Размер ползунка
-        )
+        if progress < 0:
+            # До начала - голова с подходным кругом, как у обычной ноты
+            time_left = self.hit_objects.start_time[index] - current_time
+            self.draw_main_circle(path.head, surface)
+            self.draw_approach_circle(path.head, max(0.0, 1 - time_left / self.approach_time), surface)
+        else:
+            # Ползунок
+            self.drawn_rects.append(pygame.draw.circle(
+                surface,
+                self.slider_border_color,
+                path.position_at(progress),
+                10  # Размер ползунка
+            ))
         
+    def slider_body_style(self):
+        """Радиус и цвета тела слайдера - ключ готовой поверхности SliderPath.body"""
+        return (self.hitcircle_radius, self.slider_body_color,
+                self.slider_border_color, self.slider_border_width)
+
+    def prepare_slider_bodies(self, current_time, budget_ms=SLIDER_BODY_BUDGET_MS):
+        """Рисует тела слайдеров, появляющихся в ближайшие SLIDER_BODY_AHEAD_MS.
+
+        Курсор идёт вперёд по слайдерам в порядке start_time. За вызов -
+        сколько влезает в budget_ms (но хотя бы одно тело), None - без
+        ограничения (при загрузке карты).
+        """
+        objs = self.hit_objects
+        order = self.slider_order
+        deadline = None if budget_ms is None else time.perf_counter_ns() + budget_ms * 1_000_000
+        style = self.slider_body_style()
+        while self.slider_cursor < len(order):
+            i = order[self.slider_cursor]
+            if objs.start_time[i] - self.approach_time > current_time + SLIDER_BODY_AHEAD_MS:
+                return
+            if deadline is not None and time.perf_counter_ns() > deadline:
+                return
+            # Уже закончившиеся (перемотка) не рисуем
+            if objs.end_time[i] >= current_time:
+                self.slider_paths[i].body(*style)
+            self.slider_cursor += 1
+
     def update_metrics(self):
         """Обновляем параметры на основе сложности"""
         # Размер круга (CS)
@@ -137,68 +175,122 @@ class GameState:
         self.hit_window = self.hit_window_300
         self.hit_animation['slider']['tick_spacing'] = 50 / self.slider_tick_rate
         
+        # Атлас, таймлайн и индекс попаданий зависят от AR, OD и CS
+        if self.atlas is not None:
+            self.build_atlas()
+        if hasattr(self, 'timeline'):
+            self.set_hit_objects(self.hit_objects)
+        
+    def apply_difficulty(self, difficulty):
+        """Параметры сложности карты (словарь Beatmap.difficulty)"""
+        self.ar = difficulty['ar']
+        self.cs = difficulty['cs']
+        self.hp_drain_rate = difficulty['hp']
+        self.overall_difficulty = difficulty['od']
+        self.slider_multiplier = difficulty['slider_multiplier']
+        self.slider_tick_rate = difficulty['slider_tick_rate']
+        self.update_metrics()
+        
     def reset(self):
         self.hp = 100
         self.score = 0
         self.combo = 0
-        self.hit_objects = []
-        self.active_objects = []
+        self.hit_counts = {300: 0, 100: 0, 50: 0, 0: 0}  # Оценки попаданий, 0 - промахи
+        self.set_hit_objects(HitObjectTable.empty(), [])
         self.start_time = 0
-        self.font = pygame.font.Font(None, 36)
+        self.last_update_time = None  # Время прошлого update - дренаж считается по нему
         self.spinner_rotations = 0
         self.last_mouse_pos = (0, 0)
+        self.held_keys = 0  # Зажатые игровые клавиши (KEY_1 | KEY_2) - нажатием считается только фронт
+
+    def set_hit_objects(self, hit_objects, sliders=None):
+        """Загружаем объекты карты (уже отсортированные по start_time)
+
+        sliders - записи SliderRecord парсера; None оставляет текущие пути слайдеров
+        """
+        self.hit_objects = hit_objects
+        if sliders is not None:
+            # Кривые разворачиваем в ломаные с таблицами длин один раз при загрузке
+            self.slider_paths = {s.index: SliderPath.from_record(s) for s in sliders}
+        # Индексы таблицы отсортированы по start_time - и слайдеры в этом порядке
+        self.slider_order = sorted(self.slider_paths)
+        self.slider_cursor = 0
+        # Слайдеры и спиннеры, которые таймлайн уже убрал, но они ещё идут
+        self.running_objects = []
+        self.timeline = Timeline(hit_objects.start_time, self.approach_time, self.hit_window_50)
+        self.active_objects = self.timeline.active
+        self.hit_index = HitTestIndex(
+            hit_objects,
+            self.hitcircle_radius + 15,
+            self.hit_window_50,
+            self.approach_time
+        )
 
     def update(self, current_time):
-        # Добавляем объекты за approach_time до их start_time
+        """Шаг симуляции до current_time (шаг может быть любым, хоть 1 мс)"""
+        # HP убывает по прошедшему времени, а не по числу вызовов
+        if self.last_update_time is not None:
+            elapsed = max(0, current_time - self.last_update_time)
+            self.hp = max(0, self.hp - self.hp_drain_rate * HP_DRAIN_PER_MS * elapsed)
+        self.last_update_time = current_time
         
-        self.hp = max(0, self.hp - self.hp_drain_rate * 0.01)
-        
-        # Проверяем пропущенные объекты
-        for obj in self.active_objects:
-            if obj['type'] == 'circle' and not obj.get('hit') and not obj.get('missed'):
-                if current_time > obj['start_time'] + self.hit_window_50:
-                    self.combo = 0
-                    self.hp = max(0, self.hp - 5)
-                    obj['missed'] = True
-                    
-        new_objects = [
-            obj for obj in self.hit_objects
-            if (obj['start_time'] - self.approach_time) <= current_time 
-            and obj not in self.active_objects
-        ]
-        self.active_objects.extend(new_objects)
+        # Добавляем объекты за approach_time до их start_time
+        objs = self.hit_objects
+        spawned, expired = self.timeline.advance(current_time)
+
+        # Большинство тиков ничего не убирает с экрана - тогда и проверять нечего
+        if expired.start != expired.stop:
+            # Проверяем пропущенные объекты: только те, что были на экране в прошлом кадре
+            # и вышли за hit_window_50 сейчас
+            gone = slice(expired.start, max(expired.start, min(expired.stop, spawned.start)))
+            missed = objs.unjudged_mask(gone)
+            if missed.any():
+                self.combo = 0
+                self.hp = max(0, self.hp - 5 * int(missed.sum()))
+                self.hit_counts[0] += int(missed.sum())
+                flags = objs.flags[gone]
+                flags[missed] |= FLAG_MISSED
+
+            # Длинные объекты рисуем до end_time, хотя из таймлайна они уже ушли
+            self.running_objects.extend(
+                (expired.start + np.flatnonzero(objs.type[expired] & (TYPE_SLIDER | TYPE_SPINNER))).tolist()
+            )
         
-        # Удаление после окончания hit_window
-        self.active_objects = [
-        obj for obj in self.active_objects
-        if current_time <= obj['start_time'] + self.hit_window_50
-          ]
-    
-   
+        running = self.running_objects
+        if running:
+            self.running_objects = []
+            for i in running:
+                if objs.end_time[i] >= current_time:
+                    self.running_objects.append(i)
+                elif i in self.slider_paths:
+                    self.slider_paths[i].release()
 
+        # Активны объекты с start_time - approach_time <= t <= start_time + hit_window_50
+        self.active_objects = self.timeline.active
 
-    def draw_prediction_line(self, screen):
-        current_time = pygame.time.get_ticks() - self.start_time
+    def draw_prediction_line(self, screen, current_time):
+        objs = self.hit_objects
         
         # Найти последний ВИДИМЫЙ объект (с учетом анимации исчезновения)
-        prev_obj = None
-        for obj in reversed(self.hit_objects):
-            obj_end_time = obj['end_time'] + self.animation_duration  # Учитываем анимацию
-            if obj_end_time > current_time and obj['start_time'] <= current_time:
-                prev_obj = obj
-                break
+        # Кандидаты ограничены по времени: объект не может быть длиннее max_duration
+        candidates = objs.window(
+            current_time - self.animation_duration - objs.max_duration,
+            current_time
+        )
+        visible = np.flatnonzero(
+            objs.end_time[candidates] + self.animation_duration > current_time
+        )
+        prev_obj = candidates.start + int(visible[-1]) if len(visible) else None
                 
         # Найти следующий объект, который должен появиться
-        next_obj = None
-        for obj in self.hit_objects:
-            if obj['start_time'] > current_time:
-                next_obj = obj
-                break
+        next_obj = int(np.searchsorted(objs.start_time, current_time, side='right'))
+        if next_obj >= len(objs):
+            next_obj = None
 
         # Рисовать только если оба объекта существуют и предыдущий еще виден
-        if prev_obj and next_obj and (current_time <= prev_obj['end_time'] + self.animation_duration):
+        if prev_obj is not None and next_obj is not None and (current_time <= objs.end_time[prev_obj] + self.animation_duration):
             # Рассчитать прогресс исчезновения линии
-            time_since_end = current_time - prev_obj['end_time']
+            time_since_end = current_time - objs.end_time[prev_obj]
             fade_duration = 50  # Время исчезновения линии после ноты
 
             # Нормализация значений
@@ -209,66 +301,95 @@ class GameState:
             line_color = (255, 255, 255, alpha)
             line_width = 3
             # Отрисовка
-            pygame.draw.line(
+            self.drawn_rects.append(pygame.draw.line(
                 screen,
                 line_color,
-                (prev_obj['x'], prev_obj['y']),
-                (next_obj['x'], next_obj['y']),
+                self.end_position(prev_obj),
+                (objs.x[next_obj], objs.y[next_obj]),
                 line_width
-            )
+            ))
+
+    def end_position(self, index):
+        """Где объект заканчивается (для слайдера - конец пути)"""
+        path = self.slider_paths.get(index)
+        if path is not None:
+            return path.tail
+        return int(self.hit_objects.x[index]), int(self.hit_objects.y[index])
 
 
-    def draw(self, screen):
-        screen.fill((0, 0, 0))
+    def draw(self, screen, current_time):
+        """Рисует кадр поверх очищенного экрана, возвращает нарисованные прямоугольники
+
+        current_time - время кадра (AudioClock.time); может быть между тиками симуляции
+        """
+        self.drawn_rects = []
+        
+        # Слои сторибоарда под объектами
+        if self.storyboard is not None:
+            self.drawn_rects.extend(self.storyboard.draw(screen, current_time))
+        
+        self.draw_prediction_line(screen, current_time)
         
-        # Отрисовка объектов
-        current_time = pygame.time.get_ticks() - self.start_time
+        objs = self.hit_objects
+        # Сначала идущие слайдеры и спиннеры - они начались раньше активных нот
+        for i in self.running_objects:
+            total_time = int(objs.end_time[i]) - int(objs.start_time[i])
+            progress = (current_time - int(objs.start_time[i])) / total_time if total_time > 0 else 0.0
+            self.draw_object(screen, i, progress, current_time)
         
-        self.draw_prediction_line(screen)
+        active = self.active_objects
+        # Общие параметры для всех объектов считаем сразу для всего среза
+        total_time = objs.end_time[active] - objs.start_time[active]
+        obj_time = current_time - objs.start_time[active]
+        progress = np.where(total_time > 0, obj_time / np.maximum(total_time, 1), 0.0)
         
-        for obj in self.active_objects:
-            # Общие параметры для всех объектов
-            obj_time = current_time - obj['start_time']
-            total_time = obj['end_time'] - obj['start_time']
-            progress = obj_time / total_time if total_time > 0 else 0.0
-            
-            
-            if obj.get('hit'):
-                print("1")
-                hit_progress = (current_time - obj['hit_time']) / self.hit_animation['circle']['duration']
-                if hit_progress < 1:
-                    radius = 30 + self.hit_animation['circle']['max_radius'] * hit_progress
-                    alpha = int(255 * (1 - hit_progress))
-                    pygame.draw.circle(screen, (255, 255, 0, alpha),
-                                    (obj['x'], obj['y']), int(radius), 2)
-            
-            # Отрисовка по типам
-            if obj['type'] == 'circle':
-                self.draw_main_circle(obj, screen)
-                if current_time < obj['end_time']:
-                    self.draw_approach_circle(obj, progress, screen)
-                else:
-                    # Анимация исчезновения
-                    fade_time = current_time - obj['end_time']
-                    alpha = 255 - int(255 * fade_time / self.animation_duration)
-                    if alpha > 0:
-                        self.draw_fading_circle(obj, alpha, screen)
-
-            elif obj['type'] == 'slider':
-                self.draw_slider(obj, progress, screen)
-
-
-            elif obj['type'] == 'spinner':
-                pygame.draw.arc(screen, (0, 0, 255),
-                                (obj['center_x']-100, obj['center_y']-100, 200, 200),
-                                0, math.radians(self.spinner_rotations % 360), 5)
+        for i in range(active.start, active.stop):
+            self.draw_object(screen, i, progress[i - active.start], current_time)
+        
+        if self.storyboard is not None:
+            self.drawn_rects.extend(self.storyboard.draw_overlay(screen, current_time))
         
         # Отрисовка HUD
         self.draw_hp_bar(screen)
         self.draw_score(screen)
+        self.draw_accuracy(screen)
         self.draw_combo(screen)
+        return self.drawn_rects
+
+    def draw_object(self, screen, i, progress, current_time):
+        objs = self.hit_objects
+        pos = (int(objs.x[i]), int(objs.y[i]))
+        obj_type = objs.type[i]
         
-    
+        if objs.flags[i] & FLAG_HIT:
+            hit_progress = (current_time - objs.hit_time[i]) / self.hit_animation['circle']['duration']
+            if hit_progress < 1:
+                radius = 30 + self.hit_animation['circle']['max_radius'] * hit_progress
+                alpha = int(255 * (1 - hit_progress))
+                self.drawn_rects.append(pygame.draw.circle(screen, (255, 255, 0, alpha),
+                                pos, int(radius), 2))
+        
+        # Отрисовка по типам
+        if obj_type == TYPE_CIRCLE:
+            self.draw_main_circle(pos, screen)
+            if current_time < objs.end_time[i]:
+                self.draw_approach_circle(pos, progress, screen)
+            else:
+                # Анимация исчезновения
+                fade_time = current_time - objs.end_time[i]
+                alpha = 255 - int(255 * fade_time / self.animation_duration)
+                if alpha > 0:
+                    self.draw_fading_circle(pos, alpha, screen)
+
+        elif obj_type == TYPE_SLIDER:
+            self.draw_slider(i, progress, current_time, screen)
+
+
+        elif obj_type == TYPE_SPINNER:
+            self.drawn_rects.append(pygame.draw.arc(screen, (0, 0, 255),
+                            (pos[0]-100, pos[1]-100, 200, 200),
+                            0, math.radians(self.spinner_rotations % 360), 5))
+
     def draw_hp_bar(self, screen):
         # Параметры HP бара
         x, y = 10, 10
@@ -289,7 +410,7 @@ class GameState:
             (x, y + height),
             (x, y)
         ]
-        pygame.draw.polygon(screen, outline_color, outline_points, 2)
+        self.drawn_rects.append(pygame.draw.polygon(screen, outline_color, outline_points, 2))
         
         # Рисуем заполнение
         if fill_width > 0:
@@ -307,30 +428,23 @@ class GameState:
                     (x + fill_width, y + height),
                     (x, y + height)
                 ]
-            pygame.draw.polygon(screen, hp_color, fill_points)
+            self.drawn_rects.append(pygame.draw.polygon(screen, hp_color, fill_points))
+
+    def accuracy(self):
+        """Точность в процентах по оценкам (100, пока ничего не оценено)"""
+        judged = sum(self.hit_counts.values())
+        if not judged:
+            return 100.0
+        points = sum(score * count for score, count in self.hit_counts.items())
+        return 100.0 * points / (300 * judged)
 
     def draw_score(self, screen):
-        score_text = "{:,}".format(self.score)
-        text_surface = self.font.render(score_text, True, (255, 255, 255))
-        screen.blit(text_surface, (10, 35))  # Под HP баром
+        self.drawn_rects.append(screen.blit(self.score_counter.render(self.score), (10, 35)))  # Под HP баром
+
+    def draw_accuracy(self, screen):
+        self.drawn_rects.append(screen.blit(self.accuracy_counter.render(round(self.accuracy(), 2)), (10, 65)))  # Под счётом
 
     def draw_combo(self, screen):
-        combo_text = f"{self.combo}x"
-        # Создаем шрифт для комбо
-        combo_font = pygame.font.Font(None, 48)
-        
-        # Рендерим тень
-        shadow = combo_font.render(combo_text, True, (0, 0, 0))
-        shadow_rect = shadow.get_rect()
-        shadow_rect.x = 20
-        shadow_rect.bottom = screen.get_height() - 20
-        
-        # Рендерим основной текст
-        text = combo_font.render(combo_text, True, (255, 255, 255))
-        text_rect = text.get_rect()
-        text_rect.x = shadow_rect.x + 2
-        text_rect.y = shadow_rect.y + 2
-        
-        # Рисуем элементы
-        screen.blit(shadow, shadow_rect)
-        screen.blit(text, text_rect)
+        # Тень и текст уже собраны в одну поверхность, низ тени - в 20 px от края
+        y = screen.get_height() - 20 - self.combo_font.get_height()
+        self.drawn_rects.append(screen.blit(self.combo_counter.render(self.combo), (20, y)))
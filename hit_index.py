@@ -0,0 +1,57 @@
+import math
+import numpy as np
+from hit_objects import HITTABLE_TYPES, FLAG_HIT, FLAG_MISSED
+
+
+class HitTestIndex:
+    """Сетка по игровому полю, разбитая на корзины по времени.
+
+    Строится один раз на карту. Объект попадает в ячейку по своему центру и в
+    корзину по start_time, поэтому для запроса достаточно соседних ячеек 3x3
+    и не больше двух корзин времени.
+    """
+
+    def __init__(self, hit_objects, hit_radius, hit_window, approach_time):
+        self.hit_objects = hit_objects
+        self.hit_radius = hit_radius
+        self.hit_window = hit_window
+        self.approach_time = approach_time
+        # Размер ячейки не меньше радиуса попадания, корзина не уже всего хит-окна
+        self.cell_size = max(1, int(math.ceil(hit_radius)))
+        self.bucket_ms = max(1, int(math.ceil(2 * hit_window)))
+        self.cells = {}
+
+        hittable = np.flatnonzero(hit_objects.type & HITTABLE_TYPES)
+        buckets = hit_objects.start_time[hittable] // self.bucket_ms
+        cx = hit_objects.x[hittable] // self.cell_size
+        cy = hit_objects.y[hittable] // self.cell_size
+        # Индексы идут по возрастанию, так что списки в ячейках уже отсортированы
+        for i, b, x, y in zip(hittable.tolist(), buckets.tolist(), cx.tolist(), cy.tolist()):
+            self.cells.setdefault((b, x, y), []).append(i)
+
+    def find(self, x, y, current_time):
+        """Первая (по времени) неоценённая нота под курсором или None"""
+        objs = self.hit_objects
+        cx = int(x) // self.cell_size
+        cy = int(y) // self.cell_size
+        first_bucket = int(math.floor((current_time - self.hit_window) / self.bucket_ms))
+        last_bucket = int(math.floor((current_time + self.hit_window) / self.bucket_ms))
+
+        best = None
+        for b in range(first_bucket, last_bucket + 1):
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    for i in self.cells.get((b, gx, gy), ()):
+                        if best is not None and i >= best:
+                            break
+                        if objs.flags[i] & (FLAG_HIT | FLAG_MISSED):
+                            continue
+                        start_time = int(objs.start_time[i])
+                        if abs(current_time - start_time) > self.hit_window:
+                            continue
+                        if start_time - self.approach_time > current_time:
+                            continue
+                        if math.hypot(int(objs.x[i]) - x, int(objs.y[i]) - y) <= self.hit_radius:
+                            best = i
+                            break
+        return best
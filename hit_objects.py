@@ -0,0 +1,104 @@
+import numpy as np
+
+
+# Типы объектов (биты из поля type в .osu)
+TYPE_CIRCLE = 1
+TYPE_SLIDER = 2
+TYPE_SPINNER = 8
+
+# По этим объектам можно попасть (у слайдера оценивается голова)
+HITTABLE_TYPES = TYPE_CIRCLE | TYPE_SLIDER
+
+TYPE_NAMES = {
+    TYPE_CIRCLE: 'circle',
+    TYPE_SLIDER: 'slider',
+    TYPE_SPINNER: 'spinner',
+}
+
+# Биты хитсаунда (поле hitSound в .osu); обычный звук играет всегда
+HITSOUND_WHISTLE = 2
+HITSOUND_FINISH = 4
+HITSOUND_CLAP = 8
+
+# Флаги состояния объекта во время игры
+FLAG_HIT = 1
+FLAG_MISSED = 2
+
+
+class HitObjectTable:
+    """Колоночное хранилище хит-объектов карты (по массиву на каждое поле)"""
+
+    def __init__(self, x, y, start_time, end_time, obj_type, flags=None, hit_time=None,
+                 hit_sound=None, normal_set=None, addition_set=None, sample_index=None, sample_volume=None):
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.start_time = np.asarray(start_time, dtype=np.int32)
+        self.end_time = np.asarray(end_time, dtype=np.int32)
+        self.type = np.asarray(obj_type, dtype=np.uint8)
+        count = len(self.x)
+        self.flags = self._column(flags, np.uint8, count)
+        self.hit_time = self._column(hit_time, np.int32, count)
+        # Хитсаунд и hitSample объекта; 0 - взять из тайминг-поинта
+        self.hit_sound = self._column(hit_sound, np.uint8, count)
+        self.normal_set = self._column(normal_set, np.uint8, count)
+        self.addition_set = self._column(addition_set, np.uint8, count)
+        self.sample_index = self._column(sample_index, np.int32, count)
+        self.sample_volume = self._column(sample_volume, np.uint8, count)
+        # Самый длинный объект - нужен, чтобы ограничить поиск по времени окончания
+        self.max_duration = int((self.end_time - self.start_time).max()) if count else 0
+
+    @staticmethod
+    def _column(values, dtype, count):
+        return np.zeros(count, dtype=dtype) if values is None else np.asarray(values, dtype=dtype)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [])
+
+    def __len__(self):
+        return len(self.start_time)
+
+    def __getitem__(self, index):
+        """Строка таблицы в виде словаря (для отладки и тестов)"""
+        return {
+            'type': TYPE_NAMES.get(int(self.type[index]), 'unknown'),
+            'x': int(self.x[index]),
+            'y': int(self.y[index]),
+            'start_time': int(self.start_time[index]),
+            'end_time': int(self.end_time[index]),
+            'hit': bool(self.flags[index] & FLAG_HIT),
+            'missed': bool(self.flags[index] & FLAG_MISSED),
+            'hit_time': int(self.hit_time[index]),
+        }
+
+    def sort_order(self):
+        """Индексы строк по возрастанию start_time (стабильно)"""
+        return np.argsort(self.start_time, kind='stable')
+
+    def sort_by_time(self):
+        """Новая таблица, отсортированная по start_time"""
+        return self.take(self.sort_order())
+
+    def take(self, rows):
+        """Новая таблица из выбранных строк (индексы или булева маска)"""
+        return HitObjectTable(
+            self.x[rows], self.y[rows],
+            self.start_time[rows], self.end_time[rows],
+            self.type[rows], self.flags[rows], self.hit_time[rows],
+            self.hit_sound[rows], self.normal_set[rows], self.addition_set[rows],
+            self.sample_index[rows], self.sample_volume[rows]
+        )
+
+    def reset_flags(self):
+        self.flags[:] = 0
+        self.hit_time[:] = 0
+
+    def window(self, t_from, t_to):
+        """Срез объектов с t_from <= start_time <= t_to (таблица должна быть отсортирована)"""
+        lo = int(np.searchsorted(self.start_time, t_from, side='left'))
+        hi = int(np.searchsorted(self.start_time, t_to, side='right'))
+        return slice(lo, max(lo, hi))
+
+    def unjudged_mask(self, sl):
+        """Маска объектов среза, по которым можно попасть и которые ещё не оценены"""
+        return ((self.type[sl] & HITTABLE_TYPES) != 0) & ((self.flags[sl] & (FLAG_HIT | FLAG_MISSED)) == 0)
@@ -0,0 +1,73 @@
+import pygame
+
+
+APPROACH_STEPS = 48   # Сколько размеров подходного круга держим в атласе
+FADE_STEPS = 16       # Ступеней прозрачности исчезающего круга
+RING_WIDTH = 2        # Толщина обводки кругов
+COLORKEY = (0, 0, 0)  # Прозрачный цвет спрайтов (кольца рисуются не чёрным)
+
+
+def _ring(radius, color):
+    """Кольцо в собственной поверхности с цветовым ключом"""
+    size = 2 * radius + 2
+    surface = pygame.Surface((size, size))
+    surface.fill(COLORKEY)
+    pygame.draw.circle(surface, color, (radius + 1, radius + 1), radius, RING_WIDTH)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return surface
+
+
+class HitCircleAtlas:
+    """Заранее отрисованные круги нот для одной карты.
+
+    Строится, когда известны CS и AR: основной круг, кольца подходного круга
+    от min_approach до max_approach (геометрическими шагами) и ступени
+    прозрачности исчезающего круга. Отрисовка ноты - один-два blit без
+    выделения памяти.
+    """
+
+    def __init__(self, radius, min_approach, max_approach, circle_color, approach_color, fade_color):
+        self.radius = radius
+        self.circle = _ring(radius, circle_color)
+
+        min_approach = max(1, int(min_approach))
+        max_approach = max(min_approach, int(max_approach))
+        self.min_approach = min_approach
+        ratio = max_approach / min_approach
+        self.approach_radii = sorted({
+            int(round(min_approach * ratio ** (i / (APPROACH_STEPS - 1))))
+            for i in range(APPROACH_STEPS)
+        })
+        self.approach = [_ring(r, approach_color) for r in self.approach_radii]
+
+        fade = _ring(radius, fade_color)
+        self.fade = []
+        for step in range(FADE_STEPS):
+            sprite = fade.copy()
+            sprite.set_alpha(int(255 * (step + 1) / FADE_STEPS))
+            self.fade.append(sprite)
+
+    def approach_sprite(self, radius):
+        """Кольцо ближайшего к radius размера из атласа"""
+        radii = self.approach_radii
+        lo, hi = 0, len(radii) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if radii[mid] < radius:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0 and radius - radii[lo - 1] < radii[lo] - radius:
+            lo -= 1
+        return self.approach[lo]
+
+    def fade_sprite(self, alpha):
+        step = min(FADE_STEPS - 1, max(0, int(alpha) * FADE_STEPS // 256))
+        return self.fade[step]
+
+    @staticmethod
+    def blit_centered(surface, sprite, pos):
+        half = sprite.get_width() // 2
+        return surface.blit(sprite, (pos[0] - half, pos[1] - half))
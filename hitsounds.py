@@ -0,0 +1,106 @@
+import bisect
+import pygame
+from hit_objects import HITSOUND_WHISTLE, HITSOUND_FINISH, HITSOUND_CLAP
+from osu_parser import OsuParser
+
+
+SAMPLE_SETS = {1: 'normal', 2: 'soft', 3: 'drum'}
+SAMPLE_SET_IDS = {name.capitalize(): set_id for set_id, name in SAMPLE_SETS.items()}
+ADDITIONS = ((HITSOUND_WHISTLE, 'hitwhistle'), (HITSOUND_FINISH, 'hitfinish'), (HITSOUND_CLAP, 'hitclap'))
+SAMPLE_EXTENSIONS = ('.wav', '.ogg', '.mp3')
+CHANNEL_POOL_SIZE = 16
+
+
+class HitSoundBank:
+    """Все хитсаунды карты, загруженные заранее.
+
+    При создании для каждого объекта определяется набор сэмплов (набор,
+    индекс и громкость из объекта или из действующего тайминг-поинта), и
+    все нужные файлы декодируются в pygame.mixer.Sound. Играют они через
+    заранее зарезервированные каналы, так что попадание не ждёт ни диска,
+    ни выделения канала.
+
+    Индекс 0 означает сэмплы скина - они ищутся в skin_dir, если он задан.
+    """
+
+    def __init__(self, beatmap, skin_dir=None, channels=CHANNEL_POOL_SIZE):
+        self.folder = beatmap.folder
+        self.skin_dir = skin_dir
+        self.sounds = {}      # (имя файла, из скина) -> Sound или None, если файла нет
+        self.objects = []     # индекс объекта -> (кортеж Sound, громкость 0..1)
+        self.channels = []
+        self.next_channel = 0
+        self._resolve(beatmap)
+        self._reserve_channels(channels)
+
+    def _resolve(self, beatmap):
+        timing_points = beatmap.timing_points
+        times = [tp.time for tp in timing_points]
+        default_set = SAMPLE_SET_IDS.get(beatmap.general.get('SampleSet', 'Normal'), 1)
+        objs = beatmap.hit_objects
+        columns = zip(
+            objs.start_time.tolist(), objs.hit_sound.tolist(), objs.normal_set.tolist(),
+            objs.addition_set.tolist(), objs.sample_index.tolist(), objs.sample_volume.tolist()
+        )
+        for start_time, hit_sound, normal_set, addition_set, index, volume in columns:
+            # Действует последний тайминг-поинт не позже объекта (или первый)
+            i = max(0, bisect.bisect_right(times, start_time) - 1)
+            tp = timing_points[i] if timing_points else None
+            if not normal_set:
+                normal_set = (tp.sample_set if tp else 0) or default_set
+            if not addition_set:
+                addition_set = normal_set
+            if not index:
+                index = tp.sample_index if tp else 0
+            if not volume:
+                volume = tp.volume if tp else 100
+
+            keys = [self.sample_key(normal_set, 'hitnormal', index)]
+            keys += [self.sample_key(addition_set, suffix, index)
+                     for bit, suffix in ADDITIONS if hit_sound & bit]
+            sounds = tuple(s for s in (self._load(key) for key in keys) if s is not None)
+            self.objects.append((sounds, min(100, max(0, volume)) / 100))
+
+    @staticmethod
+    def sample_key(set_id, suffix, index):
+        """(имя файла без расширения, из скина): ('soft-hitclap2', False)"""
+        name = f"{SAMPLE_SETS.get(set_id, 'normal')}-{suffix}"
+        return (name if index <= 1 else f"{name}{index}", index == 0)
+
+    def _load(self, key):
+        if key in self.sounds:
+            return self.sounds[key]
+        name, from_skin = key
+        folder = self.skin_dir if from_skin else self.folder
+        sound = None
+        if folder:
+            for extension in SAMPLE_EXTENSIONS:
+                path = OsuParser.resolve_file(folder, name + extension)
+                if path:
+                    try:
+                        sound = pygame.mixer.Sound(path)
+                    except pygame.error as e:
+                        print(f"Ошибка загрузки хитсаунда {name}: {str(e)}")
+                    break
+        self.sounds[key] = sound
+        return sound
+
+    def _reserve_channels(self, count):
+        if not pygame.mixer.get_init():
+            return
+        # Зарезервированные каналы не отдаются Sound.play(), ими распоряжаемся сами
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), count))
+        pygame.mixer.set_reserved(count)
+        self.channels = [pygame.mixer.Channel(i) for i in range(count)]
+
+    def play(self, index):
+        """Хитсаунды объекта index (вызывается при попадании)"""
+        if not self.channels or not 0 <= index < len(self.objects):
+            return
+        sounds, volume = self.objects[index]
+        for sound in sounds:
+            # По кругу; если следующий канал занят, звук на нём самый старый
+            channel = self.channels[self.next_channel]
+            self.next_channel = (self.next_channel + 1) % len(self.channels)
+            channel.set_volume(volume)
+            channel.play(sound)
@@ -0,0 +1,71 @@
+import pygame
+
+
+# Символы, которые нужны счётчикам HUD - растеризуются заранее
+HUD_CHARSET = "0123456789,.%x"
+
+
+class GlyphAtlas:
+    """Глифы одного шрифта и цвета, отрисованные по одному разу.
+
+    Если задан shadow_color, у каждого глифа есть и тень: при сборке строки
+    сначала рисуются тени, поверх - текст со сдвигом shadow_offset.
+    """
+
+    def __init__(self, font, color, shadow_color=None, shadow_offset=(2, 2), charset=HUD_CHARSET):
+        self.font = font
+        self.color = color
+        self.shadow_color = shadow_color
+        self.shadow_offset = shadow_offset if shadow_color is not None else (0, 0)
+        self.height = font.get_height() + self.shadow_offset[1]
+        self.glyphs = {}  # символ -> (текст, тень или None)
+        for char in charset:
+            self.glyph(char)
+
+    def _rasterize(self, char, color):
+        surface = self.font.render(char, True, color)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+    def glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            # Символ не из набора - растеризуем при первой встрече
+            shadow = self._rasterize(char, self.shadow_color) if self.shadow_color is not None else None
+            glyph = (self._rasterize(char, self.color), shadow)
+            self.glyphs[char] = glyph
+        return glyph
+
+    def render(self, text):
+        """Строка из готовых глифов в одной поверхности"""
+        glyphs = [self.glyph(char) for char in text]
+        dx, dy = self.shadow_offset
+        width = sum(g[0].get_width() for g in glyphs) + dx
+        surface = pygame.Surface((max(1, width), self.height), pygame.SRCALPHA)
+        if self.shadow_color is not None:
+            x = 0
+            for _, shadow in glyphs:
+                surface.blit(shadow, (x, 0))
+                x += shadow.get_width()
+        x = 0
+        for text_glyph, _ in glyphs:
+            surface.blit(text_glyph, (x + dx, dy))
+            x += text_glyph.get_width()
+        return surface
+
+
+class HudCounter:
+    """Счётчик HUD: строка собирается из глифов только при смене значения"""
+
+    def __init__(self, atlas, formatter):
+        self.atlas = atlas
+        self.formatter = formatter
+        self.value = None
+        self.surface = None
+
+    def render(self, value):
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.atlas.render(self.formatter(value))
+        return self.surface
@@ -1,61 +1,90 @@
 import pygame
-import math
 import sys
+from hit_objects import FLAG_HIT
+
+
+# Биты клавиш в кадре ввода (симуляция, повторы)
+KEY_1 = 1
+KEY_2 = 2
 
 
 class InputHandler:
     @staticmethod
-    def handle_input(events, game_state, current_time):
+    def handle_input(events, game_state, current_time, record=None):
+        """Нажатия игровых клавиш из событий кадра.
+
+        Нажатие - только KEYDOWN клавиши, которая не была зажата (фронт), как в
+        безголовой симуляции и повторах: удержание и другие события не оцениваются.
+        record(time, x, y, keys) получает каждое событие ввода так, как его
+        оценили, - нажатие и отпускание внутри одного кадра не теряются.
+        """
         if not game_state or not hasattr(game_state, 'active_objects'):
             return
+        keys = game_state.settings_menu.selected_keys
+        bits = {pygame.key.key_code(keys['key1']): KEY_1, pygame.key.key_code(keys['key2']): KEY_2}
         mouse_pos = pygame.mouse.get_pos()
-        hit_detected = False
-        key_pressed = pygame.key.get_pressed()
-        key1 = pygame.key.key_code(game_state.settings_menu.selected_keys['key1'])
-        key2 = pygame.key.key_code(game_state.settings_menu.selected_keys['key2'])
-        
-        # 1. Фильтруем ТОЛЬКО активные ноты в пределах хит-окна
-        truly_active_objects = [
-            obj for obj in game_state.active_objects
-            if (obj['start_time'] - game_state.approach_time <= current_time <= obj['start_time'] + game_state.hit_window_50)
-            and not obj.get('hit')
-            and not obj.get('missed')
-        ]
 
         for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit(0)
-                
-            if key_pressed[key1] or key_pressed[key2]:
-                mouse_pos = pygame.mouse.get_pos()
-                for obj in truly_active_objects:  # 2. Используем отфильтрованный список
-                    if obj['type'] == 'circle':
-                        dx = obj['x'] - mouse_pos[0]
-                        dy = obj['y'] - mouse_pos[1]
-                        distance = math.hypot(dx, dy)
-                        
-                        time_diff = abs(current_time - obj['start_time'])
-                        if distance <= game_state.hitcircle_radius + 15:
-                            if time_diff <= game_state.hit_window_300:
-                                game_state.score += 300
-                                game_state.combo += 1
-                                hit_detected = True
-                            elif time_diff <= game_state.hit_window_100:
-                                game_state.score += 100
-                                game_state.combo += 1
-                                hit_detected = True
-                            elif time_diff <= game_state.hit_window_50:
-                                game_state.score += 50
-                                game_state.combo += 1
-                                hit_detected = True
-                            
-                            if hit_detected:
-                                obj['hit'] = True
-                                game_state.hp = min(100, game_state.hp + 2)
-                                break
-                
-                # 3. Наказываем ТОЛЬКО если есть активные ноты в хит-окне
-                if not hit_detected and len(truly_active_objects) > 0:
-                    game_state.combo = 0
-                    game_state.hp = max(0, game_state.hp - 5)
\ No newline at end of file
+
+            if event.type == pygame.MOUSEMOTION:
+                mouse_pos = event.pos
+            elif event.type == pygame.KEYDOWN and event.key in bits:
+                InputHandler.judge(game_state, game_state.held_keys | bits[event.key], mouse_pos, current_time)
+            elif event.type == pygame.KEYUP and event.key in bits:
+                game_state.held_keys &= ~bits[event.key]
+            else:
+                continue
+            if record is not None:
+                record(current_time, mouse_pos[0], mouse_pos[1], game_state.held_keys)
+
+    @staticmethod
+    def judge(game_state, keys, mouse_pos, current_time):
+        """Новое состояние клавиш keys (KEY_1 | KEY_2): каждая клавиша, не зажатая раньше, - одно нажатие
+
+        Общее правило игры, симуляции и повторов.
+        """
+        pressed = keys & ~game_state.held_keys
+        game_state.held_keys = keys
+        for key in (KEY_1, KEY_2):
+            if pressed & key:
+                InputHandler.press(game_state, mouse_pos, current_time)
+
+    @staticmethod
+    def press(game_state, mouse_pos, current_time):
+        """Нажатие клавиши в точке mouse_pos; возвращает индекс оценённой ноты или None
+
+        Не трогает pygame - так же вызывается из безголовой симуляции и повторов.
+        """
+        objs = game_state.hit_objects
+        # 1. Ищем ноту под курсором через индекс попаданий
+        obj = game_state.hit_index.find(mouse_pos[0], mouse_pos[1], current_time)
+        
+        if obj is not None:
+            time_diff = abs(current_time - int(objs.start_time[obj]))
+            if time_diff <= game_state.hit_window_300:
+                points = 300
+            elif time_diff <= game_state.hit_window_100:
+                points = 100
+            else:
+                points = 50
+            game_state.score += points
+            game_state.hit_counts[points] += 1
+            if game_state.hitsounds is not None:
+                game_state.hitsounds.play(obj)
+            if game_state.audio_clock is not None:
+                game_state.audio_clock.record_hit_error(current_time - int(objs.start_time[obj]))
+            game_state.combo += 1
+            
+            objs.flags[obj] |= FLAG_HIT
+            objs.hit_time[obj] = current_time
+            game_state.hp = min(100, game_state.hp + 2)
+            return obj
+        
+        # 2. Наказываем ТОЛЬКО если есть активные ноты в хит-окне
+        if objs.unjudged_mask(game_state.active_objects).any():
+            game_state.combo = 0
+            game_state.hp = max(0, game_state.hp - 5)
+        return None
@@ -0,0 +1,375 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from env import MAPS_DIR, LIBRARY_DB
+from osu_parser import OsuParser, LIBRARY_SECTIONS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mapsets (
+    folder TEXT PRIMARY KEY,
+    title TEXT,
+    artist TEXT,
+    creator TEXT,
+    background TEXT,
+    scanned_at REAL
+);
+CREATE TABLE IF NOT EXISTS beatmaps (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL REFERENCES mapsets(folder) ON DELETE CASCADE,
+    version TEXT,
+    hp REAL, cs REAL, od REAL, ar REAL,
+    bpm REAL,
+    length_ms INTEGER,
+    stars REAL
+);
+CREATE TABLE IF NOT EXISTS imports (
+    hash TEXT PRIMARY KEY,
+    folder TEXT
+);
+CREATE TABLE IF NOT EXISTS map_offsets (
+    path TEXT PRIMARY KEY,
+    offset_ms REAL
+);
+CREATE INDEX IF NOT EXISTS beatmaps_folder ON beatmaps(folder);
+CREATE INDEX IF NOT EXISTS mapsets_title ON mapsets(title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS mapsets_artist ON mapsets(artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS mapsets_pending ON mapsets(scanned_at) WHERE scanned_at IS NULL;
+"""
+
+# Сортировки мапсетов; для числовых полей берём максимум по сложностям
+SORT_KEYS = {
+    'folder': 'm.folder COLLATE NOCASE',
+    'title': 'm.title COLLATE NOCASE',
+    'artist': 'm.artist COLLATE NOCASE',
+    'stars': 'MAX(b.stars)',
+    'length': 'MAX(b.length_ms)',
+    'bpm': 'MAX(b.bpm)',
+}
+
+# Фильтры-диапазоны: имя -> колонка beatmaps
+RANGE_FILTERS = {
+    'stars': 'b.stars',
+    'length': 'b.length_ms',
+    'bpm': 'b.bpm',
+}
+
+# Фильтр в строке поиска, как в osu!: stars>5 bpm<=200 length<90 (длина в секундах)
+FILTER_TOKEN = re.compile(r'^(stars|bpm|length)(<=|>=|<|>|=)(\d+(?:\.\d+)?)$', re.IGNORECASE)
+FILTER_SCALE = {'stars': 1, 'bpm': 1, 'length': 1000}
+
+
+def parse_search(text):
+    """Строка поиска -> (слова поиска или None, фильтры для query_mapsets или None)
+
+    Границы фильтров включительные: stars>5 значит "от 5 звёзд".
+    """
+    words, filters = [], {}
+    for token in text.split():
+        match = FILTER_TOKEN.match(token)
+        if match is None:
+            words.append(token)
+            continue
+        name, op = match.group(1).lower(), match.group(2)
+        value = float(match.group(3)) * FILTER_SCALE[name]
+        low, high = filters.get(name, (None, None))
+        if op[0] in '>=':
+            low = value
+        if op[0] in '<=':
+            high = value
+        filters[name] = (low, high)
+    return " ".join(words) or None, filters or None
+
+
+class Library:
+    """Индекс карт в SQLite (WAL).
+
+    sync_folders() только читает список папок в MAPS_DIR и заводит строки для
+    новых мапсетов. Заголовки .osu читаются позже и порциями в scan_pending(),
+    поэтому открытие выбора карт не трогает каждую папку на диске.
+    """
+
+    def __init__(self, db_path=LIBRARY_DB, maps_dir=MAPS_DIR):
+        self.maps_dir = maps_dir
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        # Растёт при каждом изменении - по нему LibraryView сбрасывает кэш страниц
+        self.generation = 0
+        self.scan_thread = None
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _commit(self):
+        self.connection.commit()
+        self.generation += 1
+
+    def sync_folders(self):
+        """Сверяет список папок с индексом, возвращает число новых мапсетов"""
+        try:
+            on_disk = {entry.name for entry in os.scandir(self.maps_dir) if entry.is_dir()}
+        except FileNotFoundError:
+            on_disk = set()
+
+        with self.lock:
+            known = {row[0] for row in self.connection.execute("SELECT folder FROM mapsets")}
+            removed = known - on_disk
+            added = on_disk - known
+            if not removed and not added:
+                return 0
+            self.connection.executemany("DELETE FROM mapsets WHERE folder = ?",
+                                        [(f,) for f in removed])
+            self.connection.executemany("INSERT INTO mapsets (folder, title) VALUES (?, ?)",
+                                        [(f, f) for f in added])
+            self._commit()
+        return len(added)
+
+    def scan_pending(self, limit=None):
+        """Читает заголовки ещё не проиндексированных мапсетов; возвращает сколько прочитано"""
+        with self.lock:
+            query = "SELECT folder FROM mapsets WHERE scanned_at IS NULL"
+            if limit is not None:
+                query += f" LIMIT {int(limit)}"
+            pending = [row[0] for row in self.connection.execute(query)]
+
+        for folder in pending:
+            self.scan_folder(folder)
+        return len(pending)
+
+    def scan_folder(self, folder):
+        """(Пере)индексирует один мапсет по заголовкам его .osu файлов"""
+        map_path = os.path.join(self.maps_dir, folder)
+        try:
+            beatmaps = OsuParser.parse_mapset(map_path, LIBRARY_SECTIONS)
+        except OSError:
+            beatmaps = []
+
+        rows = []
+        for beatmap in beatmaps:
+            length = OsuParser.read_last_object_time(beatmap.path)
+            d = beatmap.difficulty
+            rows.append((
+                beatmap.path, folder, beatmap.metadata.get('Version'),
+                d['hp'], d['cs'], d['od'], d['ar'],
+                beatmap.main_bpm(length), length
+            ))
+
+        first = beatmaps[0] if beatmaps else None
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO mapsets (folder) VALUES (?)", (folder,)
+            )
+            self.connection.execute(
+                "UPDATE mapsets SET title = ?, artist = ?, creator = ?, background = ?, scanned_at = ? "
+                "WHERE folder = ?",
+                (
+                    first.metadata.get('Title', folder) if first else folder,
+                    first.metadata.get('Artist') if first else None,
+                    first.metadata.get('Creator') if first else None,
+                    first.events['background'] if first else None,
+                    time.time(), folder
+                )
+            )
+            self.connection.execute("DELETE FROM beatmaps WHERE folder = ?", (folder,))
+            self.connection.executemany(
+                "INSERT INTO beatmaps (path, folder, version, hp, cs, od, ar, bpm, length_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._commit()
+
+    def imported_hashes(self):
+        """SHA-1 всех уже импортированных архивов"""
+        with self.lock:
+            return {row[0] for row in self.connection.execute("SELECT hash FROM imports")}
+
+    def add_imported_hash(self, content_hash, folder):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO imports (hash, folder) VALUES (?, ?)",
+                                    (content_hash, folder))
+            self.connection.commit()
+
+    def set_stars(self, path, stars):
+        with self.lock:
+            self.connection.execute("UPDATE beatmaps SET stars = ? WHERE path = ?", (stars, path))
+            self._commit()
+
+    def set_stars_many(self, rows):
+        """Звёзды пачкой: rows - пары (path, stars)"""
+        with self.lock:
+            self.connection.executemany("UPDATE beatmaps SET stars = ? WHERE path = ?",
+                                        [(stars, path) for path, stars in rows])
+            self._commit()
+
+    def unrated_beatmaps(self):
+        """Пути сложностей, для которых ещё не посчитаны звёзды"""
+        with self.lock:
+            return [row[0] for row in self.connection.execute(
+                "SELECT path FROM beatmaps WHERE stars IS NULL ORDER BY path")]
+
+    def get_offset(self, path):
+        """Оффсет звука сложности в мс (0, если не задан)"""
+        with self.lock:
+            row = self.connection.execute("SELECT offset_ms FROM map_offsets WHERE path = ?",
+                                          (path,)).fetchone()
+        return row[0] if row else 0
+
+    def set_offset(self, path, offset_ms):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO map_offsets (path, offset_ms) VALUES (?, ?)",
+                                    (path, offset_ms))
+            self.connection.commit()
+
+    def start_background_scan(self, batch=20):
+        """Индексирует новые мапсеты в фоновом потоке"""
+        if self.scan_thread and self.scan_thread.is_alive():
+            return
+
+        def scan():
+            while self.scan_pending(batch):
+                pass
+
+        self.scan_thread = threading.Thread(target=scan, daemon=True)
+        self.scan_thread.start()
+
+    def _where(self, search, filters):
+        clauses, params = [], []
+        if search:
+            for word in search.split():
+                clauses.append("(m.title LIKE ? OR m.artist LIKE ? OR m.creator LIKE ? "
+                               "OR b.version LIKE ? OR m.folder LIKE ?)")
+                params.extend([f"%{word}%"] * 5)
+        for name, (low, high) in (filters or {}).items():
+            column = RANGE_FILTERS[name]
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count_mapsets(self, search=None, filters=None):
+        where, params = self._where(search, filters)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT COUNT(DISTINCT m.folder) FROM mapsets m "
+                "LEFT JOIN beatmaps b ON b.folder = m.folder" + where, params
+            ).fetchone()
+        return row[0]
+
+    def query_mapsets(self, search=None, sort='folder', filters=None, offset=0, limit=100):
+        """Страница мапсетов: список (folder, title, artist, background)
+
+        filters - {'stars'|'length'|'bpm': (min, max)}, любая граница может быть None
+        """
+        where, params = self._where(search, filters)
+        order = SORT_KEYS[sort]
+        with self.lock:
+            return self.connection.execute(
+                "SELECT m.folder, m.title, m.artist, m.background FROM mapsets m "
+                "LEFT JOIN beatmaps b ON b.folder = m.folder" + where +
+                f" GROUP BY m.folder ORDER BY {order}, m.folder LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+    def mapset_position(self, folder, search=None, sort='folder', filters=None):
+        """Номер строки мапсета folder в выдаче query_mapsets или None, если его там нет"""
+        where, params = self._where(search, filters)
+        order = SORT_KEYS[sort]
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT position FROM (SELECT m.folder, "
+                f"ROW_NUMBER() OVER (ORDER BY {order}, m.folder) - 1 AS position FROM mapsets m "
+                "LEFT JOIN beatmaps b ON b.folder = m.folder" + where +
+                " GROUP BY m.folder) WHERE folder = ?",
+                params + [folder]
+            ).fetchone()
+        return row[0] if row else None
+
+    def query_beatmaps(self, folder):
+        """Сложности мапсета: список (path, version, stars, bpm, length_ms)"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT path, version, stars, bpm, length_ms FROM beatmaps "
+                "WHERE folder = ? ORDER BY stars, version", (folder,)
+            ).fetchall()
+
+
+class LibraryView:
+    """Результат запроса к Library как последовательность имён папок.
+
+    Строки подгружаются страницами по мере обращения, так что MapPull и Game
+    могут работать с ним как со списком, не читая весь индекс.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, library, search=None, sort='folder', filters=None):
+        self.library = library
+        self.search = search
+        self.sort = sort
+        self.filters = filters
+        self._pages = {}
+        self._count = None
+        self._generation = library.generation
+
+    def set_query(self, search=None, sort=None, filters=None):
+        self.search = search
+        if sort is not None:
+            self.sort = sort
+        self.filters = filters
+        self.invalidate()
+
+    def invalidate(self):
+        self._pages = {}
+        self._count = None
+        self._generation = self.library.generation
+
+    def _check_generation(self):
+        if self._generation != self.library.generation:
+            self.invalidate()
+
+    def __len__(self):
+        self._check_generation()
+        if self._count is None:
+            self._count = self.library.count_mapsets(self.search, self.filters)
+        return self._count
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def row(self, index):
+        """(folder, title, artist, background) для строки index"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        page_number = index // self.PAGE_SIZE
+        page = self._pages.get(page_number)
+        if page is None:
+            page = self.library.query_mapsets(
+                self.search, self.sort, self.filters,
+                offset=page_number * self.PAGE_SIZE, limit=self.PAGE_SIZE
+            )
+            self._pages[page_number] = page
+        return page[index - page_number * self.PAGE_SIZE]
+
+    def __getitem__(self, index):
+        return self.row(index)[0]
+
+    def position(self, folder):
+        """Текущая строка папки folder или None - строки сдвигаются при каждом изменении библиотеки"""
+        if folder is None:
+            return None
+        return self.library.mapset_position(folder, self.search, self.sort, self.filters)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
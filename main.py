@@ -2,7 +2,7 @@ import pygame
 from enum import Enum
 import sys
 import os
-import zipfile
+import time
 import unittest
 
 
@@ -12,7 +12,12 @@ from game_state import *
 from input_handler import *
 from env import *
 from map_pull import *
+from map_loader import *
 from settings_menu import *
+from library import Library, LibraryView, SORT_KEYS, parse_search
+from renderer import DirtyRenderer
+from profiler import *
+from audio_preview import PreviewPlayer, neighbours
 
 class GameStates(Enum):
     MAIN_MENU = 0
@@ -20,114 +25,152 @@ class GameStates(Enum):
     PLAYING = 2
     SETTINGS = 3
 
-# Инициализация Pygame
-pygame.init()
-pygame.mixer.init()
-pygame.font.init()
+class Game:
+    """Запуск в два этапа.
 
-class MapLoader:
-    @staticmethod
-    def process_maps_and_skins():
-        """Обработка .osz и .osk архивов из папки import"""
-        os.makedirs(IMPORT_DIR, exist_ok=True)
-        os.makedirs(MAPS_DIR, exist_ok=True)
-        os.makedirs(SKINS_DIR, exist_ok=True)
-        
-        for item in os.listdir(IMPORT_DIR):
-            item_path = os.path.join(IMPORT_DIR, item)
-            
-            # Обработка карт
-            if item.endswith(".osz"):
-                map_name = os.path.splitext(item)[0]
-                extract_path = os.path.join(MAPS_DIR, map_name)
-                
-                try:
-                    with zipfile.ZipFile(item_path, 'r') as zip_ref:
-                        zip_ref.extractall(extract_path)
-                    os.remove(item_path)
-                    print(f"Карта распакована: {map_name}")
-                except (zipfile.BadZipFile, PermissionError) as e:
-                    print(f"Ошибка распаковки карты {item}: {str(e)}")
-            
-            # Обработка скинов
-            elif item.endswith(".osk"):
-                skin_name = os.path.splitext(item)[0]
-                extract_path = os.path.join(SKINS_DIR, skin_name)
-                
-                try:
-                    with zipfile.ZipFile(item_path, 'r') as zip_ref:
-                        zip_ref.extractall(extract_path)
-                    os.remove(item_path)
-                    print(f"Скин распакован: {skin_name}")
-                except (zipfile.BadZipFile, PermissionError) as e:
-                    print(f"Ошибка распаковки скина {item}: {str(e)}")
+    __init__ делает только то, без чего не нарисовать меню: окно, шрифты,
+    меню и открытие индекса библиотеки. Всё остальное - звук, импорт,
+    сверка и сканирование библиотеки, звёзды, музыка превью - запускается
+    в start_background_tasks() после первого показанного кадра.
+    """
 
-class Game:
     def __init__(self):
-        self.maps = []
+        # Только видео и шрифты; звук инициализируется после первого кадра
+        pygame.display.init()
+        pygame.font.init()
+        self.library = Library()
+        self.maps = LibraryView(self.library)
         self.current_state = GameStates.MAIN_MENU
         self.screen = pygame.display.set_mode((1920, 1080), pygame.FULLSCREEN)
+        self.renderer = DirtyRenderer(self.screen, DIRTY_RECT_RENDERING)
+        self.profiler = FrameProfiler(PROFILER_ENABLED)
+        self.clock = pygame.time.Clock()
+        self.drawn_state = None
+        self.frames_drawn = 0
+        self.first_frame_time = None  # perf_counter() первого показанного кадра
         self.main_menu = MainMenu(*self.screen.get_size())
         self.map_pull = MapPull(*self.screen.get_size())
         self.settings_menu = SettingsMenu(*self.screen.get_size())
         
         # Инициализация новых атрибутов
         self.current_map_index = 0
+        self.current_map = None  # Папка выбранной карты: строки библиотеки сдвигаются при скане, импорте и звёздах
+        self.maps_generation = self.library.generation
         self.game_state = None
+        self.sim_loop = None
+        self.audio_clock = None
+        self.beatmap_path = None
+        self.saved_map_offset = 0
+        self.replay = None
+        self.import_job = None
+        self.star_job = None
+        self.preview = PreviewPlayer()
+        self.import_font = pygame.font.Font(None, 28)
         
-        self.load_maps()
+        # Превью грузятся лениво из draw - только для видимых карт
+        self.map_pull.load_previews(self.maps)
         
-        # Инициализация превью и аудио
-        if self.maps:
-            self.map_pull.load_previews(self.maps)
-            self.load_current_map_audio()
+    def start_background_tasks(self):
+        """Второй этап запуска - меню уже на экране"""
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init()
+            except pygame.error as e:
+                print(f"Ошибка инициализации звука: {str(e)}")
+        self.load_maps()
         
     def load_maps(self):
-        MapLoader.process_maps_and_skins()  # Переименованный метод
-        self.maps = [
-            d for d in os.listdir(MAPS_DIR)
-            if os.path.isdir(os.path.join(MAPS_DIR, d))
-        ]
+        # Модуль звёзд нужен только фоновой задаче
+        from star_rating import StarRatingJob
+        # Архивы распаковываются в фоне, карты попадают в библиотеку по мере готовности
+        self.import_job = MapLoader.start_import(self.library)
+        # Список папок сверяем сразу, заголовки карт читаем в фоне
+        self.library.sync_folders()
+        self.library.start_background_scan()
+        # Звёзды считаются после сканирования, в фоновых процессах
+        self.star_job = StarRatingJob(self.library).start()
         if self.maps:
+            self.select_map(self.current_map_index)
             self.load_current_map_audio()
+        elif not self.import_job:
+            print("Поместите .osz файлы в posu/import/ и перезапустите игру!")
             
-    def load_current_map_audio(self):
-        """Загружаем аудио текущей выбранной карты"""
+    def select_map(self, index):
+        self.current_map_index = index
+        self.current_map = self.maps[index] if 0 <= index < len(self.maps) else None
 
-        map_folder = os.path.join(MAPS_DIR, self.maps[self.current_map_index])
-        audio_path, _, _ = OsuParser.parse_map(map_folder)
-        if audio_path and os.path.isfile(audio_path):
-            try:
-                pygame.mixer.music.load(audio_path)
-                pygame.mixer.music.play(-1)  # Зацикливаем воспроизведение
-            except pygame.error as e:
-                print(f"Ошибка загрузки аудио: {str(e)}")
+    def follow_selection(self):
+        """Индексы выбранной карты и выделения заново по папкам после изменения библиотеки
+
+        Скан, импорт и запись звёзд меняют поколение Library, и LibraryView
+        перечитывает строки - по старому индексу оказалась бы другая карта.
+        """
+        if self.maps_generation == self.library.generation:
+            return
+        self.maps_generation = self.library.generation
+        index = self.maps.position(self.current_map)
+        if index is None:
+            # Карты больше нет в выдаче (или она ещё не выбиралась) - остаёмся на той же строке
+            index = max(0, min(self.current_map_index, len(self.maps) - 1))
+        self.select_map(index)
+        if self.map_pull.selected_index >= 0:
+            selected = self.maps.position(self.map_pull.selected_folder)
+            self.map_pull.select(-1 if selected is None else selected)
+            if selected is not None:
+                self.map_pull.center(selected)
+
+    def load_current_map_audio(self):
+        """Музыка выбранной карты; она и соседние треки читаются в фоне, играть начнёт PreviewPlayer"""
+        index = self.current_map_index
+        self.preview.request(self.maps[index], neighbours(self.maps, index))
                 
     def start_game(self):
         """Запуск игры с полным сбросом состояния"""
+        # Модули игрового процесса импортируются при первом запуске карты
+        from audio_clock import AudioClock
+        from fixed_step import FixedStepLoop
+        from hitsounds import HitSoundBank
+        from replay import ReplayRecorder, new_replay_path
+        from storyboard import Storyboard
+        from background import load_background
+        
+        if not self.maps:
+            return
+        self.finish_replay()
         # Создаем новое состояние игры
         self.game_state = GameState(self, self.settings_menu)
         
         # Загружаем данные карты
         map_folder = os.path.join(MAPS_DIR, self.maps[self.current_map_index])
-        audio_path, hit_objects, difficulty = OsuParser.parse_map(map_folder)
+        beatmap = OsuParser.load_beatmap(map_folder)
+        if beatmap is None:
+            print("Ошибка загрузки карты!")
+            return
+        audio_path = beatmap.audio_path
         
         # Настройка параметров сложности
-        self.game_state.ar = difficulty['ar']
-        self.game_state.cs = difficulty['cs']
-        self.game_state.overall_difficulty = difficulty['od']
-        self.game_state.update_metrics()
+        self.game_state.apply_difficulty(beatmap.difficulty)
         
-        # Сортируем объекты по времени
-        self.game_state.hit_objects = sorted(
-            hit_objects, 
-            key=lambda x: x['start_time']
-        )
-        
-        # Сброс таймера
-        self.game_state.start_time = pygame.time.get_ticks()
+        # Объекты уже отсортированы парсером, индексы слайдеров указывают на строки таблицы
+        self.game_state.set_hit_objects(beatmap.hit_objects, beatmap.sliders)
+        # Спрайты кругов под CS и AR карты и тела первых слайдеров - до первого кадра, а не в нём
+        self.game_state.build_atlas()
+        self.game_state.prepare_slider_bodies(0, None)
+        # Все хитсаунды карты декодируются до старта, а не при первом попадании
+        self.game_state.hitsounds = HitSoundBank(beatmap)
+        # Команды сторибоарда разбираются и компилируются один раз; текстуры начала - сейчас, остальные по ходу
+        if STORYBOARDS_ENABLED:
+            self.game_state.storyboard = Storyboard.load(beatmap, STORYBOARD_APPROXIMATE)
+        # Фон карты готовится один раз; в игре им стирается экран вместо заливки
+        storyboard = self.game_state.storyboard
+        self.game_state.background = load_background(beatmap, self.screen.get_size(), storyboard)
+        if storyboard is not None:
+            storyboard.background = self.game_state.background
+            storyboard.prepare(self.screen)
         
-        # Загрузка аудио
+        # Загрузка аудио; музыка превью не должна подменять время карты
+        self.preview.stop()
+        pygame.mixer.music.stop()
         if audio_path and os.path.exists(audio_path):
             try:
                 pygame.mixer.music.load(audio_path)
@@ -135,6 +178,19 @@ class Game:
             except Exception as e:
                 print(f"Audio error: {e}")
         
+        # Игровое время идёт по музыке (без неё - по системному таймеру)
+        self.beatmap_path = beatmap.path
+        self.audio_clock = AudioClock(
+            GLOBAL_AUDIO_OFFSET_MS,
+            self.library.get_offset(beatmap.path),
+            AUTO_CALIBRATE_OFFSET
+        )
+        self.game_state.audio_clock = self.audio_clock
+        self.saved_map_offset = self.audio_clock.map_offset
+        self.sim_loop = FixedStepLoop(SIMULATION_STEP_MS, start_time=self.audio_clock.time)
+        if RECORD_REPLAYS:
+            self.replay = ReplayRecorder(new_replay_path(beatmap.path), beatmap.path)
+        
         # Переход в игровое состояние
         self.current_state = GameStates.PLAYING
             
@@ -143,12 +199,20 @@ class Game:
         self.events = pygame.event.get()
         for event in self.events:
             if event.type == pygame.QUIT:
+                self.finish_replay()
                 pygame.quit()
                 sys.exit()
                 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE and self.current_state == GameStates.SETTINGS:
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                    self.renderer.invalidate()
+                elif event.key == pygame.K_F4:
+                    self.save_profile()
+                elif event.key == pygame.K_ESCAPE and self.current_state == GameStates.SETTINGS:
                     self.settings_menu.close_menu()
+                elif self.current_state == GameStates.MAP_SELECT:
+                    self.handle_search_key(event)
                     
             if self.current_state == GameStates.SETTINGS:
                 self.settings_menu.handle_key_event(event)
@@ -170,8 +234,9 @@ class Game:
                         self.settings_menu.open_menu()
                     elif result == "play":
                         self.current_state = GameStates.MAP_SELECT
-                        self.map_pull.selected_index = -1
+                        self.map_pull.select(-1)
                     elif result == "exit":
+                        self.finish_replay()
                         pygame.quit()
                         sys.exit()
                         
@@ -183,9 +248,7 @@ class Game:
                             
                             self.map_pull.update(scroll)
                             
-                            print(self.current_map_index)
-                            
-                            self.map_pull.selected_index = self.current_map_index
+                            self.map_pull.select(self.current_map_index)
                         
                             continue  # Пропускаем остальную обработку
 
@@ -194,85 +257,173 @@ class Game:
                             pos = pygame.mouse.get_pos()
                             if self.current_state == GameStates.MAP_SELECT:
                                 selected_map = self.map_pull.get_clicked_map(pos)
-                                if self.maps.index(selected_map) == self.current_map_index:
+                                if selected_map is None:
+                                    continue
+                                if self.map_pull.selected_index == self.current_map_index:
                                     self.start_game()
                                 else:
-                                    self.current_map_index = self.maps.index(selected_map)
+                                    self.select_map(self.map_pull.selected_index)
+                                    self.load_current_map_audio()
                                     
                         
                     
+    def handle_search_key(self, event):
+        """Поиск по библиотеке прямо с клавиатуры в выборе карт
+
+        Фильтры пишутся в строке поиска (stars>5 bpm<200 length<90), Tab меняет сортировку.
+        """
+        search = self.map_pull.search_text
+        if event.key == pygame.K_TAB:
+            order = list(SORT_KEYS)
+            self.map_pull.sort = order[(order.index(self.map_pull.sort) + 1) % len(order)]
+        elif event.key == pygame.K_BACKSPACE:
+            search = search[:-1]
+        elif event.unicode and event.unicode.isprintable():
+            search += event.unicode
+        else:
+            return
+        
+        self.map_pull.search_text = search
+        words, filters = parse_search(search)
+        self.maps.set_query(search=words, sort=self.map_pull.sort, filters=filters)
+        self.select_map(0)
+        self.map_pull.select(-1)
+        self.map_pull.target_scroll = 0
+        if self.maps:
+            self.load_current_map_audio()
+                    
+    def update_import(self):
+        """Прогресс фонового импорта; возвращает прямоугольник надписи или None"""
+        job = self.import_job
+        if not job:
+            return None
+        if job.is_running:
+            text = self.import_font.render(f"Импорт карт: {job.done}/{job.total}", True, (255, 255, 255))
+            return self.screen.blit(text, text.get_rect(topright=(self.screen.get_width() - 20, 20)))
+        self.import_job = None
+        # Новым картам тоже нужны звёзды
+        if self.star_job:
+            self.star_job.start()
+        return None
+            
+    def save_profile(self):
+        """Кадры профайлера в posu/profiles: трейс для chrome://tracing и JSON со сводкой"""
+        if not self.profiler.frames:
+            return
+        name = time.strftime('%Y-%m-%d %H-%M-%S')
+        self.profiler.export_chrome_trace(os.path.join(PROFILES_DIR, f"{name}.trace.json"))
+        self.profiler.export_json(os.path.join(PROFILES_DIR, f"{name}.json"))
+        print(f"Профиль сохранён: {name}")
+            
+    def finish_replay(self):
+        """Дописываем повтор прошлой игры на диск"""
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = None
+            
+    def save_calibrated_offset(self):
+        """Запоминаем оффсет карты, если автокалибровка его сдвинула"""
+        offset = self.audio_clock.map_offset
+        if offset != self.saved_map_offset:
+            self.library.set_offset(self.beatmap_path, offset)
+            self.saved_map_offset = offset
+            
     def draw_main_menu(self):
-        self.screen.fill((0, 0, 0))
-        self.main_menu.draw(self.screen)
+        self.renderer.clear()
+        return self.main_menu.draw(self.screen)
         
     def draw_settings_menu(self):
-        self.settings_menu.draw(self.screen)
+        # Панель рисуется поверх предыдущего экрана, поэтому без очистки
+        return self.settings_menu.draw(self.screen)
 
     def draw_map_select(self):
-        self.screen.fill((0, 0, 0))
-        self.map_pull.draw(self.screen)
+        self.renderer.clear()
+        return self.map_pull.draw(self.screen)
+
+    def draw_game(self, current_time):
+        self.renderer.clear()
+        return self.game_state.draw(self.screen, current_time)
         
         
-    def run(self, map_index=0):
-        if not self.maps:
-            print("Нет доступных карт в posu/maps/!")
-            return
+    def run(self):
+        while True:
+            self.frame()
             
-        map_folder = os.path.join(MAPS_DIR, self.maps[self.current_map_index])
-        audio_path, hit_objects, difficulty = OsuParser.parse_map(map_folder)
-        
-        
-        if not audio_path or not hit_objects:
-            print("Ошибка загрузки карты!")
-            return
+    def play_step(self, current_time):
+        """Ввод кадра и тики симуляции до current_time.
+
+        Нажатия кадра сделаны до current_time, поэтому оцениваются по состоянию
+        прошлого тика - до того, как тики кадра засчитают промахи по закрывшимся
+        окнам.
+        """
+        # Повтор пишется по событиям ввода: время, курсор и клавиши - как их оценил InputHandler
+        record = self.replay.record if self.replay is not None else None
+        InputHandler.handle_input(self.events, self.game_state, self.sim_loop.time, record)
+        self.profiler.mark(STAGE_INPUT)
+        for tick_time in self.sim_loop.steps(current_time):
+            self.game_state.update(tick_time)
+        self.profiler.mark(STAGE_UPDATE)
+
+    def frame(self):
+        """Один кадр: события, симуляция, отрисовка и вывод на экран"""
+        profiler = self.profiler
+        profiler.begin_frame()
+        # В игре отрисовка не привязана к шагу симуляции
+        dt = self.clock.tick(GAMEPLAY_FPS_LIMIT if self.current_state == GameStates.PLAYING else MENU_FPS_LIMIT)
+        profiler.mark(STAGE_WAIT)
+        current_time = 0
+        if self.current_state != GameStates.PLAYING:
+            self.follow_selection()
+        self.handle_events()
+        profiler.mark(STAGE_EVENTS)
+        # Новая сцена перерисовывается целиком
+        if self.current_state != self.drawn_state:
+            self.renderer.invalidate()
+            self.drawn_state = self.current_state
+            background = self.game_state.background if self.current_state == GameStates.PLAYING else None
+            self.renderer.set_background(background if background is not None else (0, 0, 0))
+        dirty = []
+        if self.current_state == GameStates.MAIN_MENU:
+            self.main_menu.update()
+            self.preview.update()
+            profiler.mark(STAGE_UPDATE)
+            dirty = self.draw_main_menu()
+        elif self.current_state == GameStates.MAP_SELECT:
+            self.preview.update()
+            profiler.mark(STAGE_UPDATE)
+            dirty = self.draw_map_select()
+        elif self.current_state == GameStates.PLAYING:
+            # Время кадра читается один раз; симуляция идёт тиками по SIMULATION_STEP_MS
+            current_time = self.audio_clock.tick()
+            self.play_step(current_time)
+            dirty = self.draw_game(current_time)
+            # Тела скорых слайдеров - на остаток кадра, чтобы в кадре появления был только blit
+            self.game_state.prepare_slider_bodies(current_time)
+            self.save_calibrated_offset()
+        elif self.current_state == GameStates.SETTINGS:
+            self.settings_menu.update()
+            self.settings_menu.load_skins()
+            profiler.mark(STAGE_UPDATE)
+            dirty = self.draw_settings_menu()
+        if self.current_state == GameStates.SETTINGS and self.settings_menu.state == "closed":
+            self.current_state = GameStates.MAIN_MENU
+        if self.current_state != GameStates.PLAYING:
+            import_rect = self.update_import()
+            if import_rect and dirty is not None:
+                dirty.append(import_rect)
+        profiler_rect = profiler.draw(self.screen)
+        if profiler_rect and dirty is not None:
+            dirty.append(profiler_rect)
+        profiler.mark(STAGE_DRAW)
         
-        game_state = GameState(game, self.settings_menu)
-        game_state.ar = difficulty['ar']
-        game_state.cs = difficulty['cs']
-        game_state.hp_drain_rate = difficulty['hp']
-        game_state.overall_difficulty = difficulty['od']
-        game_state.slider_multiplier = difficulty['slider_multiplier']
-        game_state.slider_tick_rate = difficulty['slider_tick_rate']
-        game_state.update_metrics()
-        screen = pygame.display.set_mode(game_state.WH, pygame.FULLSCREEN)
-        clock = pygame.time.Clock()
-        game_state.hit_objects = hit_objects
-        game_state.start_time = pygame.time.get_ticks()
+        self.renderer.present(dirty)
+        profiler.mark(STAGE_PRESENT)
+        profiler.end_frame()
         
-        # Загрузка аудио
-        try:
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-        except pygame.error as e:
-            print(f"Ошибка загрузки аудио: {str(e)}")
-            return
-            
-        running = True
-        while running:
-            dt = clock.tick(120)
-            current_time = 0
-            self.handle_events()
-            if self.current_state == GameStates.MAIN_MENU:
-                self.main_menu.update()
-                self.draw_main_menu()
-            elif self.current_state == GameStates.MAP_SELECT:
-                self.draw_map_select()
-            elif self.current_state == GameStates.PLAYING:
-                # Обновление и отрисовка игрового процесса
-                current_time = pygame.time.get_ticks() - self.game_state.start_time
-                self.game_state.update(current_time)
-                InputHandler.handle_input(self.events, self.game_state, current_time)  
-                self.game_state.draw(self.screen)
-            elif self.current_state == GameStates.SETTINGS:
-                self.settings_menu.update()
-                self.settings_menu.load_skins()
-                self.draw_settings_menu()
-            if self.current_state == GameStates.SETTINGS and self.settings_menu.state == "closed":
-                self.current_state = GameStates.MAIN_MENU
-                
-                
-            
-            pygame.display.flip()
+        self.frames_drawn += 1
+        if self.frames_drawn == 1:
+            self.first_frame_time = time.perf_counter()
+            self.start_background_tasks()
             
 if __name__ == "__main__":
     # Запуск тестов
@@ -287,7 +438,4 @@ if __name__ == "__main__":
             
     # Запуск игры
     game = Game()
-    if game.maps:
-        game.run(map_index=0)
-    else:
-        print("Поместите .osz файлы в posu/maps/ и перезапустите игру!")
\ No newline at end of file
+    game.run()
\ No newline at end of file
@@ -51,12 +51,13 @@ class MainMenu:
             btn['visible'] = self.animation_progress > 0
 
     def draw(self, screen):
+        """Рисует меню, возвращает нарисованные прямоугольники"""
         # Рисуем главную кнопку
-        pygame.draw.circle(screen, 
+        rects = [pygame.draw.circle(screen, 
                          self.main_button['color'], 
                          self.main_button['rect'].center, 
                          self.main_button['rect'].width//2,
-                         2)
+                         2)]
 
         # Рисуем второстепенные кнопки
         font = pygame.font.Font(None, 36)
@@ -64,7 +65,8 @@ class MainMenu:
             if btn['visible']:
                 text = font.render(btn['text'], True, BUTTON_COLOR)
                 text_rect = text.get_rect(center=btn['pos'])
-                screen.blit(text, text_rect)
+                rects.append(screen.blit(text, text_rect))
+        return rects
 
     def handle_click(self, pos):
         font = pygame.font.Font(None, 36)
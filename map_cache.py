@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import zipfile
+import numpy as np
+from env import CACHE_DIR
+from hit_objects import HitObjectTable
+
+
+# Увеличиваем при изменении формата, старые записи тогда просто не читаются
+CACHE_VERSION = 3
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Колонки хитсаундов HitObjectTable, которые тоже хранятся в кэше
+SOUND_COLUMNS = ('hit_sound', 'normal_set', 'addition_set', 'sample_index', 'sample_volume')
+
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class MapCache:
+    """Дисковый кэш разобранных .osu файлов.
+
+    Каждая карта хранится в отдельном .npz с колонками HitObjectTable и
+    JSON-метаданными. Запись считается актуальной, если совпадают размер и
+    mtime исходника, а если нет - то SHA-1 его содержимого. mtime файла
+    кэша обновляется при каждом чтении и служит меткой для LRU-вытеснения.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, osu_path):
+        key = hashlib.sha1(os.path.abspath(osu_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def load(self, osu_path):
+        """Возвращает (meta, hit_objects) или None, если записи нет или она устарела"""
+        entry_path = self._entry_path(osu_path)
+        if not os.path.isfile(entry_path):
+            return None
+        try:
+            stat = os.stat(osu_path)
+            with np.load(entry_path) as data:
+                columns = {name: data[name] for name in data.files}
+            meta = json.loads(columns.pop('meta').tobytes().decode('utf-8'))
+            if meta.get('version') != CACHE_VERSION:
+                return None
+            if (meta['size'], meta['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+                # Файл трогали - сверяем содержимое
+                if meta['sha1'] != file_sha1(osu_path):
+                    return None
+                meta['size'], meta['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+                self._write(entry_path, meta, columns)
+            else:
+                os.utime(entry_path)  # Отметка для LRU
+            hit_objects = HitObjectTable(
+                columns['x'], columns['y'], columns['start_time'],
+                columns['end_time'], columns['type'],
+                **{name: columns[name] for name in SOUND_COLUMNS}
+            )
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        return meta, hit_objects
+
+    def store(self, osu_path, meta, hit_objects):
+        """Сохраняет разобранную карту; meta - словарь, сериализуемый в JSON"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            stat = os.stat(osu_path)
+            meta = dict(meta, version=CACHE_VERSION, size=stat.st_size,
+                        mtime_ns=stat.st_mtime_ns, sha1=file_sha1(osu_path))
+            columns = {
+                'x': hit_objects.x,
+                'y': hit_objects.y,
+                'start_time': hit_objects.start_time,
+                'end_time': hit_objects.end_time,
+                'type': hit_objects.type,
+            }
+            columns.update({name: getattr(hit_objects, name) for name in SOUND_COLUMNS})
+            self._write(self._entry_path(osu_path), meta, columns)
+            self.evict()
+        except OSError as e:
+            print(f"Ошибка записи кэша карты: {str(e)}")
+
+    def _write(self, entry_path, meta, columns):
+        # Пишем во временный файл и подменяем, чтобы не оставить битую запись
+        tmp_path = entry_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+                **columns
+            )
+        os.replace(tmp_path, entry_path)
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+
+map_cache = MapCache()
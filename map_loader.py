@@ -0,0 +1,163 @@
+import os
+import zipfile
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from env import *
+
+
+def archive_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def extract_archive(item_path, target_dir):
+    """Распаковка одного архива (выполняется в отдельном процессе).
+
+    Возвращает (статус, имя папки): статус - 'extracted' или 'failed'.
+    """
+    name = os.path.splitext(os.path.basename(item_path))[0]
+    try:
+        with zipfile.ZipFile(item_path, 'r') as zip_ref:
+            zip_ref.extractall(os.path.join(target_dir, name))
+        os.remove(item_path)
+        return 'extracted', name
+    except (zipfile.BadZipFile, OSError) as e:
+        print(f"Ошибка распаковки {os.path.basename(item_path)}: {str(e)}")
+        return 'failed', name
+
+
+class ImportJob:
+    """Фоновый импорт архивов из IMPORT_DIR через пул процессов.
+
+    Процессы считают SHA-1 архивов и распаковывают их, а сверка с уже
+    импортированными хэшами идёт здесь, до распаковки: одинаковые архивы
+    одной пачки распаковываются один раз, остальные ждут его исхода.
+    """
+
+    def __init__(self, archives, library=None, max_workers=None):
+        self.archives = archives
+        self.library = library
+        self.max_workers = max_workers
+        self.total = len(archives)
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.thread = None
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        known_hashes = self.library.imported_hashes() if self.library else set()
+        duplicates = {}  # хэш распаковываемого архива -> архивы с тем же содержимым
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            # future -> (архив, папка назначения, хэш); хэш None - future считает хэш
+            pending = {pool.submit(archive_sha1, path): (path, target_dir, None)
+                       for path, target_dir in self.archives}
+            while pending:
+                finished, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, target_dir, content_hash = pending.pop(future)
+                    if content_hash is None:
+                        self._hashed(pool, pending, future, path, target_dir, known_hashes, duplicates)
+                    else:
+                        self._extracted(pool, pending, future, target_dir, content_hash, known_hashes, duplicates)
+
+    def _hashed(self, pool, pending, future, path, target_dir, known_hashes, duplicates):
+        try:
+            content_hash = future.result()
+        except Exception as e:
+            print(f"Ошибка импорта: {str(e)}")
+            self.failed += 1
+            self.done += 1
+            return
+        if content_hash in known_hashes:
+            # Такой архив уже импортировали - просто убираем его
+            self._skip(path)
+        elif content_hash in duplicates:
+            duplicates[content_hash].append((path, target_dir))
+        else:
+            duplicates[content_hash] = []
+            pending[pool.submit(extract_archive, path, target_dir)] = (path, target_dir, content_hash)
+
+    def _extracted(self, pool, pending, future, target_dir, content_hash, known_hashes, duplicates):
+        try:
+            status, name = future.result()
+        except Exception as e:
+            print(f"Ошибка импорта: {str(e)}")
+            status, name = 'failed', None
+        self.done += 1
+        if status != 'extracted':
+            self.failed += 1
+            # Копия того же архива - следующая попытка
+            if duplicates[content_hash]:
+                path, target_dir = duplicates[content_hash].pop(0)
+                pending[pool.submit(extract_archive, path, target_dir)] = (path, target_dir, content_hash)
+            else:
+                del duplicates[content_hash]
+            return
+        print(f"Архив распакован: {name}")
+        known_hashes.add(content_hash)
+        if self.library is not None:
+            # Карта сразу появляется в выборе карт; хэш запоминается и для скинов
+            if target_dir == self.library.maps_dir:
+                self.library.scan_folder(name)
+            self.library.add_imported_hash(content_hash, name)
+        for path, _ in duplicates.pop(content_hash):
+            self._skip(path)
+
+    def _skip(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Ошибка удаления {os.path.basename(path)}: {str(e)}")
+        self.skipped += 1
+        self.done += 1
+
+    def wait(self):
+        if self.thread:
+            self.thread.join()
+
+
+class MapLoader:
+    @staticmethod
+    def find_archives():
+        """Архивы карт (.osz) и скинов (.osk) в папке import с папкой назначения"""
+        os.makedirs(IMPORT_DIR, exist_ok=True)
+        os.makedirs(MAPS_DIR, exist_ok=True)
+        os.makedirs(SKINS_DIR, exist_ok=True)
+
+        archives = []
+        for item in sorted(os.listdir(IMPORT_DIR)):
+            item_path = os.path.join(IMPORT_DIR, item)
+            if item.endswith(".osz"):
+                archives.append((item_path, MAPS_DIR))
+            elif item.endswith(".osk"):
+                archives.append((item_path, SKINS_DIR))
+        return archives
+
+    @staticmethod
+    def start_import(library=None, max_workers=None):
+        """Запускает импорт в фоне; возвращает ImportJob (или None, если импортировать нечего)"""
+        archives = MapLoader.find_archives()
+        if not archives:
+            return None
+        return ImportJob(archives, library, max_workers).start()
+
+    @staticmethod
+    def process_maps_and_skins(library=None):
+        """Обработка .osz и .osk архивов из папки import (с ожиданием окончания)"""
+        job = MapLoader.start_import(library)
+        if job:
+            job.wait()
+        return job
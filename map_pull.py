@@ -1,8 +1,13 @@
 import pygame
 import os
 from env import *
-import threading
 import math
+from collections import OrderedDict
+from thumbnails import ThumbnailLoader
+
+
+SCALE_STEP = 0.02         # Шаг квантования масштаба превью
+SCALED_CACHE_SIZE = 64    # Сколько отмасштабированных превью держим
 
 
 class MapPull:
@@ -10,17 +15,19 @@ class MapPull:
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.maps = []
-        self.previews = {}
-        self.loading_thread = None
+        self.search_text = ""
+        self.sort = 'folder'      # Ключ сортировки библиотеки (library.SORT_KEYS), Tab меняет
+        self.font = pygame.font.Font(None, 36)
         self.scroll_offset = 0
         self.max_scroll = 0
         
         self.target_scroll = 0
         self.current_scroll = 0
-        self.animation_speed = 0.025
+        self.animation_speed = 0.2  # Доля пути до target_scroll за кадр
         self.item_spacing = 10
         self.scroll_speed = 1  # Количество карт за прокрутку
         self.selected_index = -1
+        self.selected_folder = None  # Папка выбранной строки - по ней строка находится после изменения библиотеки
         self.is_animating = False
 
         # Параметры отображения
@@ -30,43 +37,34 @@ class MapPull:
         self.base_scale = 0.5
         self.selected_scale = 1.0
         
+        # Превью грузятся пулом потоков по мере появления карт на экране
+        self.thumbnails = ThumbnailLoader((self.item_width, self.item_height), self.find_preview_image)
+        # (папка, шаг масштаба) -> (исходное превью, отмасштабированное)
+        self.scaled_previews = OrderedDict()
+        self.stars_font = pygame.font.Font(None, 28)
+        # папка -> (поколение библиотеки, надпись со звёздами сложностей)
+        self.star_labels = {}
+        
     def _max_scroll(self):
         return max(0, len(self.maps)*(self.item_height + self.item_spacing) - self.screen_height)
 
     def load_previews(self, maps):
+        # Сами превью грузятся лениво из draw - только для видимых карт
         self.maps = maps
-        for map_folder in maps:
-            map_path = os.path.join(MAPS_DIR, map_folder)
-            preview_path = self.find_preview_image(map_path)
-            if preview_path:
-                self.load_preview_async(map_folder, preview_path)
-
-    def find_preview_image(self, map_path):
-        # Без изменений из предыдущей версии
+
+    def find_preview_image(self, map_folder, background=None):
+        # Вызывается из потоков ThumbnailLoader
+        map_path = os.path.join(MAPS_DIR, map_folder)
+        # Фон уже известен из индекса библиотеки - папку не читаем
+        if background:
+            path = os.path.join(map_path, background)
+            if os.path.isfile(path):
+                return path
         for f in os.listdir(map_path):
             if f.lower().endswith(('.png', '.jpg', '.jpeg')):
                 return os.path.join(map_path, f)
         return None
 
-    def load_preview_async(self, map_name, path):
-        # Без изменений из предыдущей версии
-        if map_name not in self.previews:
-            self.previews[map_name] = None
-            self.loading_thread = threading.Thread(
-                target=self._load_preview_thread,
-                args=(map_name, path)
-            )
-            self.loading_thread.start()
-
-    def _load_preview_thread(self, map_name, path):
-        # Без изменений из предыдущей версии
-        try:
-            image = pygame.image.load(path)
-            image = pygame.transform.scale(image, (self.item_width, self.item_height))
-            self.previews[map_name] = image
-        except Exception as e:
-            print(f"Ошибка загрузки превью: {str(e)}")
-
     def update(self, scroll_delta):
         scroll_step = scroll_delta * (self.item_height + self.item_spacing) * self.scroll_speed
         if not self.is_animating:
@@ -79,15 +77,31 @@ class MapPull:
         
 
     def draw(self, screen):
+        """Рисует список, возвращает нарисованные прямоугольники"""
+        self.thumbnails.begin_frame()
+        rects = []
+        
+        if self.search_text:
+            search = self.font.render(f"Search: {self.search_text}", True, (255, 255, 255))
+            rects.append(screen.blit(search, (20, 20)))
+        if self.search_text or self.sort != 'folder':
+            sort = self.stars_font.render(f"Sort: {self.sort} (Tab)", True, (200, 200, 200))
+            rects.append(screen.blit(sort, (20, 56)))
+            
         if not self.maps:
-            return
+            return rects
+
+        # Интерполяция прокрутки - один шаг за кадр
+        self.current_scroll += (self.target_scroll - self.current_scroll) * self.animation_speed
+        self.is_animating = abs(self.target_scroll - self.current_scroll) > 1.0
 
         center_y = self.screen_height // 2
-        half_height = self.screen_height // 2
         
-        for i, map_folder in enumerate(self.maps):
+        # Рисуем только карты, попадающие в окно
+        for i in range(*self.visible_range()):
+            map_folder = self.maps[i]
             # Позиция с учетом анимации
-            y_pos = i * (self.item_height + self.item_spacing) - self.current_scroll
+            y_pos = i * self.item_step - self.current_scroll
             item_center_y = y_pos + self.item_height//2
             
             # Нелинейный масштаб
@@ -99,23 +113,73 @@ class MapPull:
                 scale = self.selected_scale + 0.1 * math.sin(pygame.time.get_ticks() / 200)
                 
             # Отрисовка карты
-            self.draw_map_item(screen, map_folder, i, y_pos, scale)
-            
-            self.current_scroll += (self.target_scroll - self.current_scroll) * self.animation_speed
-            self.is_animating = abs(self.target_scroll - self.current_scroll) > 1.0
+            rect = self.draw_map_item(screen, map_folder, i, y_pos, scale)
+            if rect:
+                rects.append(rect)
+        return rects
+
+    @property
+    def item_step(self):
+        return self.item_height + self.item_spacing
+
+    def visible_range(self):
+        """Индексы [first, last) карт, которые видны при текущей прокрутке"""
+        first = max(0, int(self.current_scroll // self.item_step))
+        last = min(len(self.maps), int((self.current_scroll + self.screen_height) // self.item_step) + 1)
+        return first, max(first, last)
+
+    def get_scaled_preview(self, map_folder, preview, scale):
+        """Превью в масштабе, округлённом до SCALE_STEP (из кэша, если есть)"""
+        step = round(scale / SCALE_STEP)
+        key = (map_folder, step)
+        cached = self.scaled_previews.get(key)
+        if cached and cached[0] is preview:
+            self.scaled_previews.move_to_end(key)
+            return cached[1]
+        
+        scale = step * SCALE_STEP
+        scaled = pygame.transform.scale(preview, (int(self.item_width * scale), int(self.item_height * scale)))
+        self.scaled_previews[key] = (preview, scaled)
+        if len(self.scaled_previews) > SCALED_CACHE_SIZE:
+            self.scaled_previews.popitem(last=False)
+        return scaled
 
     
     
+    def get_star_label(self, map_folder):
+        """Надпись с диапазоном звёзд мапсета; перерисовывается, когда меняется библиотека"""
+        library = getattr(self.maps, 'library', None)
+        if library is None:
+            return None
+        cached = self.star_labels.get(map_folder)
+        if cached and cached[0] == library.generation:
+            return cached[1]
+        
+        stars = [row[2] for row in library.query_beatmaps(map_folder) if row[2] is not None]
+        if not stars:
+            text = "..."
+        elif min(stars) == max(stars):
+            text = f"{stars[0]:.2f} stars"
+        else:
+            text = f"{min(stars):.2f} - {max(stars):.2f} stars"
+        label = self.stars_font.render(text, True, (255, 255, 255), (0, 0, 0))
+        self.star_labels[map_folder] = (library.generation, label)
+        return label
+    
     def ease_out_quad(self, t):
         return t*(2-t)
     
     def draw_map_item(self, screen, map_folder, index, y_pos, scale):
         x = self.screen_width - self.item_width - self.right_margin
-        scaled_w = int(self.item_width * scale)
-        scaled_h = int(self.item_height * scale)
         
-        if self.previews.get(map_folder):
-            scaled_preview = pygame.transform.scale(self.previews[map_folder], (scaled_w, scaled_h))
+        preview = self.thumbnails.get(map_folder)
+        if preview is None:
+            # Ближние к центру экрана карты грузятся первыми
+            priority = abs(y_pos + self.item_height // 2 - self.screen_height // 2)
+            self.thumbnails.request(map_folder, priority, map_folder, self.maps.row(index)[3])
+        else:
+            scaled_preview = self.get_scaled_preview(map_folder, preview, scale)
+            scaled_w = scaled_preview.get_width()
             rect = scaled_preview.get_rect()
             rect.x = x + (self.item_width - scaled_w) // 2
             rect.y = y_pos
@@ -123,20 +187,33 @@ class MapPull:
             
             if index == self.selected_index:
                 pygame.draw.rect(screen, (255, 215, 0), rect, 3)
+            
+            label = self.get_star_label(map_folder)
+            if label is not None:
+                label_rect = screen.blit(label, (rect.x + 8, rect.bottom - label.get_height() - 8))
+                rect = rect.union(label_rect)
+            return rect
                 
                 
     def get_clicked_map(self, mouse_pos):
-        for i, map_folder in enumerate(self.maps):
-            y_pos = i * (self.item_height + self.item_spacing) - self.current_scroll
-            rect = pygame.Rect(
-                self.screen_width - self.item_width - self.right_margin,
-                y_pos,
-                self.item_width,
-                self.item_height
-            )
-            if rect.collidepoint(mouse_pos):
-                # Анимируем к центру
-                self.selected_index = i
-                self.target_scroll = i * (self.item_height + self.item_spacing) - (self.screen_height//2 - self.item_height//2)
-                return map_folder
-        return None
+        # Индекс карты считаем прямо из прокрутки, без перебора
+        x = self.screen_width - self.item_width - self.right_margin
+        if not x <= mouse_pos[0] < x + self.item_width:
+            return None
+        offset = mouse_pos[1] + self.current_scroll
+        i = int(offset // self.item_step)
+        if offset < 0 or i >= len(self.maps) or offset - i * self.item_step >= self.item_height:
+            return None
+        
+        self.select(i)
+        self.center(i)
+        return self.maps[i]
+
+    def select(self, index):
+        """Выделяет строку index (-1 - ничего)"""
+        self.selected_index = index
+        self.selected_folder = self.maps[index] if 0 <= index < len(self.maps) else None
+
+    def center(self, index):
+        # Анимируем к центру
+        self.target_scroll = index * self.item_step - (self.screen_height//2 - self.item_height//2)
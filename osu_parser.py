@@ -1,92 +1,422 @@
 import os
+import bisect
+from typing import NamedTuple
+from hit_objects import HitObjectTable, TYPE_CIRCLE, TYPE_SLIDER, TYPE_SPINNER
+from map_cache import map_cache
+
+
+# Секции, которых достаточно для списка карт (идут в начале файла)
+HEADER_SECTIONS = ('General', 'Metadata', 'Difficulty')
+# Для индекса библиотеки нужны ещё фон и BPM
+LIBRARY_SECTIONS = HEADER_SECTIONS + ('Events', 'TimingPoints')
+
+DEFAULT_DIFFICULTY = {
+    'hp': 5.0,
+    'ar': 9.0,
+    'cs': 4.0,
+    'od': 8.0,
+    'slider_multiplier': 1.0,
+    'slider_tick_rate': 1.0
+}
+
+DIFFICULTY_KEYS = {
+    'HPDrainRate': 'hp',
+    'CircleSize': 'cs',
+    'OverallDifficulty': 'od',
+    'ApproachRate': 'ar',
+    'SliderMultiplier': 'slider_multiplier',
+    'SliderTickRate': 'slider_tick_rate',
+}
+
+
+class TimingPoint(NamedTuple):
+    time: float
+    beat_length: float
+    meter: int
+    sample_set: int
+    sample_index: int
+    volume: int
+    uninherited: bool
+    effects: int
+
+
+class SliderRecord(NamedTuple):
+    index: int       # Строка в HitObjectTable
+    curve_type: str  # B - Безье, P - дуга окружности, L - линия, C - Catmull
+    points: list     # Контрольные точки в координатах osu! (начиная с головы слайдера)
+    slides: int
+    length: float
+
+
+class SpinnerRecord(NamedTuple):
+    index: int
+    start_time: int
+    end_time: int
+
+
+class Beatmap:
+    """Одна сложность (.osu файл) со всеми разобранными секциями"""
+
+    def __init__(self, path):
+        self.path = path
+        self.folder = os.path.dirname(path)
+        self.general = {}
+        self.metadata = {}
+        self.difficulty = dict(DEFAULT_DIFFICULTY)
+        self.events = {'background': None, 'video': None, 'breaks': [], 'storyboard': []}
+        self.timing_points = []
+        self.hit_objects = HitObjectTable.empty()
+        self.sliders = []
+        self.spinners = []
+
+    @property
+    def audio_path(self):
+        return OsuParser.resolve_file(self.folder, self.general.get('AudioFilename'))
+
+    def main_bpm(self, end_time=None):
+        """BPM "красной" точки, которая действует дольше всех до end_time"""
+        red = [tp for tp in self.timing_points if tp.uninherited and tp.beat_length > 0]
+        if not red:
+            return None
+        if end_time is None:
+            end_time = int(self.hit_objects.end_time.max()) if len(self.hit_objects) else 0
+        end = max(red[-1].time, end_time)
+        spans = [(nxt.time - tp.time, tp) for tp, nxt in zip(red, red[1:])]
+        spans.append((end - red[-1].time, red[-1]))
+        _, longest = max(spans, key=lambda span: span[0])
+        return 60000.0 / longest.beat_length
+
+    def to_meta(self):
+        """Всё, кроме колонок хит-объектов, в виде JSON-совместимого словаря"""
+        return {
+            'general': self.general,
+            'metadata': self.metadata,
+            'difficulty': self.difficulty,
+            'events': self.events,
+            'timing_points': [list(tp) for tp in self.timing_points],
+            'sliders': [list(s) for s in self.sliders],
+            'spinners': [list(s) for s in self.spinners],
+        }
+
+    @classmethod
+    def from_meta(cls, path, meta, hit_objects):
+        beatmap = cls(path)
+        beatmap.general = meta['general']
+        beatmap.metadata = meta['metadata']
+        beatmap.difficulty = meta['difficulty']
+        beatmap.events = meta['events']
+        beatmap.timing_points = [TimingPoint(*tp) for tp in meta['timing_points']]
+        beatmap.sliders = [SliderRecord(*s) for s in meta['sliders']]
+        beatmap.spinners = [SpinnerRecord(*s) for s in meta['spinners']]
+        beatmap.hit_objects = hit_objects
+        return beatmap
 
 
 class OsuParser:
     @staticmethod
     def parse_map(map_folder):
-        osu_files = [f for f in os.listdir(map_folder) if f.endswith(".osu")]
+        """Первая сложность в папке: (путь к аудио, круги, сложность)"""
+        beatmap = OsuParser.load_beatmap(map_folder)
+        if beatmap is None:
+            return None, HitObjectTable.empty(), dict(DEFAULT_DIFFICULTY)
+
+        # Старый API отдаёт только круги - слайдерам нужны записи из Beatmap
+        objs = beatmap.hit_objects
+        circles = objs.take((objs.type & TYPE_CIRCLE) != 0)
+        return beatmap.audio_path, circles, beatmap.difficulty
+
+    @staticmethod
+    def load_beatmap(map_folder):
+        """Первая сложность в папке целиком (Beatmap) или None"""
+        osu_files = OsuParser.list_osu_files(map_folder)
         if not osu_files:
-            return None, [], {'hp':5.0, 'ar':9.0, 'cs':4.0, 'od':8.0, 'slider_multiplier':1.0, 'slider_tick_rate':1.0}
-
-        osu_path = os.path.join(map_folder, osu_files[0])
-        audio_file = None
-        hit_objects = []
-        difficulty = {
-            'hp': 5.0,
-            'ar': 9.0,
-            'cs': 4.0,
-            'od': 8.0,
-            'slider_multiplier': 1.0,
-            'slider_tick_rate': 1.0
-        }
-        current_section = None
+            return None
+        return OsuParser.parse_file(os.path.join(map_folder, osu_files[0]))
+
+    @staticmethod
+    def parse_mapset(map_folder, sections=None):
+        """Все сложности мапсета за один вызов (sections - см. parse_file)"""
+        beatmaps = []
+        for name in OsuParser.list_osu_files(map_folder):
+            beatmap = OsuParser.parse_file(os.path.join(map_folder, name), sections)
+            if beatmap is not None:
+                beatmaps.append(beatmap)
+        return beatmaps
+
+    @staticmethod
+    def read_headers(map_folder):
+        """Только [General], [Metadata] и [Difficulty] каждой сложности"""
+        return OsuParser.parse_mapset(map_folder, HEADER_SECTIONS)
 
+    @staticmethod
+    def list_osu_files(map_folder):
+        return sorted(f for f in os.listdir(map_folder) if f.endswith(".osu"))
+
+    @staticmethod
+    def resolve_file(map_folder, file_name):
+        """Путь к файлу из .osu относительно папки карты (без учёта регистра) или None"""
+        if not file_name:
+            return None
+        path = os.path.join(map_folder, file_name)
+        if os.path.isfile(path):
+            return path
+        # Карты часто делают на Windows, где регистр имён не важен
+        lowered = file_name.lower()
+        try:
+            for name in os.listdir(map_folder):
+                if name.lower() == lowered:
+                    return os.path.join(map_folder, name)
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def read_last_object_time(osu_path):
+        """Время последнего хит-объекта - читаем только хвост файла"""
         try:
-            with open(osu_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
+            with open(osu_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 4096))
+                tail = f.read().decode('utf-8', errors='ignore').splitlines()
+        except OSError:
+            return None
+        for line in reversed(tail):
+            parts = line.split(',')
+            if len(parts) >= 4:
+                try:
+                    return int(parts[2])
+                except ValueError:
+                    continue
+        return None
+
+    @staticmethod
+    def iter_sections(lines):
+        """Лениво разбивает строки файла на пары (секция, строка)"""
+        section = None
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            if stripped.startswith('[') and stripped.endswith(']'):
+                section = stripped[1:-1]
+                yield section, None
+                continue
+            # Отступы значимы для команд сторибоарда, поэтому слева не обрезаем
+            yield section, line.rstrip()
+
+    @staticmethod
+    def parse_file(osu_path, sections=None):
+        """Разбирает .osu файл в Beatmap.
+
+        sections - какие секции нужны (по умолчанию все). Чтение прекращается,
+        как только все запрошенные секции прочитаны.
+        """
+        if sections is None:
+            # Повторная загрузка - берём уже разобранную карту из кэша
+            cached = map_cache.load(osu_path)
+            if cached:
+                meta, hit_objects = cached
+                return Beatmap.from_meta(osu_path, meta, hit_objects)
+
+        beatmap = Beatmap(osu_path)
+        remaining = set(sections) if sections is not None else None
+        objects = _HitObjectBuilder(beatmap)
+        has_approach_rate = False
+
+        try:
+            with open(osu_path, 'r', encoding='utf-8-sig') as f:
+                for section, line in OsuParser.iter_sections(f):
+                    if line is None:
+                        # Началась новая секция - возможно, всё нужное уже прочитано
+                        if remaining is not None:
+                            if not remaining:
+                                break
+                            remaining.discard(section)
+                        continue
+                    if remaining is not None and section not in sections:
                         continue
 
-                    if line.startswith('AudioFilename:'):
-                        audio_file = line.split(':')[1].strip()
-                    elif line.startswith('[Difficulty]'):
-                        current_section = 'difficulty'
-                    elif line.startswith('[HitObjects]'):
-                        current_section = 'hitobjects'
-                    elif line.startswith('['):
-                        current_section = None
-
-                    if current_section == 'difficulty':
-                        if line.startswith('HPDrainRate'):
-                            difficulty['hp'] = float(line.split(':')[1].strip())
-                        elif line.startswith('CircleSize'):
-                            difficulty['cs'] = float(line.split(':')[1].strip())
-                        elif line.startswith('OverallDifficulty'):
-                            difficulty['od'] = float(line.split(':')[1].strip())
-                        elif line.startswith('ApproachRate'):
-                            difficulty['ar'] = float(line.split(':')[1].strip())
-                        elif line.startswith('SliderMultiplier'):
-                            difficulty['slider_multiplier'] = float(line.split(':')[1].strip())
-                        elif line.startswith('SliderTickRate'):
-                            difficulty['slider_tick_rate'] = float(line.split(':')[1].strip())
-
-                    if current_section == 'hitobjects' and line:
-                        parts = line.split(',')
-                        if len(parts) < 4:
-                            continue
-                        
-                        try:
-                            obj_type = int(parts[3])
-                            if obj_type & 1:  # Circle
-                                hit_objects.append({
-                                    'type': 'circle',
-                                    'x': int(int(parts[0]) / 512*1920),
-                                    'y': int(int(parts[1]) / 384*1080),
-                                    'start_time': int(parts[2]),
-                                    'end_time': int(parts[2]) + 100,
-                                    'hit': False,  # Добавляем начальное состояние
-                                    'hit_time': 0,
-                                    'start_time': int(parts[2]),
-                                    'end_time': int(parts[2]) + 100
-                                })
-                        except (ValueError, IndexError):
-                            continue
+                    if section in ('General', 'Metadata'):
+                        key, _, value = line.partition(':')
+                        target = beatmap.general if section == 'General' else beatmap.metadata
+                        target[key.strip()] = value.strip()
+
+                    elif section == 'Difficulty':
+                        key, _, value = line.partition(':')
+                        key = DIFFICULTY_KEYS.get(key.strip())
+                        if key:
+                            try:
+                                beatmap.difficulty[key] = float(value)
+                            except ValueError:
+                                continue
+                            has_approach_rate |= key == 'ar'
+
+                    elif section == 'Events':
+                        OsuParser._parse_event(beatmap.events, line)
+
+                    elif section == 'TimingPoints':
+                        timing_point = OsuParser._parse_timing_point(line)
+                        if timing_point:
+                            beatmap.timing_points.append(timing_point)
+
+                    elif section == 'HitObjects':
+                        objects.add(line)
 
         except Exception as e:
             print(f"Ошибка парсинга карты: {str(e)}")
-            return None, [], difficulty
-
-        audio_path = os.path.join(map_folder, audio_file) if audio_file else None
-        
-        if audio_file:
-            # Ищем аудио файл в папке карты
-            for root, dirs, files in os.walk(map_folder):
-                if audio_file in files:
-                    audio_path = os.path.join(root, audio_file)
-                    break
-            # Проверяем существование файла
-            if not audio_path or not os.path.isfile(audio_path):
-                audio_path = None
-                
-        return audio_path, hit_objects, difficulty
\ No newline at end of file
+            return None
+
+        # В старых картах AR нет, тогда он равен OD
+        if not has_approach_rate and 'od' in beatmap.difficulty and \
+                (sections is None or 'Difficulty' in sections):
+            beatmap.difficulty['ar'] = beatmap.difficulty['od']
+
+        objects.finish()
+        if sections is None:
+            map_cache.store(osu_path, beatmap.to_meta(), beatmap.hit_objects)
+        return beatmap
+
+    @staticmethod
+    def _parse_event(events, line):
+        parts = [p.strip() for p in line.split(',')]
+        kind = parts[0]
+        try:
+            if kind in ('0', 'Background') and len(parts) >= 3:
+                events['background'] = parts[2].strip('"')
+                return
+            if kind in ('1', 'Video') and len(parts) >= 3:
+                events['video'] = [parts[2].strip('"'), int(parts[1])]
+                return
+            if kind in ('2', 'Break') and len(parts) >= 3:
+                events['breaks'].append([int(parts[1]), int(parts[2])])
+                return
+        except ValueError:
+            return
+        # Команды сторибоарда храним как есть
+        events['storyboard'].append(line)
+
+    @staticmethod
+    def _parse_timing_point(line):
+        parts = line.split(',')
+        if len(parts) < 2:
+            return None
+        try:
+            def field(i, default):
+                return int(parts[i]) if len(parts) > i and parts[i] else default
+            return TimingPoint(
+                time=float(parts[0]),
+                beat_length=float(parts[1]),
+                meter=field(2, 4),
+                sample_set=field(3, 0),
+                sample_index=field(4, 0),
+                volume=field(5, 100),
+                uninherited=field(6, 1) == 1,
+                effects=field(7, 0),
+            )
+        except ValueError:
+            return None
+
+
+class _HitObjectBuilder:
+    """Собирает колонки HitObjectTable и записи слайдеров/спиннеров построчно"""
+
+    def __init__(self, beatmap):
+        self.beatmap = beatmap
+        self.xs, self.ys, self.start_times, self.end_times, self.types = [], [], [], [], []
+        self.hit_sounds, self.samples = [], []  # samples - (normalSet, additionSet, index, volume)
+        self.sliders = []
+        self.spinners = []
+        self._timing_times = None
+        self._beat_lengths = None
+
+    def add(self, line):
+        parts = line.split(',')
+        if len(parts) < 4:
+            return
+        try:
+            x, y = int(float(parts[0])), int(float(parts[1]))
+            start_time = int(parts[2])
+            obj_type = int(parts[3])
+            index = len(self.xs)
+
+            hit_sound = int(parts[4]) if len(parts) > 4 and parts[4] else 0
+
+            if obj_type & TYPE_CIRCLE:
+                kind, end_time = TYPE_CIRCLE, start_time + 100
+                sample_field = 5
+            elif obj_type & TYPE_SLIDER:
+                curve = parts[5].split('|')
+                points = [[x, y]] + [[int(float(c)) for c in p.split(':')] for p in curve[1:]]
+                slides = int(parts[6])
+                length = float(parts[7])
+                end_time = start_time + int(self.slider_duration(start_time, length, slides))
+                kind = TYPE_SLIDER
+                sample_field = 10
+                self.sliders.append(SliderRecord(index, curve[0], points, slides, length))
+            elif obj_type & TYPE_SPINNER:
+                kind, end_time = TYPE_SPINNER, int(parts[5])
+                sample_field = 6
+                self.spinners.append(SpinnerRecord(index, start_time, end_time))
+            else:
+                return
+        except (ValueError, IndexError):
+            return
+
+        self.xs.append(int(x / 512*1920))
+        self.ys.append(int(y / 384*1080))
+        self.start_times.append(start_time)
+        self.end_times.append(end_time)
+        self.types.append(kind)
+        self.hit_sounds.append(hit_sound)
+        self.samples.append(self.parse_hit_sample(parts[sample_field] if len(parts) > sample_field else ''))
+
+    @staticmethod
+    def parse_hit_sample(field):
+        """normalSet:additionSet:index:volume[:filename] -> четыре числа (0 - по умолчанию)"""
+        values = [0, 0, 0, 0]
+        for i, value in enumerate(field.split(':')[:4]):
+            try:
+                values[i] = int(value)
+            except ValueError:
+                pass
+        return values
+
+    def slider_duration(self, time, length, slides):
+        timing_points = self.beatmap.timing_points
+        if self._timing_times is None:
+            # Для каждой точки запоминаем длину доли последней "красной" точки
+            self._timing_times = [tp.time for tp in timing_points]
+            first_red = next((tp.beat_length for tp in timing_points if tp.uninherited), 500.0)
+            self._beat_lengths = []
+            for tp in timing_points:
+                beat = tp.beat_length if tp.uninherited else (self._beat_lengths[-1] if self._beat_lengths else first_red)
+                self._beat_lengths.append(beat)
+        i = bisect.bisect_right(self._timing_times, time) - 1
+        if i < 0:
+            i = 0 if timing_points else None
+
+        # Длина доли - от последней "красной" точки, множитель скорости - от "зелёной"
+        beat_length, velocity = 500.0, 1.0
+        if i is not None:
+            beat_length = self._beat_lengths[i]
+            if not timing_points[i].uninherited and timing_points[i].beat_length < 0:
+                velocity = min(10.0, max(0.1, -100.0 / timing_points[i].beat_length))
+
+        pixels_per_beat = self.beatmap.difficulty['slider_multiplier'] * 100 * velocity
+        return length / pixels_per_beat * beat_length * slides
+
+    def finish(self):
+        samples = list(zip(*self.samples)) if self.samples else [[], [], [], []]
+        table = HitObjectTable(self.xs, self.ys, self.start_times, self.end_times, self.types,
+                               hit_sound=self.hit_sounds, normal_set=samples[0], addition_set=samples[1],
+                               sample_index=samples[2], sample_volume=samples[3])
+        # Сортируем по времени и переносим индексы записей в новый порядок
+        order = table.sort_order()
+        position = {int(old): new for new, old in enumerate(order)}
+        self.beatmap.hit_objects = table.take(order)
+        self.beatmap.sliders = sorted(
+            (s._replace(index=position[s.index]) for s in self.sliders), key=lambda s: s.index
+        )
+        self.beatmap.spinners = sorted(
+            (s._replace(index=position[s.index]) for s in self.spinners), key=lambda s: s.index
+        )
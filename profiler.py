@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import numpy as np
+import pygame
+
+
+# Стадии кадра Game.run; mark(стадия) закрывает стадию - время с прошлой отметки
+STAGE_WAIT = 0      # clock.tick: ожидание ограничения FPS
+STAGE_EVENTS = 1    # handle_events
+STAGE_UPDATE = 2    # тики GameState.update (в меню - update меню)
+STAGE_INPUT = 3     # InputHandler.handle_input и запись повтора
+STAGE_DRAW = 4      # draw сцены
+STAGE_PRESENT = 5   # display.update / flip
+STAGE_NAMES = ('wait', 'events', 'update', 'input', 'draw', 'present')
+STAGE_COLORS = ((60, 60, 60), (200, 120, 40), (60, 160, 240), (160, 80, 220), (80, 200, 90), (230, 60, 60))
+
+PROFILER_FRAMES = 1024      # Кадров в кольцевом буфере
+GRAPH_SIZE = (300, 100)     # Размер графика времени кадра
+GRAPH_MS = 33.3             # Высота графика в мс
+
+
+class FrameProfiler:
+    """Время стадий каждого кадра в кольцевом буфере.
+
+    Выключенный профайлер стоит одну проверку флага на отметку. Включённый
+    пишет perf_counter_ns в строку numpy-массива, ничего не выделяя за кадр.
+    График рисуется сдвигом готовой поверхности и дорисовкой одного столбца.
+    """
+
+    def __init__(self, enabled=False, capacity=PROFILER_FRAMES):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.durations = np.zeros((capacity, len(STAGE_NAMES)), dtype=np.int64)  # нс
+        self.starts = np.zeros(capacity, dtype=np.int64)    # Начало кадра, нс
+        self.frames = 0     # Сколько кадров записано всего
+        self.current = self.durations[0]
+        self.last = 0
+        self.graph = None
+        self.font = None
+        self.label = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.last = 0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        row = self.frames % self.capacity
+        self.current = self.durations[row]
+        self.current[:] = 0
+        self.last = time.perf_counter_ns()
+        self.starts[row] = self.last
+
+    def mark(self, stage):
+        if not self.enabled or not self.last:
+            return
+        now = time.perf_counter_ns()
+        self.current[stage] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled or not self.last:
+            return
+        self.frames += 1
+        if self.graph is not None:
+            self._graph_column(self.current)
+
+    def recorded(self):
+        """(starts, durations) записанных кадров от старых к новым"""
+        count = min(self.frames, self.capacity)
+        order = (np.arange(count) + self.frames - count) % self.capacity
+        return self.starts[order], self.durations[order]
+
+    def summary(self):
+        """Статистика по стадиям в мс: {стадия: {mean, p95, max}}"""
+        _, durations = self.recorded()
+        result = {}
+        if not len(durations):
+            return result
+        columns = list(durations.T) + [durations.sum(axis=1)]
+        for name, column in zip(STAGE_NAMES + ('frame',), columns):
+            column = column / 1e6
+            result[name] = {
+                'mean': float(column.mean()),
+                'p95': float(np.percentile(column, 95)),
+                'max': float(column.max()),
+            }
+        return result
+
+    def export_json(self, path):
+        """Сводка и сырые времена стадий (мс) всех кадров буфера"""
+        _, durations = self.recorded()
+        data = {
+            'stages': list(STAGE_NAMES),
+            'summary': self.summary(),
+            'frames': (durations / 1e6).round(4).tolist(),
+        }
+        self._write(path, data)
+
+    def export_chrome_trace(self, path):
+        """Файл для chrome://tracing или Perfetto: стадии как события 'X'"""
+        starts, durations = self.recorded()
+        events = []
+        if len(starts):
+            origin = int(starts[0])
+            offsets = np.cumsum(durations, axis=1) - durations
+            for frame, (start, row, offset_row) in enumerate(zip(starts.tolist(), durations.tolist(), offsets.tolist())):
+                events.append({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': (start - origin) / 1000, 'dur': sum(row) / 1000, 'args': {'frame': frame}})
+                for name, duration, offset in zip(STAGE_NAMES, row, offset_row):
+                    if duration:
+                        events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                                       'ts': (start - origin + offset) / 1000, 'dur': duration / 1000})
+        self._write(path, {'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def _graph_column(self, durations):
+        """Сдвигаем график на пиксель и рисуем столбец последнего кадра"""
+        width, height = GRAPH_SIZE
+        graph = self.graph
+        graph.scroll(-1, 0)
+        graph.fill((0, 0, 0), (width - 1, 0, 1, height))
+        y = height
+        for stage, duration in enumerate(durations.tolist()):
+            pixels = duration / 1e6 / GRAPH_MS * height
+            top = max(0, y - pixels)
+            if int(y) > int(top):
+                graph.fill(STAGE_COLORS[stage], (width - 1, int(top), 1, int(y) - int(top)))
+            y = top
+        # Линия 16.7 мс (60 FPS)
+        graph.set_at((width - 1, int(height - height * 16.7 / GRAPH_MS)), (255, 255, 255))
+
+    def draw(self, screen):
+        """График и среднее время кадра в правом нижнем углу; возвращает прямоугольник или None"""
+        if not self.enabled:
+            return None
+        if self.graph is None:
+            self.graph = pygame.Surface(GRAPH_SIZE)
+            self.graph.fill((0, 0, 0))
+            self.font = pygame.font.Font(None, 22)
+        x = screen.get_width() - GRAPH_SIZE[0] - 10
+        y = screen.get_height() - GRAPH_SIZE[1] - 10
+        rect = screen.blit(self.graph, (x, y))
+
+        # Подпись обновляется раз в 30 кадров, чтобы не рендерить текст каждый кадр
+        if self.label is None or self.frames % 30 == 0:
+            _, durations = self.recorded()
+            recent = durations[-60:].sum(axis=1)
+            if len(recent):
+                text = f"{recent.mean() / 1e6:.2f} ms  max {recent.max() / 1e6:.2f} ms"
+                self.label = self.font.render(text, True, (255, 255, 255), (0, 0, 0))
+        if self.label is not None:
+            rect = rect.union(screen.blit(self.label, (x, y - self.label.get_height())))
+        return rect
@@ -0,0 +1,54 @@
+import pygame
+
+
+class DirtyRenderer:
+    """Вывод кадра на экран только по изменившимся прямоугольникам.
+
+    Каждый кадр стираются прямоугольники, нарисованные в прошлом кадре, а на
+    дисплей уходят старые и новые прямоугольники вместе. draw-методы сцен
+    возвращают список того, что нарисовали, или None - "изменилось всё".
+    С enabled=False ведёт себя как раньше: полная заливка и flip().
+    Фоном может быть цвет или готовая поверхность размера экрана (фон карты):
+    тогда стирание - непрозрачный blit тех же прямоугольников.
+    """
+
+    def __init__(self, screen, enabled=True, background=(0, 0, 0)):
+        self.screen = screen
+        self.enabled = enabled
+        self.background = background
+        self.previous = []      # Что рисовали в прошлом кадре
+        self.full_redraw = True
+
+    def set_background(self, background):
+        """Цвет или поверхность, которой стирается экран; следующий кадр целиком"""
+        if background is not self.background:
+            self.background = background
+            self.full_redraw = True
+
+    def invalidate(self):
+        """Следующий кадр перерисовать целиком (смена сцены)"""
+        self.full_redraw = True
+
+    def clear(self):
+        """Стираем прошлый кадр: весь экран или только его прямоугольники"""
+        background = self.background
+        if isinstance(background, pygame.Surface):
+            if not self.enabled or self.full_redraw:
+                self.screen.blit(background, (0, 0))
+            else:
+                for rect in self.previous:
+                    self.screen.blit(background, rect, rect)
+        elif not self.enabled or self.full_redraw:
+            self.screen.fill(background)
+        else:
+            for rect in self.previous:
+                self.screen.fill(background, rect)
+
+    def present(self, rects):
+        if not self.enabled or self.full_redraw or rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous + rects)
+        self.previous = list(rects) if rects is not None else []
+        # После кадра "изменилось всё" следующий тоже стираем целиком
+        self.full_redraw = rects is None
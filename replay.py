@@ -0,0 +1,157 @@
+import os
+import time
+import zlib
+import queue
+import struct
+import threading
+import numpy as np
+from env import REPLAYS_DIR
+from simulation import InputFrame
+
+
+REPLAY_MAGIC = b'POSR'
+REPLAY_VERSION = 1
+CHUNK_FRAMES = 4096     # Кадров в одном блоке, который уходит потоку записи
+COMPRESSION_LEVEL = 6
+FRAME_DTYPE = np.dtype([('time', '<i4'), ('x', '<i2'), ('y', '<i2'), ('keys', 'u1')])
+# Как хранятся колонки блока: время и координаты - разностями с прошлым кадром
+DELTA_COLUMNS = (('time', '<i4'), ('x', '<i2'), ('y', '<i2'))
+HEADER = struct.Struct('<4sBH')     # магия, версия, длина пути карты
+CHUNK_HEADER = struct.Struct('<I')  # число кадров в блоке
+
+
+def new_replay_path(beatmap_path, replays_dir=REPLAYS_DIR):
+    """posu/replays/<дата> <имя сложности>.posr"""
+    name = os.path.splitext(os.path.basename(beatmap_path))[0]
+    return os.path.join(replays_dir, f"{time.strftime('%Y-%m-%d %H-%M-%S')} {name}.posr")
+
+
+def encode_chunk(frames, previous):
+    """Блок кадров в байты; previous - последний кадр прошлого блока"""
+    parts = [CHUNK_HEADER.pack(len(frames))]
+    for name, dtype in DELTA_COLUMNS:
+        column = frames[name].astype(np.int32)
+        parts.append(np.diff(column, prepend=np.int32(previous[name])).astype(dtype).tobytes())
+    parts.append(frames['keys'].tobytes())
+    return b''.join(parts)
+
+
+def decode_chunks(data):
+    """Все блоки распакованного потока в один массив кадров"""
+    blocks = []
+    previous = np.zeros((), FRAME_DTYPE)
+    offset = 0
+    while offset < len(data):
+        (count,) = CHUNK_HEADER.unpack_from(data, offset)
+        offset += CHUNK_HEADER.size
+        frames = np.zeros(count, FRAME_DTYPE)
+        for name, dtype in DELTA_COLUMNS:
+            size = count * np.dtype(dtype).itemsize
+            delta = np.frombuffer(data, dtype, count, offset).astype(np.int32)
+            frames[name] = int(previous[name]) + np.cumsum(delta)
+            offset += size
+        frames['keys'] = np.frombuffer(data, np.uint8, count, offset)
+        offset += count
+        if count:
+            previous = frames[-1]
+        blocks.append(frames)
+    return np.concatenate(blocks) if blocks else np.zeros(0, FRAME_DTYPE)
+
+
+class ReplayRecorder:
+    """Запись повтора во время игры.
+
+    record() кладёт кадр в заранее выделенный блок (структурный массив) и
+    пропускает кадры, где курсор и клавиши не изменились. Заполненный блок
+    уходит потоку записи: он кодирует разности, сжимает zlib-потоком и
+    пишет на диск, а пустой блок возвращает на повторное использование.
+    close() дописывает остаток и ждёт поток.
+    """
+
+    def __init__(self, path, beatmap_path, chunk_frames=CHUNK_FRAMES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.file = open(path, 'wb')
+        encoded_path = beatmap_path.encode('utf-8')
+        self.file.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, len(encoded_path)) + encoded_path)
+
+        self.filled = queue.Queue()     # (блок, число кадров) для потока записи, None - конец
+        self.free = queue.Queue()       # Уже записанные блоки
+        self.chunk = np.zeros(chunk_frames, FRAME_DTYPE)
+        self.count = 0
+        self.last_state = None
+        self.frames_recorded = 0
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def record(self, time, x, y, keys):
+        state = (x, y, keys)
+        if state == self.last_state:
+            return
+        self.last_state = state
+        self.chunk[self.count] = (time, x, y, keys)
+        self.count += 1
+        self.frames_recorded += 1
+        if self.count == self.chunk_frames:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        self.filled.put((self.chunk, self.count))
+        try:
+            self.chunk = self.free.get_nowait()
+        except queue.Empty:
+            self.chunk = np.zeros(self.chunk_frames, FRAME_DTYPE)
+        self.count = 0
+
+    def close(self):
+        if self.thread is None:
+            return
+        if self.count:
+            self._flush_chunk()
+        self.filled.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def _writer(self):
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        previous = np.zeros((), FRAME_DTYPE)
+        while True:
+            item = self.filled.get()
+            if item is None:
+                break
+            chunk, count = item
+            frames = chunk[:count]
+            data = encode_chunk(frames, previous)
+            previous = frames[-1].copy()
+            self.free.put(chunk)
+            self.file.write(compressor.compress(data))
+        self.file.write(compressor.flush())
+        self.file.close()
+
+
+class Replay:
+    """Прочитанный повтор: путь карты и кадры ввода"""
+
+    def __init__(self, beatmap_path, frames):
+        self.beatmap_path = beatmap_path
+        self.frames = frames    # Массив FRAME_DTYPE
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, path_length = HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"Не повтор posu: {path}")
+        start = HEADER.size + path_length
+        beatmap_path = data[HEADER.size:start].decode('utf-8')
+        return cls(beatmap_path, decode_chunks(zlib.decompress(data[start:])))
+
+    def input_frames(self):
+        """Кадры InputFrame для HeadlessSimulation.run"""
+        columns = (self.frames[name].tolist() for name in ('time', 'x', 'y', 'keys'))
+        return (InputFrame(*frame) for frame in zip(*columns))
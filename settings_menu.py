@@ -18,6 +18,7 @@ class SettingsMenu:
         self.skin_dropdown_open = False
         self.selected_keys = {'key1': 'Z', 'key2': 'X', 'smoke': 'C'}
         self.rebinding_key = None
+        self.changed = True  # Панель нужно перерисовать
         
     def load_skins(self):
         try:
@@ -29,12 +30,14 @@ class SettingsMenu:
         
     def open_menu(self):
         self.state = "opening"
+        self.changed = True
         self.animation_progress = 0.0
         
     def close_menu(self):
         if self.state == "opened" or self.state == "opening":
             self.state = "closing"
             self.animation_progress = 1.0  # Начинаем с полного прогресса
+            self.changed = True
     
     def update(self):
         if self.state == "opening":
@@ -58,8 +61,16 @@ class SettingsMenu:
             self.position.x = -self.menu_width + t * self.menu_width
     
     def draw(self, screen):
+        """Рисует панель поверх экрана.
+
+        Возвращает None, если перерисована вся панель с затемнением, и пустой
+        список, если открытая панель не менялась и рисовать нечего.
+        """
         if self.state == "closed":
-            return
+            return []
+        if self.state == "opened" and not self.changed:
+            return []
+        self.changed = False
             
         # Темный фон
         overlay = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
@@ -129,8 +140,10 @@ class SettingsMenu:
             key_text = self.font.render(f"{label}: {self.selected_keys[key_type]}", True, (255, 255, 255))
             screen.blit(key_text, (x_offset + 10, y_offset + 10))
             y_offset += 50
+        return None
 
     def handle_click(self, pos):
+        self.changed = True
         x_offset = self.position.x + 20
         y_offset = 140  # Позиция кнопки скинов
         
@@ -158,6 +171,7 @@ class SettingsMenu:
 
     def handle_key_event(self, event):
         if self.rebinding_key and event.type == pygame.KEYDOWN:
+            self.changed = True
             key_name = pygame.key.name(event.key).upper()
             self.selected_keys[self.rebinding_key] = key_name
             self.rebinding_key = None
\ No newline at end of file
@@ -0,0 +1,97 @@
+from typing import NamedTuple
+import numpy as np
+import pygame
+from game_state import GameState
+from input_handler import InputHandler, KEY_1, KEY_2
+from hit_objects import HITTABLE_TYPES
+
+
+AUTOPLAY_HOLD_MS = 40   # Сколько автоплей держит клавишу
+
+
+class InputFrame(NamedTuple):
+    time: int
+    x: int
+    y: int
+    keys: int   # Зажатые клавиши (KEY_1 | KEY_2)
+
+
+class SimulationResult(NamedTuple):
+    score: int
+    accuracy: float
+    combo: int
+    hp: float
+    hit_counts: dict
+
+
+def autoplay_frames(hit_objects, hold_ms=AUTOPLAY_HOLD_MS):
+    """Кадры автоплея: нажатие точно в start_time каждой ноты, клавиши по очереди"""
+    hittable = np.flatnonzero(hit_objects.type & HITTABLE_TYPES).tolist()
+    times = hit_objects.start_time[hittable].tolist()
+    xs = hit_objects.x[hittable].tolist()
+    ys = hit_objects.y[hittable].tolist()
+    for n, (time, x, y) in enumerate(zip(times, xs, ys)):
+        key = KEY_1 if n % 2 == 0 else KEY_2
+        yield InputFrame(time, x, y, key)
+        # Отпускаем до следующей ноты, чтобы следующее нажатие было новым
+        release = time + hold_ms
+        if n + 1 < len(times):
+            release = min(release, max(time, times[n + 1] - 1))
+        yield InputFrame(release, x, y, 0)
+
+
+class HeadlessSimulation:
+    """Игра без окна и без реального времени.
+
+    Время задают сами кадры ввода (InputFrame), поэтому карта проигрывается
+    так быстро, как считается: GameState.update вызывается на кадрах и в
+    промежутках не длиннее approach_time (объект, появившийся и ушедший за
+    один шаг, update не засчитал бы промахом). Нажатия оцениваются тем же
+    InputHandler.judge, что и в игре: фронт каждой клавиши. Пути слайдеров не
+    строятся - без отрисовки они не нужны.
+    """
+
+    def __init__(self, beatmap):
+        if not pygame.font.get_init():
+            pygame.font.init()  # GameState создаёт шрифты HUD
+        self.hit_objects = beatmap.hit_objects
+        self.game_state = GameState(None, None)
+        self.game_state.apply_difficulty(beatmap.difficulty)
+        # Конец карты: после него все неоценённые ноты уже промахи
+        self.end_time = int(self.hit_objects.end_time.max()) + 1 if len(self.hit_objects) else 0
+
+    def run(self, frames, on_frame=None):
+        """Проигрывает кадры (по возрастанию времени) с начала карты, возвращает SimulationResult
+
+        on_frame(game_state, frame) вызывается после каждого кадра.
+        """
+        gs = self.game_state
+        self.hit_objects.reset_flags()
+        gs.reset()
+        gs.set_hit_objects(self.hit_objects, [])
+
+        for frame in frames:
+            self.advance(frame.time)
+            InputHandler.judge(gs, frame.keys, (frame.x, frame.y), frame.time)
+            if on_frame is not None:
+                on_frame(gs, frame)
+        self.advance(self.end_time + int(gs.hit_window_50))
+
+        return SimulationResult(gs.score, gs.accuracy(), gs.combo, gs.hp, dict(gs.hit_counts))
+
+    def advance(self, current_time):
+        """update до current_time шагами не длиннее approach_time"""
+        gs = self.game_state
+        step = max(1, int(gs.approach_time))
+        time = gs.last_update_time
+        if time is None:
+            # Игра начинается с нуля (или раньше, если первая нота появляется до него)
+            first = int(self.hit_objects.start_time[0]) if len(self.hit_objects) else 0
+            time = min(0, first - step)
+        while time + step < current_time:
+            time += step
+            gs.update(time)
+        gs.update(max(current_time, time))
+
+    def autoplay(self):
+        return self.run(autoplay_frames(self.hit_objects))
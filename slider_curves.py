@@ -0,0 +1,212 @@
+import math
+import numpy as np
+import pygame
+
+
+# Масштаб из координат osu! (512x384) в игровые 1920x1080 - как в парсере
+OSU_TO_SCREEN = (1920 / 512, 1080 / 384)
+
+BEZIER_SAMPLE_SPACING = 2.0   # Примерное расстояние между точками кривой Безье (osu px)
+CIRCLE_TOLERANCE = 0.1        # Допустимое отклонение хорды от дуги (osu px)
+CATMULL_DETAIL = 50           # Точек на сегмент Catmull
+
+
+def flatten_bezier(points):
+    """Кривая Безье в ломаную. Повторённая точка ("красная") начинает новый сегмент"""
+    segments, current = [], [points[0]]
+    for p in points[1:]:
+        if p == current[-1]:
+            segments.append(current)
+            current = [p]
+        else:
+            current.append(p)
+    segments.append(current)
+
+    result = []
+    for segment in segments:
+        control = np.asarray(segment, dtype=np.float64)
+        if len(control) < 2:
+            continue
+        polygon_length = float(np.hypot(*np.diff(control, axis=0).T).sum())
+        count = max(2, min(1000, int(polygon_length / BEZIER_SAMPLE_SPACING) + 2))
+        t = np.linspace(0.0, 1.0, count)[:, None, None]
+        # Алгоритм де Кастельжо сразу для всех t
+        layer = np.broadcast_to(control, (count,) + control.shape)
+        while layer.shape[1] > 1:
+            layer = (1 - t) * layer[:, :-1] + t * layer[:, 1:]
+        curve = layer[:, 0]
+        result.extend(curve if not result else curve[1:])
+    return np.asarray(result if result else points[:1], dtype=np.float64)
+
+
+def flatten_perfect_circle(points):
+    """Дуга окружности через три точки (для вырожденных случаев - Безье)"""
+    if len(points) != 3:
+        return flatten_bezier(points)
+    (ax, ay), (bx, by), (cx, cy) = points
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    if abs(d) < 1e-3:
+        return flatten_bezier(points)
+
+    a2, b2, c2 = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+    center_x = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+    center_y = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    radius = math.hypot(ax - center_x, ay - center_y)
+
+    theta_start = math.atan2(ay - center_y, ax - center_x)
+    theta_end = math.atan2(cy - center_y, cx - center_x)
+    while theta_end < theta_start:
+        theta_end += 2 * math.pi
+    direction = 1.0
+    theta_range = theta_end - theta_start
+    # Средняя точка с другой стороны хорды AC - идём по дуге в обратную сторону
+    if (cy - ay) * (bx - ax) - (cx - ax) * (by - ay) < 0:
+        direction = -1.0
+        theta_range = 2 * math.pi - theta_range
+
+    if 2 * radius <= CIRCLE_TOLERANCE:
+        count = 2
+    else:
+        count = max(2, int(math.ceil(theta_range / (2 * math.acos(1 - CIRCLE_TOLERANCE / radius)))))
+    theta = theta_start + direction * np.linspace(0.0, theta_range, count)
+    return np.column_stack((center_x + radius * np.cos(theta), center_y + radius * np.sin(theta)))
+
+
+def flatten_catmull(points):
+    """Сплайн Catmull-Rom через все контрольные точки"""
+    control = [np.asarray(p, dtype=np.float64) for p in points]
+    if len(control) < 2:
+        return np.asarray(points, dtype=np.float64)
+    t = np.linspace(0.0, 1.0, CATMULL_DETAIL)[:, None]
+    result = []
+    for i in range(len(control) - 1):
+        v2, v3 = control[i], control[i + 1]
+        v1 = control[i - 1] if i > 0 else v2
+        v4 = control[i + 2] if i + 2 < len(control) else 2 * v3 - v2
+        curve = 0.5 * (2 * v2 + (v3 - v1) * t
+                       + (2 * v1 - 5 * v2 + 4 * v3 - v4) * t ** 2
+                       + (3 * v2 - v1 - 3 * v3 + v4) * t ** 3)
+        result.extend(curve if not result else curve[1:])
+    return np.asarray(result)
+
+
+def flatten_curve(curve_type, points):
+    """Ломаная в координатах osu! для кривой слайдера"""
+    points = [tuple(p) for p in points]
+    if len(points) < 2:
+        return np.asarray(points or [(0, 0)], dtype=np.float64)
+    if curve_type == 'L':
+        return np.asarray(points, dtype=np.float64)
+    if curve_type == 'P':
+        return flatten_perfect_circle(points)
+    if curve_type == 'C':
+        return flatten_catmull(points)
+    return flatten_bezier(points)
+
+
+class SliderPath:
+    """Путь слайдера: ломаная и таблица длин дуг, посчитанные один раз при загрузке.
+
+    Длины считаются в osu px (в них задана длина слайдера в .osu), точки
+    хранятся уже в экранных координатах. Тело рисуется один раз в отдельную
+    поверхность и дальше только блитится.
+    """
+
+    def __init__(self, curve_type, points, length, slides=1, scale=OSU_TO_SCREEN):
+        polyline = flatten_curve(curve_type, points)
+        polyline, distances = self._fit_length(polyline, length)
+        self.length = float(distances[-1])
+        self.slides = max(1, int(slides))
+        self.distances = distances
+        self.points = polyline * np.asarray(scale, dtype=np.float64)
+        self.scale = scale
+        self._body = None
+        self._body_key = None
+
+    @classmethod
+    def from_record(cls, record, scale=OSU_TO_SCREEN):
+        return cls(record.curve_type, record.points, record.length, record.slides, scale)
+
+    @staticmethod
+    def _fit_length(polyline, length):
+        """Обрезает (или продлевает последний отрезок) ломаную до длины из .osu"""
+        segments = np.hypot(*np.diff(polyline, axis=0).T) if len(polyline) > 1 else np.zeros(0)
+        distances = np.concatenate(([0.0], np.cumsum(segments)))
+        if not length or length <= 0 or not math.isfinite(length):
+            return polyline, distances
+
+        if distances[-1] >= length:
+            end = int(np.searchsorted(distances, length, side='left'))
+            polyline, distances = polyline[:end + 1].copy(), distances[:end + 1].copy()
+            if end > 0:
+                span = distances[end] - distances[end - 1]
+                frac = (length - distances[end - 1]) / span if span > 0 else 0.0
+                polyline[end] = polyline[end - 1] + (polyline[end] - polyline[end - 1]) * frac
+                distances[end] = length
+            return polyline, distances
+
+        # Кривая короче заявленной длины - продлеваем по направлению последнего отрезка
+        nonzero = np.flatnonzero(segments > 0)
+        if not len(nonzero):
+            return polyline, distances
+        last = int(nonzero[-1])
+        direction = (polyline[last + 1] - polyline[last]) / segments[last]
+        extra = polyline[-1] + direction * (length - distances[-1])
+        return np.vstack((polyline, extra)), np.append(distances, length)
+
+    def positions_at_distance(self, distances):
+        """Экранные точки на заданных расстояниях от головы (бинарный поиск по таблице)"""
+        distances = np.clip(np.asarray(distances, dtype=np.float64), 0.0, self.length)
+        if len(self.points) < 2:
+            return np.repeat(self.points[:1], len(distances), axis=0)
+        i = np.clip(np.searchsorted(self.distances, distances, side='right') - 1, 0, len(self.points) - 2)
+        span = self.distances[i + 1] - self.distances[i]
+        frac = np.where(span > 0, (distances - self.distances[i]) / np.where(span > 0, span, 1), 0.0)
+        return self.points[i] + (self.points[i + 1] - self.points[i]) * frac[:, None]
+
+    def position_at(self, progress):
+        """Позиция шарика; progress от 0 до 1 на весь слайдер с повторами"""
+        span = min(1.0, max(0.0, progress)) * self.slides
+        repeat = min(int(span), self.slides - 1)
+        t = span - repeat
+        if repeat % 2:
+            t = 1.0 - t
+        x, y = self.positions_at_distance([t * self.length])[0]
+        return int(x), int(y)
+
+    @property
+    def head(self):
+        return int(self.points[0][0]), int(self.points[0][1])
+
+    @property
+    def tail(self):
+        """Где слайдер заканчивается с учётом повторов"""
+        return self.position_at(1.0)
+
+    def body(self, radius, body_color, border_color, border_width):
+        """Поверхность тела слайдера и её левый верхний угол (рисуется один раз)"""
+        key = (radius, body_color, border_color, border_width)
+        if self._body_key != key:
+            self._body = self._render_body(*key)
+            self._body_key = key
+        return self._body
+
+    def release(self):
+        """Освобождает поверхность тела (слайдер закончился)"""
+        self._body = None
+        self._body_key = None
+
+    def _render_body(self, radius, body_color, border_color, border_width):
+        # Шаг в четверть радиуса даёт ровный край без лишних кругов
+        step = max(1.0, radius / 4 / max(self.scale))
+        samples = self.positions_at_distance(np.append(np.arange(0.0, self.length, step), self.length))
+        left, top = np.floor(samples.min(axis=0) - radius - 1).astype(int)
+        right, bottom = np.ceil(samples.max(axis=0) + radius + 1).astype(int)
+
+        surface = pygame.Surface((right - left, bottom - top), pygame.SRCALPHA)
+        local = [(int(x - left), int(y - top)) for x, y in samples]
+        for pos in local:
+            pygame.draw.circle(surface, border_color, pos, radius)
+        for pos in local:
+            pygame.draw.circle(surface, body_color, pos, max(1, radius - border_width))
+        return surface, (int(left), int(top))
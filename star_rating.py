@@ -0,0 +1,224 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from hit_objects import HITTABLE_TYPES
+from osu_parser import OsuParser
+
+
+# Константы навыков из ранней версии pp-системы osu!
+AIM_MULTIPLIER = 26.25
+AIM_DECAY_BASE = 0.15
+SPEED_MULTIPLIER = 1400.0
+SPEED_DECAY_BASE = 0.3
+SECTION_MS = 400            # Длина участка, по которому берётся пик напряжения
+PEAK_WEIGHT = 0.9           # Вес каждого следующего по величине пика
+MIN_DELTA_MS = 50           # Более частые ноты считаются как идущие через 50 мс
+STAR_SCALING = 0.0675
+NORMALIZED_RADIUS = 52.0
+MAX_EXPONENT = 500.0        # Предел показателя exp в блоке свёртки (float64 держит ~709)
+RATING_NICE = 10            # Насколько понижаем приоритет процессов расчёта
+RATING_BATCH = 32           # Сколько результатов пишем в библиотеку за раз
+
+# Координаты HitObjectTable - экранные (1920x1080), расчёт идёт в пикселях osu! (512x384)
+SCREEN_TO_OSU = np.array([512 / 1920, 384 / 1080])
+
+
+def decayed_strain(values, times, decay_base):
+    """s[i] = s[i-1] * decay_base ** ((t[i] - t[i-1]) / 1000) + values[i] без цикла по нотам
+
+    Рекуррентность раскрывается в exp(L[i]) * cumsum(values * exp(-L)), где L -
+    накопленный логарифм затухания. Чтобы exp не переполнился, массив режется
+    на блоки, внутри которых |L| растёт не больше чем на MAX_EXPONENT.
+    """
+    count = len(values)
+    strains = np.empty(count)
+    if not count:
+        return strains
+    decay = -np.log(decay_base) / 1000 * (times - times[0])   # неубывающий -L
+    carry = 0.0
+    start = 0
+    while start < count:
+        stop = int(np.searchsorted(decay, decay[start] + MAX_EXPONENT, side='right'))
+        relative = decay[start:stop] - decay[start]
+        block = np.exp(-relative) * (carry + np.cumsum(values[start:stop] * np.exp(relative)))
+        strains[start:stop] = block
+        if stop < count:
+            carry = block[-1] * np.exp(decay[stop - 1] - decay[stop])
+        start = stop
+    return strains
+
+
+def weighted_peaks(strains, times, decay_base):
+    """Сумма пиков участков SECTION_MS по убыванию с весами PEAK_WEIGHT ** i"""
+    if not len(strains):
+        return 0.0
+    sections = times // SECTION_MS
+    firsts = np.flatnonzero(np.diff(sections, prepend=sections[0] - 1))
+    peaks = np.maximum.reduceat(strains, firsts)
+    # Напряжение прошлой ноты, дожившее до начала участка, тоже может быть пиком
+    previous = firsts[1:] - 1
+    carried = strains[previous] * decay_base ** ((sections[firsts[1:]] * SECTION_MS - times[previous]) / 1000)
+    peaks[1:] = np.maximum(peaks[1:], carried)
+    peaks = np.sort(peaks)[::-1]
+    return float(np.sum(peaks * PEAK_WEIGHT ** np.arange(len(peaks))))
+
+
+def speed_value(distance):
+    """Вклад расстояния в скоростной навык (стримы и короткие прыжки)"""
+    return np.select(
+        [distance > 125, distance > 110, distance > 90, distance > 45],
+        [2.5,
+         1.6 + 0.9 * (distance - 110) / 15,
+         1.2 + 0.4 * (distance - 90) / 20,
+         0.95 + 0.25 * (distance - 45) / 45],
+        0.95
+    )
+
+
+def end_positions(beatmap, rows):
+    """Где заканчиваются объекты rows, в пикселях osu!
+
+    У слайдера с нечётным числом проходов берём последнюю опорную точку -
+    без разворачивания кривой это достаточно близко для оценки прыжка.
+    """
+    objs = beatmap.hit_objects
+    ends = np.column_stack([objs.x[rows], objs.y[rows]]) * SCREEN_TO_OSU
+    position = {int(row): n for n, row in enumerate(rows)}
+    for slider in beatmap.sliders:
+        n = position.get(slider.index)
+        if n is not None and slider.slides % 2 == 1:
+            ends[n] = slider.points[-1]
+    return ends
+
+
+def strain_ratings(beatmap):
+    """(aim, speed) - рейтинги навыков карты"""
+    objs = beatmap.hit_objects
+    rows = np.flatnonzero(objs.type & HITTABLE_TYPES)
+    if len(rows) < 2:
+        return 0.0, 0.0
+
+    radius = 54.4 - 4.48 * beatmap.difficulty['cs']
+    scale = NORMALIZED_RADIUS / radius
+    if radius < 30:
+        # Маленькие круги сложнее - расстояния увеличиваем
+        scale *= 1 + min(30 - radius, 5) / 50
+
+    times = objs.start_time[rows].astype(np.float64)
+    heads = np.column_stack([objs.x[rows], objs.y[rows]]) * SCREEN_TO_OSU
+    ends = end_positions(beatmap, rows)
+    distance = np.zeros(len(rows))
+    distance[1:] = np.hypot(*(heads[1:] - ends[:-1]).T) * scale
+    delta = np.full(len(rows), float(MIN_DELTA_MS))
+    delta[1:] = np.maximum(np.diff(times), MIN_DELTA_MS)
+
+    aim = distance ** 0.99 / delta * AIM_MULTIPLIER
+    speed = speed_value(distance) / delta * SPEED_MULTIPLIER
+    aim[0] = speed[0] = 0.0
+
+    ratings = []
+    for values, decay_base in ((aim, AIM_DECAY_BASE), (speed, SPEED_DECAY_BASE)):
+        strains = decayed_strain(values, times, decay_base)
+        ratings.append(np.sqrt(weighted_peaks(strains, times, decay_base)) * STAR_SCALING)
+    return ratings[0], ratings[1]
+
+
+def star_rating(beatmap):
+    aim, speed = strain_ratings(beatmap)
+    return aim + speed + abs(aim - speed) / 2
+
+
+def rate_file(osu_path):
+    """Звёзды одной сложности (выполняется в отдельном процессе); None при ошибке"""
+    beatmap = OsuParser.parse_file(osu_path)
+    if beatmap is None:
+        return None
+    return round(star_rating(beatmap), 2)
+
+
+def _lower_priority():
+    # Расчёт не должен отнимать процессор у игры
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(RATING_NICE)
+        except OSError:
+            pass
+
+
+class StarRatingJob:
+    """Фоновый расчёт звёзд для всех сложностей библиотеки без рейтинга.
+
+    Ждёт фоновое сканирование библиотеки, затем считает карты в пуле
+    процессов с пониженным приоритетом и пишет результаты пачками.
+    start() во время расчёта не теряется: когда проход закончится, job
+    ещё раз соберёт карты без рейтинга (например, импортированные за это время).
+    """
+
+    def __init__(self, library, max_workers=None):
+        self.library = library
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.total = 0
+        self.done = 0
+        self.thread = None
+        self.running = False
+        self.rerun = False      # Просили ещё проход, пока шёл текущий
+        self.lock = threading.Lock()
+
+    @property
+    def is_running(self):
+        return self.running
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                self.rerun = True
+                return self
+            self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        scan_thread = self.library.scan_thread
+        if scan_thread is not None:
+            scan_thread.join()
+        try:
+            while True:
+                self.rate_unrated()
+                with self.lock:
+                    if not self.rerun:
+                        self.running = False
+                        return
+                    self.rerun = False
+        finally:
+            with self.lock:
+                self.running = False
+
+    def rate_unrated(self):
+        """Один проход: все сложности без рейтинга на этот момент"""
+        paths = self.library.unrated_beatmaps()
+        self.total, self.done = len(paths), 0
+        if not paths:
+            return
+        results = []
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_lower_priority) as pool:
+            futures = {pool.submit(rate_file, path): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    stars = future.result()
+                except Exception as e:
+                    print(f"Ошибка расчёта сложности: {str(e)}")
+                    stars = None
+                if stars is not None:
+                    results.append((futures[future], stars))
+                self.done += 1
+                if len(results) >= RATING_BATCH:
+                    self.library.set_stars_many(results)
+                    results = []
+        if results:
+            self.library.set_stars_many(results)
+
+    def wait(self):
+        if self.thread:
+            self.thread.join()
@@ -0,0 +1,1024 @@
+import os
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+import pygame
+from osu_parser import OsuParser
+
+
+STORYBOARD_SIZE = (640, 480)    # Координаты сторибоарда osu! (по высоте - 480)
+LAYERS = ('Background', 'Fail', 'Pass', 'Foreground', 'Overlay')
+LAYER_BACKGROUND, LAYER_FAIL, LAYER_PASS, LAYER_FOREGROUND, LAYER_OVERLAY = range(len(LAYERS))
+# Fail-слой показывается только при проигрыше - у нас игрок всегда "проходит"
+UNDER_OBJECTS = (LAYER_BACKGROUND, LAYER_PASS, LAYER_FOREGROUND)
+OVER_OBJECTS = (LAYER_OVERLAY,)
+
+ORIGINS = {
+    'TopLeft': (0.0, 0.0), 'TopCentre': (0.5, 0.0), 'TopRight': (1.0, 0.0),
+    'CentreLeft': (0.0, 0.5), 'Centre': (0.5, 0.5), 'CentreRight': (1.0, 0.5),
+    'BottomLeft': (0.0, 1.0), 'BottomCentre': (0.5, 1.0), 'BottomRight': (1.0, 1.0),
+    'Custom': (0.0, 0.0),
+}
+# Числовая запись точки привязки в старых .osb
+ORIGIN_NUMBERS = ('TopLeft', 'Centre', 'CentreLeft', 'TopRight', 'BottomCentre', 'TopCentre',
+                  'Custom', 'CentreRight', 'BottomLeft', 'BottomRight')
+
+# Команда -> (каналы, число значений в команде)
+COMMANDS = {
+    'F': (('opacity',), 1),
+    'S': (('scale',), 1),
+    'V': (('vscale',), 2),
+    'R': (('rotation',), 1),
+    'M': (('x', 'y'), 2),
+    'MX': (('x',), 1),
+    'MY': (('y',), 1),
+    'C': (('colour',), 3),
+}
+PARAMETERS = {'H': 'flip_h', 'V': 'flip_v', 'A': 'additive'}
+# Канал -> значение, если у спрайта нет таких команд (x и y берутся из объявления)
+CHANNEL_DEFAULTS = {
+    'opacity': (1.0,), 'scale': (1.0,), 'vscale': (1.0, 1.0), 'rotation': (0.0,),
+    'x': (0.0,), 'y': (0.0,), 'colour': (255.0, 255.0, 255.0),
+    'flip_h': (0.0,), 'flip_v': (0.0,), 'additive': (0.0,),
+}
+
+PRELOAD_MS = 5000               # За сколько до появления спрайта грузим его текстуру
+PRELOAD_BUDGET_MS = 4           # Время кадра на перевод прочитанных текстур в формат экрана
+DECODE_WORKERS = 2              # Потоки, читающие и уменьшающие картинки сторибоарда
+VARIANT_CACHE_PIXELS = 32 * 1024 * 1024    # Сколько пикселей трансформированных копий держим
+ROTATION_CACHE_PIXELS = 16 * 1024 * 1024   # То же для крупных поворотов
+TRANSFORM_BUDGET_MS = 4         # Время кадра на новые копии; дальше спрайт рисуется прошлой копией
+LAST_VARIANTS = 256             # У скольких спрайтов помним прошлую копию
+ANGLE_STEP = 0.5                # Шаг угла поворота копий в градусах
+SCALE_STEP = 0.005              # Шаг масштаба копий (доля размера)
+ALPHA_STEP = 8                  # Шаг вшитой в копию прозрачности (0..255)
+MAX_TINTS = 64                  # Сколько перекрашенных текстур держим
+COMPOSITE_BACKGROUND = (0, 0, 0)    # Цвет очищенного экрана (DirtyRenderer), если фона карты нет
+# Приближения (Storyboard(approximate=True)): шаги ниже и поворот крупных спрайтов в половинном разрешении
+LARGE_ROTATION_PIXELS = 1024 * 1024     # Крупнее - вращаем в половинном разрешении
+LARGE_ANGLE_STEP = 2.0          # Шаг угла крупных поворотов в градусах
+WARM_MS = 1000                  # За сколько до появления спрайта готовим его первую копию
+OVERSIZED_SCREENS = 2           # Спрайт больше стольких экранов масштабируется только в видимой части
+
+
+def _bounce_out(p):
+    return np.select(
+        [p < 1 / 2.75, p < 2 / 2.75, p < 2.5 / 2.75],
+        [7.5625 * p * p,
+         7.5625 * (p - 1.5 / 2.75) ** 2 + 0.75,
+         7.5625 * (p - 2.25 / 2.75) ** 2 + 0.9375],
+        7.5625 * (p - 2.625 / 2.75) ** 2 + 0.984375
+    )
+
+
+# Кривые "In"; Out и InOut получаются из них отражением
+EASE_IN = {
+    'quad': lambda p: p ** 2,
+    'cubic': lambda p: p ** 3,
+    'quart': lambda p: p ** 4,
+    'quint': lambda p: p ** 5,
+    'sine': lambda p: 1 - np.cos(p * math.pi / 2),
+    'expo': lambda p: np.where(p > 0, 2 ** (10 * (p - 1)), 0.0),
+    'circ': lambda p: 1 - np.sqrt(np.maximum(0.0, 1 - p * p)),
+    'elastic': lambda p: -(2 ** (10 * (p - 1))) * np.sin((p - 1.075) * 2 * math.pi / 0.3),
+    'back': lambda p: p * p * (2.70158 * p - 1.70158),
+    'bounce': lambda p: 1 - _bounce_out(1 - p),
+}
+# Номер easing из .osb -> (кривая, режим); ElasticHalf/Quarter считаем обычным Elastic Out
+EASINGS = [None, ('quad', 'out'), ('quad', 'in')]
+for _name in ('quad', 'cubic', 'quart', 'quint', 'sine', 'expo', 'circ'):
+    EASINGS += [(_name, 'in'), (_name, 'out'), (_name, 'inout')]
+EASINGS += [('elastic', 'in'), ('elastic', 'out'), ('elastic', 'out'), ('elastic', 'out'), ('elastic', 'inout')]
+for _name in ('back', 'bounce'):
+    EASINGS += [(_name, 'in'), (_name, 'out'), (_name, 'inout')]
+
+
+def ease(progress, easing):
+    """Кривые easing для массива прогрессов 0..1 (easing - номер для каждого)"""
+    result = progress.copy()
+    for kind in np.unique(easing).tolist():
+        if not 0 < kind < len(EASINGS):
+            continue
+        name, mode = EASINGS[kind]
+        curve = EASE_IN[name]
+        mask = easing == kind
+        p = progress[mask]
+        if mode == 'in':
+            result[mask] = curve(p)
+        elif mode == 'out':
+            result[mask] = 1 - curve(1 - p)
+        else:
+            result[mask] = np.where(p < 0.5, curve(2 * p) / 2, 1 - curve(2 - 2 * p) / 2)
+    return result
+
+
+class StoryboardSprite:
+    """Спрайт или анимация из .osb со списком сегментов команд"""
+
+    def __init__(self, layer, origin, path, x, y, frame_count=1, frame_delay=0.0, loop_once=False):
+        self.layer = layer
+        self.origin = origin
+        self.path = path
+        self.x = x
+        self.y = y
+        self.frame_count = frame_count
+        self.frame_delay = frame_delay
+        self.loop_once = loop_once
+        # (канал, easing, начало, конец, значения в начале, значения в конце)
+        self.segments = []
+
+    def frame_paths(self):
+        if self.frame_count <= 1:
+            return [self.path]
+        base, ext = os.path.splitext(self.path)
+        return [f"{base}{i}{ext}" for i in range(self.frame_count)]
+
+
+def _parse_object(parts):
+    """Строка Sprite/Animation -> StoryboardSprite или None"""
+    kind = parts[0]
+    if kind not in ('Sprite', 'Animation', '4', '6') or len(parts) < 6:
+        return None
+    layer = parts[1]
+    layer = int(layer) if layer.isdigit() else LAYERS.index(layer)
+    origin = ORIGIN_NUMBERS[int(parts[2])] if parts[2].isdigit() else parts[2]
+    origin = ORIGINS.get(origin, ORIGINS['TopLeft'])
+    path = parts[3].strip('"')
+    x, y = float(parts[4]), float(parts[5])
+    if kind in ('Animation', '6') and len(parts) >= 8:
+        loop_once = len(parts) > 8 and parts[8] in ('LoopOnce', '1')
+        return StoryboardSprite(layer, origin, path, x, y, max(1, int(parts[6])), float(parts[7]), loop_once)
+    return StoryboardSprite(layer, origin, path, x, y)
+
+
+def _parse_command(parts):
+    """Строка команды -> сегменты; сокращённая запись с цепочкой значений разворачивается"""
+    event = parts[0]
+    easing = int(parts[1]) if parts[1] else 0
+    start = float(parts[2])
+    end = float(parts[3]) if len(parts) > 3 and parts[3] else start
+    if event == 'P':
+        channel = PARAMETERS.get(parts[4]) if len(parts) > 4 else None
+        if channel is None:
+            return []
+        # Параметр включён с start до end; при start == end - до конца
+        segments = [(channel, 0, start, start, (0.0,), (1.0,))]
+        if end > start:
+            segments.append((channel, 0, end, end, (1.0,), (0.0,)))
+        return segments
+
+    channels, arity = COMMANDS[event]
+    values = [float(v) for v in parts[4:] if v]
+    groups = [tuple(values[i:i + arity]) for i in range(0, len(values) - arity + 1, arity)]
+    if not groups:
+        return []
+    if len(groups) == 1:
+        groups.append(groups[0])
+    duration = end - start
+    segments = []
+    for k in range(len(groups) - 1):
+        begin, finish = start + k * duration, end + k * duration
+        if len(channels) == 1:
+            segments.append((channels[0], easing, begin, finish, groups[k], groups[k + 1]))
+        else:
+            # M - это MX и MY сразу
+            for n, channel in enumerate(channels):
+                segments.append((channel, easing, begin, finish, groups[k][n:n + 1], groups[k + 1][n:n + 1]))
+    return segments
+
+
+def _expand_loop(start, count, segments):
+    """L: сегменты итерации со временем от начала цикла, повторённые count раз"""
+    if not segments:
+        return []
+    duration = max(s[3] for s in segments) - min(s[2] for s in segments)
+    iterations = max(1, count) if duration > 0 else 1
+    return [(channel, easing, begin + start + i * duration, finish + start + i * duration, v0, v1)
+            for i in range(iterations)
+            for channel, easing, begin, finish, v0, v1 in segments]
+
+
+def parse_storyboard(lines, variables=None):
+    """Строки [Events] -> список StoryboardSprite.
+
+    Вложенность команд задаётся отступом (пробелы или '_'). Циклы L
+    разворачиваются сразу; триггеры T (по хитсаундам и т.п.) пропускаются.
+    """
+    names = sorted(variables or {}, key=len, reverse=True)
+    sprites = []
+    sprite = None
+    loop = None     # [начало, число повторов, сегменты] открытого L; у T его нет
+
+    def close_loop():
+        if loop is not None and sprite is not None:
+            sprite.segments.extend(_expand_loop(*loop))
+
+    for line in lines:
+        for name in names:
+            if name in line:
+                line = line.replace(name, variables[name])
+        body = line.lstrip(' _')
+        depth = len(line) - len(body)
+        parts = [p.strip() for p in body.split(',')]
+        try:
+            if depth == 0:
+                close_loop()
+                loop = None
+                sprite = _parse_object(parts)
+                if sprite is not None:
+                    sprites.append(sprite)
+            elif sprite is None:
+                continue
+            elif depth == 1:
+                close_loop()
+                loop = None
+                if parts[0] == 'L':
+                    loop = [float(parts[1]), int(parts[2]), []]
+                elif parts[0] in COMMANDS or parts[0] == 'P':
+                    sprite.segments.extend(_parse_command(parts))
+            elif loop is not None and (parts[0] in COMMANDS or parts[0] == 'P'):
+                loop[2].extend(_parse_command(parts))
+        except (ValueError, IndexError):
+            continue
+    close_loop()
+    return sprites
+
+
+def read_osb(osb_path):
+    """Строки [Events] файла .osb с подставленными [Variables]"""
+    variables = {}
+    lines = []
+    with open(osb_path, 'r', encoding='utf-8-sig') as f:
+        for section, line in OsuParser.iter_sections(f):
+            if line is None:
+                continue
+            if section == 'Variables':
+                name, _, value = line.strip().partition('=')
+                if name.startswith('$'):
+                    variables[name] = value
+            elif section == 'Events':
+                lines.append(line)
+    return lines, variables
+
+
+class Channel:
+    """Сегменты одного свойства всех спрайтов, отсортированные по (спрайт, начало).
+
+    Значение в момент t для массива спрайтов считается одним searchsorted
+    по составному ключу спрайт * span + время: действует последний начавшийся
+    сегмент, до первого сегмента - его начальное значение.
+    """
+
+    def __init__(self, sprite_count, segments, default):
+        self.default = np.array(default, dtype=np.float64)
+        width = len(default)
+        count = len(segments)
+        sprite = np.array([s[0] for s in segments], dtype=np.int64)
+        start = np.array([s[2] for s in segments], dtype=np.float64)
+        order = np.lexsort((start, sprite))    # Сортировка устойчивая - порядок файла сохраняется
+        self.sprite = sprite[order]
+        self.start = start[order]
+        self.end = np.array([s[3] for s in segments], dtype=np.float64)[order]
+        self.easing = np.array([s[1] for s in segments], dtype=np.int64)[order]
+        self.v0 = np.array([s[4] for s in segments], dtype=np.float64).reshape(count, width)[order]
+        self.v1 = np.array([s[5] for s in segments], dtype=np.float64).reshape(count, width)[order]
+        self.counts = np.bincount(self.sprite, minlength=sprite_count)
+        self.first = np.searchsorted(self.sprite, np.arange(sprite_count))
+        self.origin = float(self.start.min()) if count else 0.0
+        self.span = float(self.start.max()) - self.origin + 1 if count else 1.0
+        self.key = self.sprite * self.span + (self.start - self.origin)
+
+    def evaluate(self, sprites, t, defaults=None):
+        """Значения (len(sprites), ширина) в момент t; defaults - для спрайтов без сегментов"""
+        if defaults is None:
+            values = np.tile(self.default, (len(sprites), 1))
+        else:
+            values = np.array(defaults, dtype=np.float64).reshape(len(sprites), -1)
+        has = self.counts[sprites] > 0
+        if not has.any():
+            return values
+        owners = sprites[has]
+        offset = min(max(t - self.origin, 0.0), self.span - 1)
+        idx = np.searchsorted(self.key, owners * self.span + offset, side='right') - 1
+        idx = np.maximum(idx, self.first[owners])
+        start, end = self.start[idx], self.end[idx]
+        length = end - start
+        progress = np.where(length > 0, np.clip((t - start) / np.where(length > 0, length, 1), 0, 1),
+                            (t >= start).astype(np.float64))
+        progress = ease(progress, self.easing[idx])
+        v0 = self.v0[idx]
+        values[has] = v0 + (self.v1[idx] - v0) * progress[:, None]
+        return values
+
+
+def decode_texture(path, factor):
+    """Картинка с диска, уменьшенная в factor раз, если factor < 1, и её исходный размер.
+
+    Выполняется в потоке TexturePool: pygame.image.load и smoothscale отпускают
+    GIL. None - файла нет или он не читается.
+    """
+    if path is None:
+        return None
+    try:
+        surface = pygame.image.load(path)
+    except pygame.error as e:
+        print(f"Ошибка загрузки спрайта: {str(e)}")
+        return None
+    size = surface.get_size()
+    # Картинки сторибоардов часто больше экрана - уменьшаем один раз при загрузке
+    if factor < 1:
+        scaled = (max(1, round(size[0] * factor)), max(1, round(size[1] * factor)))
+        try:
+            surface = pygame.transform.smoothscale(surface, scaled)
+        except ValueError:
+            # smoothscale умеет только 24/32 бита
+            surface = pygame.transform.scale(surface, scaled)
+    return surface, size
+
+
+class SurfaceCache:
+    """LRU поверхностей, ограниченный суммарным числом пикселей"""
+
+    def __init__(self, max_pixels):
+        self.max_pixels = max_pixels
+        self.surfaces = OrderedDict()
+        self.pixels = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def get(self, key):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def put(self, key, surface):
+        pixels = surface.get_width() * surface.get_height()
+        if pixels > self.max_pixels // 4:
+            # Огромная копия вытеснила бы всё остальное
+            return surface
+        self.surfaces[key] = surface
+        self.pixels += pixels
+        while self.pixels > self.max_pixels and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.pixels -= old.get_width() * old.get_height()
+        return surface
+
+
+class TexturePool:
+    """Текстуры сторибоарда и их трансформированные копии.
+
+    Картинка читается с диска и уменьшается до наибольшего размера, в котором
+    её рисуют, в фоновом потоке (request), а в главном только переводится в
+    формат экрана (collect): непрозрачные - без альфа-канала, это самый
+    быстрый blit. Копии с цветом, масштабом и поворотом лежат в LRU,
+    ограниченном числом пикселей, - статичные и повторяющиеся спрайты не
+    создают новых поверхностей каждый кадр.
+    На новые копии у кадра TRANSFORM_BUDGET_MS; когда время вышло, спрайт
+    рисуется своей прошлой копией и догоняет в следующих кадрах.
+
+    approximate включает приближения: масштаб, угол, цвет и прозрачность
+    копий ступеньками и поворот крупных спрайтов в половинном разрешении.
+    """
+
+    def __init__(self, folder, paths, max_scales=None, max_pixels=VARIANT_CACHE_PIXELS, approximate=False):
+        self.folder = folder
+        self.approximate = approximate
+        self.paths = paths          # id текстуры -> путь из .osb
+        # Наибольший масштаб, с которым текстура рисуется, - крупнее хранить незачем
+        self.max_scales = np.ones(len(paths)) if max_scales is None else max_scales
+        self.surfaces = [None] * len(paths)
+        self.loaded = np.zeros(len(paths), dtype=bool)
+        self.has_alpha = np.zeros(len(paths), dtype=bool)
+        self.sizes = np.zeros((len(paths), 2), dtype=np.float64)    # Исходный размер картинки
+        self.tints = {}             # (текстура, цвет, сложение) -> копия исходного размера
+        self.variants = SurfaceCache(max_pixels)
+        # Крупные повороты (в половинном разрешении, угол с шагом LARGE_ANGLE_STEP)
+        self.rotations = SurfaceCache(ROTATION_CACHE_PIXELS)
+        self.scratches = {}         # Формат -> поверхность для видимых частей крупных спрайтов
+        self.multiplier = None      # Одноцветная поверхность для _multiply
+        self.budget_ns = TRANSFORM_BUDGET_MS * 1_000_000
+        self.spent_ns = 0           # Потрачено на новые копии в этом кадре
+        self.last = {}              # Спрайт -> (прошлая копия, способ рисования)
+        self.frame = 0
+        # Спрайты, нарисованные прошлой копией, -> кадр, с которого они ждут новую:
+        # в этом кадре и в прошлом (очередь - кто дольше ждёт, тот первым получает время)
+        self.stale = {}
+        self.waiting = {}
+        self.decoder = None         # Потоки чтения картинок, создаются при первом запросе
+        self.decoding = {}          # Текстура -> Future с результатом decode_texture
+
+    def resolve(self, path):
+        """Путь из .osb (с обратными слешами, без учёта регистра) -> файл или None"""
+        directory, name = os.path.split(path.replace('\\', '/'))
+        return OsuParser.resolve_file(os.path.join(self.folder, directory), name)
+
+    def _decode(self, texture, factor):
+        return decode_texture(self.resolve(self.paths[texture]), factor)
+
+    def request(self, texture, unit=1.0):
+        """Отдаёт текстуру на чтение в фоновый поток; unit - пикселей экрана на единицу сторибоарда"""
+        if self.loaded[texture] or texture in self.decoding:
+            return
+        if self.decoder is None:
+            self.decoder = ThreadPoolExecutor(max_workers=DECODE_WORKERS)
+        factor = float(self.max_scales[texture] * unit)
+        self.decoding[texture] = self.decoder.submit(self._decode, texture, factor)
+
+    def _finish(self, texture, result):
+        """Прочитанная картинка -> текстура в формате экрана (в главном потоке)"""
+        self.loaded[texture] = True
+        if result is None:
+            return None
+        surface, size = result
+        has_alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if has_alpha else surface.convert()
+        self.has_alpha[texture] = has_alpha
+        self.sizes[texture] = size
+        self.surfaces[texture] = surface
+        return surface
+
+    def collect(self, deadline=None):
+        """Забирает уже прочитанные текстуры, пока perf_counter_ns не дошёл до deadline"""
+        for texture, future in list(self.decoding.items()):
+            if deadline is not None and time.perf_counter_ns() > deadline:
+                return
+            if future.done():
+                del self.decoding[texture]
+                self._finish(texture, future.result())
+
+    def load(self, texture, unit=1.0):
+        """Текстура сразу, с ожиданием чтения (при загрузке карты, не в кадре)"""
+        if self.loaded[texture]:
+            return self.surfaces[texture]
+        self.request(texture, unit)
+        return self._finish(texture, self.decoding.pop(texture).result())
+
+    def begin_frame(self):
+        """Новый кадр - снова есть время на новые копии"""
+        self.spent_ns = 0
+        self.frame += 1
+        self.waiting, self.stale = self.stale, {}
+
+    @staticmethod
+    def _has_alpha(surface):
+        # Флаг SRCALPHA выставляет и set_alpha, альфа-канал видно только по маске
+        return surface.get_masks()[3] != 0
+
+    @staticmethod
+    def _with_alpha(surface):
+        """Копия с альфа-каналом (для поворота и вшитой прозрачности)"""
+        if TexturePool._has_alpha(surface):
+            return surface.copy()
+        copy = pygame.Surface(surface.get_size(), pygame.SRCALPHA, 32)
+        # Прозрачность, выставленная для blit на экран, в копию попасть не должна
+        surface_alpha = surface.get_alpha()
+        surface.set_alpha(None)
+        copy.blit(surface, (0, 0))
+        surface.set_alpha(surface_alpha)
+        return copy
+
+    def _multiply(self, surface, colour, flags=pygame.BLEND_RGB_MULT):
+        """Умножает surface на цвет colour (RGBA).
+
+        blit одноцветной поверхности с BLEND_*_MULT в разы быстрее, чем fill
+        с теми же флагами, - на крупных текстурах это десятки миллисекунд.
+        """
+        size = surface.get_size()
+        multiplier = self.multiplier
+        if multiplier is None or multiplier.get_width() < size[0] or multiplier.get_height() < size[1]:
+            width, height = (0, 0) if multiplier is None else multiplier.get_size()
+            multiplier = pygame.Surface((max(size[0], width), max(size[1], height)), pygame.SRCALPHA, 32)
+            self.multiplier = multiplier
+        area = multiplier.subsurface((0, 0) + size)
+        area.fill(colour)
+        surface.blit(area, (0, 0), special_flags=flags)
+
+    def tinted(self, texture, tint, additive=False):
+        """Текстура с цветом tint.
+
+        При сложении цветов BLEND_ADD альфу не учитывает, поэтому копия для
+        сложения хранится с цветом, умноженным на альфу.
+        """
+        surface = self.surfaces[texture]
+        if not additive and tint == (255, 255, 255):
+            return surface
+        key = (texture, tint, additive)
+        cached = self.tints.get(key)
+        if cached is not None:
+            return cached
+        if additive:
+            # С альфа-каналом углы повёрнутой копии останутся нулевыми, то есть ничего не прибавят.
+            # У непрозрачной картинки альфа везде 255 - умножать цвет на неё незачем
+            surface = surface.premul_alpha() if self._has_alpha(surface) else self._with_alpha(surface)
+        else:
+            surface = surface.copy()
+        if tint != (255, 255, 255):
+            self._multiply(surface, tint + (255,))
+        if len(self.tints) >= MAX_TINTS:
+            self.tints.pop(next(iter(self.tints)))
+        self.tints[key] = surface
+        return surface
+
+    def _faded(self, key, surface, alpha, additive):
+        """Копия готовой копии surface со вшитой прозрачностью alpha (в кэше под ключом key).
+
+        Прозрачность вшивается последней, в копию уже нужного размера: мерцающий
+        спрайт стоит копии и одного blit, а не нового smoothscale каждый кадр.
+        """
+        cached = self.variants.get(key)
+        if cached is not None:
+            return cached
+        if additive:
+            surface = surface.copy()
+            self._multiply(surface, (alpha, alpha, alpha, 255))
+        else:
+            surface = self._with_alpha(surface)
+            self._multiply(surface, (255, 255, 255, alpha), pygame.BLEND_RGBA_MULT)
+        return self.variants.put(key, surface)
+
+    def _fits(self, surface, size):
+        width, height = surface.get_size()
+        if not self.approximate:
+            return (width, height) == size
+        # Разница в шаг масштаба с уже готовой текстурой не стоит целого smoothscale
+        return abs(size[0] - width) <= width * SCALE_STEP + 1 and abs(size[1] - height) <= height * SCALE_STEP + 1
+
+    @staticmethod
+    def _rotation_key(texture, size, angle, flip_x, flip_y, tint, alpha, additive):
+        half_size = (max(1, size[0] // 2), max(1, size[1] // 2))
+        return (texture, half_size, round(angle / LARGE_ANGLE_STEP) * LARGE_ANGLE_STEP % 360,
+                flip_x, flip_y, tint, alpha, additive)
+
+    def variant(self, texture, size, angle, flip_x, flip_y, tint, alpha=None, additive=False):
+        """Копия текстуры нужного размера, поворота и цвета (из кэша, если уже была)"""
+        key = (texture, size, angle, flip_x, flip_y, tint, alpha, additive)
+        surface = self.variants.get(key)
+        if surface is not None:
+            return surface
+        if alpha is not None:
+            base = self.variant(texture, size, angle, flip_x, flip_y, tint, None, additive)
+            return self._faded(key, base, alpha, additive)
+        # Цвет - на уменьшенной при загрузке текстуре, дальше только геометрия
+        surface = self.tinted(texture, tint, additive)
+        if not self._fits(surface, size):
+            surface = pygame.transform.smoothscale(surface, size)
+        if flip_x or flip_y:
+            surface = pygame.transform.flip(surface, flip_x, flip_y)
+        if angle:
+            if not self._has_alpha(surface):
+                # Иначе углы повёрнутой картинки зальются цветом её пикселя
+                surface = self._with_alpha(surface)
+            surface = pygame.transform.rotate(surface, -angle)
+        if surface is self.surfaces[texture]:
+            return surface
+        return self.variants.put(key, surface)
+
+    def rotated_large(self, texture, size, angle, flip_x, flip_y, tint, alpha=None, additive=False):
+        """Повёрнутая половинная копия большого спрайта (из своего кэша, если уже была).
+
+        Угол округляется до LARGE_ANGLE_STEP: на весь экран разница не видна,
+        а медленно вращающийся фон перестаёт давать новый rotate каждый кадр.
+        """
+        key = self._rotation_key(texture, size, angle, flip_x, flip_y, tint, alpha, additive)
+        surface = self.rotations.get(key)
+        if surface is not None:
+            return surface
+        # Прозрачность - до поворота: половинная копия с ней одна на все углы
+        half = self.variant(texture, key[1], 0.0, flip_x, flip_y, tint, alpha, additive)
+        if not self._has_alpha(half):
+            half = self._with_alpha(half)
+        return self.rotations.put(key, pygame.transform.rotate(half, -key[2]))
+
+    def _ready(self, large, texture, size, angle, flip_x, flip_y, tint, alpha, additive):
+        """Уже готовая копия (без новых трансформаций) или None"""
+        if large:
+            return self.rotations.get(self._rotation_key(texture, size, angle, flip_x, flip_y, tint, alpha, additive))
+        surface = self.variants.get((texture, size, angle, flip_x, flip_y, tint, alpha, additive))
+        plain = not (angle or flip_x or flip_y) and alpha is None and tint == (255, 255, 255)
+        if surface is None and plain and self._fits(self.surfaces[texture], size):
+            surface = self.surfaces[texture]
+        return surface
+
+    def _scratch(self, size, like):
+        """Поверхность size в формате like - часть заранее выделенной, а не новая каждый кадр"""
+        masks = like.get_masks()
+        scratch = self.scratches.get(masks)
+        if scratch is None or scratch.get_width() < size[0] or scratch.get_height() < size[1]:
+            width, height = (0, 0) if scratch is None else scratch.get_size()
+            scratch = pygame.Surface((max(size[0], width), max(size[1], height)), 0, like)
+            self.scratches[masks] = scratch
+        return scratch.subsurface((0, 0) + size)
+
+    def _upscale_visible(self, target, rotated, centre):
+        """Растягивает вдвое видимую на target часть поворота; (поверхность, позиция) или None"""
+        rotated_width, rotated_height = rotated.get_size()
+        full = pygame.Rect(0, 0, rotated_width * 2, rotated_height * 2)
+        full.center = centre
+        visible = full.clip(target.get_rect())
+        if not visible.width or not visible.height:
+            return None
+        left, top = (visible.left - full.left) // 2, (visible.top - full.top) // 2
+        right = min(rotated_width, (visible.right - full.left + 1) // 2)
+        bottom = min(rotated_height, (visible.bottom - full.top + 1) // 2)
+        size = ((right - left) * 2, (bottom - top) * 2)
+        surface = self._scratch(size, rotated)
+        pygame.transform.scale(rotated.subsurface((left, top, right - left, bottom - top)), size, surface)
+        return surface, (full.left + left * 2, full.top + top * 2)
+
+    def _scale_visible(self, target, surface, size, centre):
+        """Масштабирует до size только видимую на target часть; (поверхность, позиция) или None"""
+        full = pygame.Rect((0, 0), size)
+        full.center = centre
+        visible = full.clip(target.get_rect())
+        if not visible.width or not visible.height:
+            return None
+        width, height = surface.get_size()
+        scale_x, scale_y = width / size[0], height / size[1]
+        left = int((visible.left - full.left) * scale_x)
+        top = int((visible.top - full.top) * scale_y)
+        right = max(left + 1, min(width, math.ceil((visible.right - full.left) * scale_x)))
+        bottom = max(top + 1, min(height, math.ceil((visible.bottom - full.top) * scale_y)))
+        part_size = (max(1, round((right - left) / scale_x)), max(1, round((bottom - top) / scale_y)))
+        part = self._scratch(part_size, surface)
+        pygame.transform.smoothscale(surface.subsurface((left, top, right - left, bottom - top)), part_size, part)
+        return part, (full.left + round(left / scale_x), full.top + round(top / scale_y))
+
+    def _remember(self, sprite, surface, mode):
+        self.last.pop(sprite, None)
+        self.last[sprite] = (surface, mode)
+        if len(self.last) > LAST_VARIANTS:
+            del self.last[next(iter(self.last))]
+
+    def _can_wait(self, sprite):
+        """Может ли спрайт ещё кадр рисоваться прошлой копией"""
+        if self.spent_ns >= self.budget_ns:
+            return True
+        # Время есть, но его сначала получают те, кто ждёт дольше
+        since = self.waiting.get(sprite, self.frame)
+        return any(other < since for other in self.waiting.values())
+
+    def _surface(self, large, sprite):
+        """Копия для спрайта: готовая, новая или, если время кадра вышло, прошлая"""
+        texture, size, angle, flip_x, flip_y, tint, alpha, additive, _, _, number = sprite
+        args = (texture, size, angle, flip_x, flip_y, tint, alpha, additive)
+        # Прошлая копия годится, только если рисуется тем же способом
+        mode = (large, alpha is None, additive)
+        last = self.last.get(number)
+        surface = self._ready(large, *args)
+        if surface is None and last is not None and last[1] == mode and self._can_wait(number):
+            surface = last[0]
+            self.stale[number] = self.waiting.get(number, self.frame)
+        elif surface is None:
+            started = time.perf_counter_ns()
+            surface = (self.rotated_large if large else self.variant)(*args)
+            self.spent_ns += time.perf_counter_ns() - started
+            self.waiting.pop(number, None)
+        self._remember(number, surface, mode)
+        return surface
+
+    def _kind(self, target, sprite):
+        """Крупный поворот (только с приближениями), спрайт в разы больше экрана или обычный"""
+        size, angle = sprite[1], sprite[2]
+        if angle:
+            # Видимую часть поворота не вырезать - без приближений он целиком
+            large = self.approximate and size[0] * size[1] > LARGE_ROTATION_PIXELS
+            return 'large' if large else 'plain'
+        if size[0] * size[1] > OVERSIZED_SCREENS * target.get_width() * target.get_height():
+            return 'oversized'
+        return 'plain'
+
+    def warm(self, target, sprite):
+        """Копия спрайта до его первого кадра (см. Storyboard.warm)"""
+        kind = self._kind(target, sprite)
+        if kind != 'oversized' and sprite[-1] not in self.last:
+            self._surface(kind == 'large', sprite)
+
+    def draw(self, target, sprite):
+        """Рисует спрайт - кортеж параметров из Storyboard.draw - и возвращает прямоугольник"""
+        texture, size, angle, flip_x, flip_y, tint, alpha, additive, surface_alpha, centre, number = sprite
+        kind = self._kind(target, sprite)
+        large = kind == 'large'
+        if kind == 'oversized':
+            # Сильный зум: целая копия была бы в разы больше экрана, а видна лишь её часть
+            base = self.variant(texture, self.surfaces[texture].get_size(), 0.0, flip_x, flip_y, tint, alpha, additive)
+            result = self._scale_visible(target, base, size, centre)
+        else:
+            surface = self._surface(large, sprite)
+            result = self._upscale_visible(target, surface, centre) if large else (
+                surface, surface.get_rect(center=centre))
+        if result is None:
+            return None
+        surface, position = result
+        if additive:
+            return target.blit(surface, position, special_flags=pygame.BLEND_RGB_ADD)
+        if alpha is None:
+            surface.set_alpha(surface_alpha)
+        return target.blit(surface, position)
+
+
+class Storyboard:
+    """Сторибоард карты: разобранные команды, скомпилированные в массивы.
+
+    Каждый кадр по массивам за несколько векторных операций находятся живые
+    спрайты и их свойства; в цикле остаются только blit'ы. Текстуры
+    подгружаются заранее, за PRELOAD_MS до появления спрайта: первые - в
+    prepare при загрузке карты, остальные - в фоновом потоке по ходу игры.
+    approximate - см. TexturePool.
+    """
+
+    def __init__(self, sprites, folder, approximate=False):
+        # Порядок отрисовки: по слоям, внутри слоя - как в файле
+        sprites = sorted(sprites, key=lambda s: s.layer)
+        count = len(sprites)
+        self.count = count
+        self.layer = np.array([s.layer for s in sprites], dtype=np.int64)
+        self.origin = np.array([s.origin for s in sprites], dtype=np.float64).reshape(count, 2)
+        self.position = np.array([(s.x, s.y) for s in sprites], dtype=np.float64).reshape(count, 2)
+
+        paths, texture_ids = [], {}
+        self.texture = np.zeros(count, dtype=np.int64)    # Первый кадр спрайта
+        for n, sprite in enumerate(sprites):
+            frames = sprite.frame_paths()
+            key = tuple(frames)
+            if key not in texture_ids:
+                texture_ids[key] = len(paths)
+                paths.extend(frames)
+            self.texture[n] = texture_ids[key]
+        self.frame_count = np.array([s.frame_count for s in sprites], dtype=np.int64)
+        self.frame_delay = np.array([max(s.frame_delay, 1.0) for s in sprites], dtype=np.float64)
+        self.loop_once = np.array([s.loop_once for s in sprites], dtype=bool)
+
+        max_scales = np.zeros(len(paths))
+        for n, sprite in enumerate(sprites):
+            first = int(self.texture[n])
+            frames = slice(first, first + sprite.frame_count)
+            max_scales[frames] = np.maximum(max_scales[frames], self._max_scale(sprite))
+        self.approximate = approximate
+        self.textures = TexturePool(folder, paths, max_scales, approximate=approximate)
+
+        # Спрайт живёт от начала первой команды до конца последней
+        self.life_start = np.full(count, np.inf)
+        self.life_end = np.full(count, -np.inf)
+        by_channel = {name: [] for name in CHANNEL_DEFAULTS}
+        for n, sprite in enumerate(sprites):
+            for channel, easing, start, end, v0, v1 in sprite.segments:
+                by_channel[channel].append((n, easing, start, end, v0, v1))
+                self.life_start[n] = min(self.life_start[n], start)
+                self.life_end[n] = max(self.life_end[n], end)
+        self.channels = {name: Channel(count, segments, CHANNEL_DEFAULTS[name])
+                         for name, segments in by_channel.items()}
+        self.layer_masks = {}
+        # Слой из неизменных спрайтов начала списка (см. _draw_with_composite)
+        self.drawn_params = []
+        self.composite = None
+        self.composite_count = 0
+        self.composite_rect = None
+        self.background = None  # Фон карты под сторибоардом (load_background) - им очищен экран
+        self.preload_order = np.argsort(self.life_start, kind='stable')
+        self.preload_starts = self.life_start[self.preload_order]
+        self.preload_cursor = 0     # Текстуры спрайтов до него (в порядке появления) уже запрошены
+        self.late_loads = 0         # Сколько раз спрайт пропустил кадр: его текстура ещё не прочитана
+        self.warm_cursor = 0        # Спрайты до него уже получили копию заранее (warm)
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def _max_scale(sprite):
+        """Наибольший множитель размера спрайта за всё время"""
+        scale, vector = 1.0, 1.0
+        scales = [abs(v) for s in sprite.segments if s[0] == 'scale' for v in s[4] + s[5]]
+        vectors = [abs(v) for s in sprite.segments if s[0] == 'vscale' for v in s[4] + s[5]]
+        if scales:
+            scale = max(scales)
+        if vectors:
+            vector = max(vectors)
+        return scale * vector
+
+    @classmethod
+    def load(cls, beatmap, approximate=False):
+        """Сторибоард мапсета (.osb) и сложности ([Events] .osu) или None, если его нет"""
+        sprites = []
+        try:
+            for name in sorted(os.listdir(beatmap.folder)):
+                if name.lower().endswith('.osb'):
+                    lines, variables = read_osb(os.path.join(beatmap.folder, name))
+                    sprites.extend(parse_storyboard(lines, variables))
+        except OSError as e:
+            print(f"Ошибка чтения сторибоарда: {str(e)}")
+        sprites.extend(parse_storyboard(beatmap.events.get('storyboard', [])))
+        sprites = [s for s in sprites if s.segments]
+        if not sprites:
+            return None
+        return cls(sprites, beatmap.folder, approximate)
+
+    def uses_file(self, file_name):
+        """Рисует ли сторибоард эту картинку (тогда фон карты не нужен)"""
+        if not file_name:
+            return False
+        target = file_name.replace('\\', '/').lower()
+        return any(path.replace('\\', '/').lower() == target for path in self.textures.paths)
+
+    def preload(self, t, unit, budget_ms=PRELOAD_BUDGET_MS):
+        """Грузим текстуры спрайтов, которые появятся в ближайшие PRELOAD_MS.
+
+        Курсор идёт вперёд по спрайтам в порядке появления и отдаёт их текстуры
+        фоновому потоку. В кадре прочитанные переводятся в формат экрана -
+        сколько влезает в budget_ms; None - дождаться всех запрошенных.
+        """
+        pool = self.textures
+        end = np.searchsorted(self.preload_starts, t + PRELOAD_MS, side='right')
+        while self.preload_cursor < end:
+            n = self.preload_order[self.preload_cursor]
+            first = int(self.texture[n])
+            for texture in range(first, first + int(self.frame_count[n])):
+                pool.request(texture, unit)
+            self.preload_cursor += 1
+        if budget_ms is None:
+            for texture in list(pool.decoding):
+                pool.load(texture, unit)
+        else:
+            pool.collect(time.perf_counter_ns() + budget_ms * 1_000_000)
+
+    def _loaded(self, n):
+        first = int(self.texture[n])
+        return self.textures.loaded[first:first + int(self.frame_count[n])].all()
+
+    def prepare(self, screen, current_time=0):
+        """Текстуры первых PRELOAD_MS и копии первых WARM_MS - при загрузке карты, а не в игре"""
+        self.preload(float(current_time), screen.get_height() / STORYBOARD_SIZE[1], None)
+        self.warm(screen, float(current_time), False)
+
+    def active(self, t, layers):
+        mask = self.layer_masks.get(layers)
+        if mask is None:
+            mask = self.layer_masks[layers] = np.isin(self.layer, layers)
+        return np.flatnonzero(mask & (self.life_start <= t) & (t < self.life_end))
+
+    def draw(self, screen, current_time, layers=UNDER_OBJECTS):
+        """Слои layers в момент current_time; возвращает нарисованные прямоугольники"""
+        t = float(current_time)
+        if layers != UNDER_OBJECTS:
+            params = self._params(screen, t, self.active(t, layers))
+            return [rect for rect in map(partial(self.textures.draw, screen), params) if rect]
+        self.textures.begin_frame()
+        self.preload(t, screen.get_height() / STORYBOARD_SIZE[1])
+        rects = self._draw_with_composite(screen, self._params(screen, t, self.active(t, layers)))
+        self.warm(screen, t)
+        return rects
+
+    def warm(self, screen, current_time, limited=True):
+        """Копии спрайтов, которые появятся в ближайшие WARM_MS, - на остаток времени кадра.
+
+        В свой первый кадр спрайт уже не начинает с нуля: если на точную
+        копию времени не хватит, он нарисуется приготовленной.
+        """
+        pool = self.textures
+        # Дальше курсора preload не забегаем - там ещё не все текстуры загружены
+        end = min(np.searchsorted(self.preload_starts, current_time + WARM_MS, side='right'),
+                  self.preload_cursor)
+        if self.warm_cursor >= end or limited and pool.spent_ns >= pool.budget_ns:
+            return
+        upcoming = self.preload_order[self.warm_cursor:end]
+        params = {sprite[-1]: sprite for sprite in self._params(screen, current_time + WARM_MS, upcoming)}
+        for n in upcoming.tolist():
+            if limited and pool.spent_ns >= pool.budget_ns:
+                return
+            if n in params:
+                pool.warm(screen, params[n])
+            elif not self._loaded(n):
+                return  # Текстура ещё читается - спрайт получит копию в следующих кадрах
+            self.warm_cursor += 1
+
+    def _params(self, screen, t, sprites):
+        """Параметры рисования (кортежи для TexturePool.draw) видимых спрайтов sprites в момент t"""
+        if not len(sprites):
+            return []
+        unit = screen.get_height() / STORYBOARD_SIZE[1]
+        channels = self.channels
+        opacity = np.clip(channels['opacity'].evaluate(sprites, t)[:, 0], 0, 1)
+        visible = opacity > 0
+        sprites, opacity = sprites[visible], opacity[visible]
+        if not len(sprites):
+            return []
+
+        # Кадр анимации
+        frames = self.frame_count[sprites]
+        frame = ((t - self.life_start[sprites]) // self.frame_delay[sprites]).astype(np.int64)
+        frame = np.where(self.loop_once[sprites], np.minimum(frame, frames - 1), frame % frames)
+        textures = self.texture[sprites] + frame
+        # Всё в координатах экрана: 480 по высоте, по ширине по центру
+        left = (screen.get_width() - STORYBOARD_SIZE[0] * unit) / 2
+        # Обычно всё уже загружено preload; иначе (перемотка, медленный диск) картинка
+        # читается в фоне, а спрайт появится, когда она будет готова
+        missing = ~self.textures.loaded[textures]
+        for texture in np.unique(textures[missing]).tolist():
+            self.textures.request(texture, unit)
+        self.late_loads += int(missing.sum())
+
+        position = self.position[sprites]
+        x = channels['x'].evaluate(sprites, t, position[:, 0])[:, 0] * unit + left
+        y = channels['y'].evaluate(sprites, t, position[:, 1])[:, 0] * unit
+        scale = channels['scale'].evaluate(sprites, t)[:, 0, None] * channels['vscale'].evaluate(sprites, t)
+        flip_x = (channels['flip_h'].evaluate(sprites, t)[:, 0] > 0.5) ^ (scale[:, 0] < 0)
+        flip_y = (channels['flip_v'].evaluate(sprites, t)[:, 0] > 0.5) ^ (scale[:, 1] < 0)
+        scale = np.abs(scale)
+        # По модулю 360: вращение по кругу повторяет уже готовые копии
+        angle = np.degrees(channels['rotation'].evaluate(sprites, t)[:, 0])
+        colour = np.clip(channels['colour'].evaluate(sprites, t), 0, 255)
+        if self.approximate:
+            # Масштаб ступеньками по SCALE_STEP: медленный зум берёт копии из кэша, а не из smoothscale
+            steps = np.round(np.log(np.maximum(scale, 1e-6)) / np.log1p(SCALE_STEP))
+            scale = np.where(scale > 0, np.exp(steps * np.log1p(SCALE_STEP)), 0.0)
+            angle = np.round(angle / ANGLE_STEP) * ANGLE_STEP
+            # Цвет - 64 уровня на канал, включая ровно 255
+            colour = np.rint(colour * 63 / 255) * 255 / 63
+        size = np.rint(self.textures.sizes[textures] * scale * unit).astype(np.int64)
+        angle = angle % 360
+        colour = np.rint(colour).astype(np.int64)
+        additive = channels['additive'].evaluate(sprites, t)[:, 0] > 0.5
+        alpha = np.rint(opacity * 255).astype(np.int64)
+
+        # Сдвиг центра картинки от точки привязки с учётом отражения и поворота
+        origin = self.origin[sprites].copy()
+        origin[:, 0] = np.where(flip_x, 1 - origin[:, 0], origin[:, 0])
+        origin[:, 1] = np.where(flip_y, 1 - origin[:, 1], origin[:, 1])
+        dx, dy = ((origin - 0.5) * size).T
+        radians = np.radians(angle)
+        cos, sin = np.cos(radians), np.sin(radians)
+        centre_x = x - (dx * cos - dy * sin)
+        centre_y = y - (dx * sin + dy * cos)
+
+        pool = self.textures
+        # Непрозрачной картинке прозрачность даёт set_alpha при blit - это быстро.
+        # С альфа-каналом, поворотом или сложением она вшивается в копию: так
+        # blit в разы дешевле, а с приближениями копии по шагу ALPHA_STEP переиспользуются
+        baked = additive | (angle != 0) | pool.has_alpha[textures]
+        level = alpha
+        if self.approximate:
+            level = np.where(alpha >= 255, 255, alpha // ALPHA_STEP * ALPHA_STEP + ALPHA_STEP // 2)
+        params = []
+        for n, texture, (w, h), a, fx, fy, tint, add, bake, opaque, lvl, cx, cy in zip(
+                sprites.tolist(), textures.tolist(), size.tolist(), angle.tolist(), flip_x.tolist(),
+                flip_y.tolist(), map(tuple, colour.tolist()), additive.tolist(), baked.tolist(),
+                alpha.tolist(), level.tolist(), np.rint(centre_x).tolist(), np.rint(centre_y).tolist()):
+            if w <= 0 or h <= 0 or pool.surfaces[texture] is None:
+                continue
+            params.append((texture, (w, h), a, fx, fy, tint, lvl if bake else None, add,
+                           None if opaque >= 255 else opaque, (int(cx), int(cy)), n))
+        return params
+
+    def _draw_with_composite(self, screen, params):
+        """Нижние слои поверх очищенного экрана.
+
+        Спрайты в начале списка, которые не изменились с прошлого кадра,
+        рисуются один раз в непрозрачный слой; дальше, пока они стоят на
+        месте, весь этот слой - один быстрый blit вместо blit'а каждого
+        спрайта с альфой.
+        """
+        pool = self.textures
+        stable = 0
+        for current, previous in zip(params, self.drawn_params):
+            if current != previous:
+                break
+            stable += 1
+        self.drawn_params = params
+        if self.composite is None or self.composite.get_size() != screen.get_size():
+            self.composite = pygame.Surface(screen.get_size())
+            self.composite_count = 0
+        if self.composite_count > stable:
+            self.composite_count = 0
+        if stable > self.composite_count:
+            if not self.composite_count:
+                if self.background is not None and self.background.get_size() == screen.get_size():
+                    self.composite.blit(self.background, (0, 0))
+                else:
+                    self.composite.fill(COMPOSITE_BACKGROUND)
+                self.composite_rect = None
+            for sprite in params[self.composite_count:stable]:
+                rect = pool.draw(self.composite, sprite)
+                if rect:
+                    self.composite_rect = rect if self.composite_rect is None else self.composite_rect.union(rect)
+            self.composite_count = stable
+
+        rects = []
+        if self.composite_count and self.composite_rect is not None:
+            rects.append(screen.blit(self.composite, self.composite_rect, self.composite_rect))
+        for sprite in params[self.composite_count:]:
+            rect = pool.draw(screen, sprite)
+            if rect:
+                rects.append(rect)
+        if pool.stale:
+            # Нарисованное прошлой копией не считается неизменным - перерисуем, когда догонит
+            self.drawn_params = [None if sprite[-1] in pool.stale else sprite for sprite in params]
+        return rects
+
+    def draw_overlay(self, screen, current_time):
+        """Слой Overlay - поверх хит-объектов"""
+        return self.draw(screen, current_time, OVER_OBJECTS)
@@ -0,0 +1,81 @@
+# tests/test_audio_clock.py
+import unittest
+from audio_clock import AudioClock, CALIBRATION_HITS, START_HOLD_MS
+
+
+class FakeAudio:
+    """Системный таймер и get_pos(), который обновляется рывками"""
+
+    def __init__(self):
+        self.wall = 1000
+        self.pos = 0
+
+    def ticks(self):
+        return self.wall
+
+    def get_pos(self):
+        return self.pos
+
+
+class TestAudioClock(unittest.TestCase):
+    def make_clock(self, audio, **kwargs):
+        return AudioClock(get_audio_pos=audio.get_pos, get_ticks=audio.ticks, **kwargs)
+
+    def test_holds_until_music_starts(self):
+        audio = FakeAudio()
+        clock = self.make_clock(audio)
+        audio.wall += 200
+        self.assertEqual(clock.tick(), 0)
+        # Музыка пошла с опозданием в 200 мс - время считается от её начала
+        audio.wall += 50
+        audio.pos = 40
+        self.assertEqual(clock.tick(), 40)
+
+    def test_extrapolates_between_coarse_updates(self):
+        audio = FakeAudio()
+        clock = self.make_clock(audio)
+        audio.pos = 10
+        clock.tick()
+        times = []
+        for frame in range(1, 40):
+            audio.wall += 4
+            if frame % 10 == 0:
+                audio.pos += 40  # Позиция обновляется раз в 40 мс
+            times.append(clock.tick())
+        self.assertEqual(times, sorted(times))
+        self.assertAlmostEqual(times[-1], 10 + 39 * 4, delta=2)
+
+    def test_snaps_on_large_drift_and_never_goes_back(self):
+        audio = FakeAudio()
+        clock = self.make_clock(audio)
+        audio.pos = 10
+        clock.tick()
+        audio.wall += 10
+        audio.pos = 300
+        self.assertEqual(clock.tick(), 300)
+        audio.wall += 10
+        audio.pos = 150
+        self.assertGreaterEqual(clock.tick(), 300)
+
+    def test_without_music_follows_wall_clock(self):
+        audio = FakeAudio()
+        audio.pos = -1
+        clock = self.make_clock(audio, global_offset=5, map_offset=-15)
+        audio.wall += START_HOLD_MS // 2
+        self.assertEqual(clock.tick(), START_HOLD_MS // 2 - 10)
+
+    def test_calibration_moves_map_offset(self):
+        clock = self.make_clock(FakeAudio(), calibrate=True)
+        for i in range(CALIBRATION_HITS):
+            clock.record_hit_error(25 + (i % 3) - 1)
+        self.assertEqual(clock.map_offset, -25)
+        self.assertEqual(clock.hit_errors, [])
+
+        clock = self.make_clock(FakeAudio())
+        for i in range(CALIBRATION_HITS):
+            clock.record_hit_error(25)
+        self.assertEqual(clock.map_offset, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
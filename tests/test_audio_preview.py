@@ -0,0 +1,66 @@
+# tests/test_audio_preview.py
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from audio_preview import find_audio, neighbours, PreviewPlayer
+
+
+class TestAudioPreview(unittest.TestCase):
+    def setUp(self):
+        self.maps_dir = tempfile.mkdtemp()
+        for n in range(4):
+            folder = os.path.join(self.maps_dir, f"set{n}")
+            os.makedirs(folder)
+            with open(os.path.join(folder, "map [Easy].osu"), 'w', encoding='utf-8') as f:
+                f.write("osu file format v14\n\n[General]\nAudioFilename: Song.MP3\n\n"
+                        "[HitObjects]\n256,192,1000,1,0,0:0:0:0:\n")
+            with open(os.path.join(folder, "song.mp3"), 'wb') as f:
+                f.write(bytes([n]) * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.maps_dir)
+
+    def wait_for(self, player, *folders):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if all(player.cached(folder) for folder in folders) and not player.pending:
+                return
+            time.sleep(0.01)
+        self.fail("треки не прочитаны")
+
+    def test_find_audio_ignores_case(self):
+        path = find_audio("set0", self.maps_dir)
+        self.assertEqual(path, os.path.join(self.maps_dir, "set0", "song.mp3"))
+
+    def test_neighbours_nearest_first(self):
+        items = list("abcdef")
+        self.assertEqual(neighbours(items, 2, 2), ['d', 'b', 'e', 'a'])
+        self.assertEqual(neighbours(items, 0, 2), ['b', 'c'])
+
+    def test_request_prefetches_neighbours(self):
+        player = PreviewPlayer(self.maps_dir)
+        player.request("set1", ["set2", "set0"])
+        self.wait_for(player, "set1", "set2", "set0")
+        path, data = player.cached("set2")
+        self.assertEqual(path, os.path.join(self.maps_dir, "set2", "song.mp3"))
+        self.assertEqual(data, bytes([2]) * 100)
+        self.assertIsNone(player.cached("set3"))
+        player.stop()
+        self.assertIsNone(player.requested)
+
+    def test_cache_is_bounded(self):
+        player = PreviewPlayer(self.maps_dir, cache_bytes=250)
+        player.request("set0", ["set1"])
+        self.wait_for(player, "set0", "set1")
+        player.request("set2", ["set3"])
+        self.wait_for(player, "set2", "set3")
+        # Треки прошлого выбора вытеснены, текущие остались
+        self.assertLessEqual(player.cached_bytes, 250)
+        self.assertIsNone(player.cached("set0"))
+        self.assertIsNotNone(player.cached("set3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
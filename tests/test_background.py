@@ -0,0 +1,60 @@
+# tests/test_background.py
+import unittest
+import os
+import shutil
+import tempfile
+import pygame
+from background import load_background
+
+
+class Beatmap:
+    def __init__(self, folder, background):
+        self.folder = folder
+        self.events = {'background': background, 'video': None, 'breaks': [], 'storyboard': []}
+
+
+class Storyboard:
+    def __init__(self, files):
+        self.files = files
+
+    def uses_file(self, name):
+        return name in self.files
+
+
+class TestBackground(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        # Широкая картинка: слева красная половина, справа синяя, по центру белая полоса
+        image = pygame.Surface((400, 100))
+        image.fill((255, 0, 0), (0, 0, 200, 100))
+        image.fill((0, 0, 255), (200, 0, 200, 100))
+        image.fill((255, 255, 255), (190, 0, 20, 100))
+        pygame.image.save(image, os.path.join(self.folder, "BG.png"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_cover_crop_and_dim(self):
+        surface = load_background(Beatmap(self.folder, "bg.png"), (100, 100), dim=0.5, blur=0)
+        self.assertEqual(surface.get_size(), (100, 100))
+        # По высоте картинка заполняет экран, по ширине обрезана по центру
+        self.assertEqual(surface.get_at((50, 50))[:3], (128, 128, 128))
+        self.assertEqual(surface.get_at((5, 50))[:3], (128, 0, 0))
+        self.assertEqual(surface.get_at((95, 50))[:3], (0, 0, 128))
+
+    def test_blur_spreads_edges(self):
+        sharp = load_background(Beatmap(self.folder, "bg.png"), (100, 100), dim=0, blur=0)
+        blurred = load_background(Beatmap(self.folder, "bg.png"), (100, 100), dim=0, blur=10)
+        self.assertEqual(sharp.get_at((35, 50))[:3], (255, 0, 0))
+        self.assertGreater(blurred.get_at((35, 50))[1], 0)
+
+    def test_skipped_when_missing_or_drawn_by_storyboard(self):
+        self.assertIsNone(load_background(Beatmap(self.folder, None), (100, 100)))
+        self.assertIsNone(load_background(Beatmap(self.folder, "missing.jpg"), (100, 100)))
+        self.assertIsNone(load_background(Beatmap(self.folder, "bg.png"), (100, 100), Storyboard({"bg.png"})))
+        self.assertIsNone(load_background(Beatmap(self.folder, "bg.png"), (100, 100), dim=1))
+        self.assertIsNotNone(load_background(Beatmap(self.folder, "bg.png"), (100, 100), Storyboard(set())))
+
+
+if __name__ == '__main__':
+    unittest.main()
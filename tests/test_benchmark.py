@@ -0,0 +1,48 @@
+# tests/test_benchmark.py
+import unittest
+import os
+import shutil
+import tempfile
+from benchmark import run_benchmarks, compare, synthetic_osu
+from osu_parser import OsuParser
+from map_cache import map_cache
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_synthetic_map_parses(self):
+        tmp_dir = tempfile.mkdtemp()
+        cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(tmp_dir, "cache")
+        try:
+            path = os.path.join(tmp_dir, "map.osu")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(synthetic_osu(500, seed=1))
+            beatmap = OsuParser.parse_file(path)
+            self.assertEqual(len(beatmap.hit_objects), 500)
+            self.assertEqual(len(beatmap.sliders), 99)  # Каждый пятый, кроме одного спиннера
+            self.assertEqual(len(beatmap.spinners), 5)
+        finally:
+            map_cache.cache_dir = cache_dir
+            shutil.rmtree(tmp_dir)
+
+    def test_report_and_compare(self):
+        report = run_benchmarks((100,), log=lambda message: None, startup_repeats=1)
+        stages = set(report['results'])
+        for name in ('parse_map', 'update', 'handle_input', 'press', 'draw', 'map_pull_draw'):
+            self.assertIn(name, stages)
+            self.assertGreater(report['results'][name]['100']['mean_us'], 0)
+        self.assertGreater(report['results']['storyboard_draw']['synthetic']['mean_us'], 0)
+        startup = report['results']['startup_first_frame']['cold']
+        self.assertGreater(startup['mean_us'], report['results']['startup_import']['cold']['mean_us'])
+
+        self.assertEqual(compare(report, report), [])
+        slower = {'results': {name: {size: dict(summary, median_us=summary['median_us'] * 2)
+                                     for size, summary in sizes.items()}
+                              for name, sizes in report['results'].items()}}
+        self.assertEqual(compare(report, slower), [])
+        regressions = compare(slower, report)
+        self.assertEqual(len(regressions), len(stages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# tests/test_fixed_step.py
+import unittest
+import random
+import pygame
+from fixed_step import FixedStepLoop
+from game_state import GameState
+from hit_objects import HitObjectTable, TYPE_CIRCLE, FLAG_MISSED
+
+
+class TestFixedStep(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.font.init()
+
+    def test_ticks_cover_elapsed_time(self):
+        loop = FixedStepLoop(step_ms=1)
+        self.assertEqual(loop.steps(3.5), [1, 2, 3])
+        self.assertEqual(loop.steps(3.9), [])
+        self.assertEqual(loop.steps(5), [4, 5])
+
+    def test_long_stall_jumps_to_now(self):
+        loop = FixedStepLoop(step_ms=1, max_steps=10)
+        self.assertEqual(loop.steps(1000), [1000])
+        self.assertEqual(loop.time, 1000)
+
+    def make_state(self):
+        rng = random.Random(3)
+        start_times = sorted(rng.randrange(1000, 20000) for _ in range(100))
+        gs = GameState(None, None)
+        gs.update_metrics()
+        gs.set_hit_objects(HitObjectTable([960] * 100, [540] * 100, start_times,
+                                          [t + 100 for t in start_times], [TYPE_CIRCLE] * 100))
+        return gs
+
+    def test_result_does_not_depend_on_frame_rate(self):
+        results = []
+        for frame_ms in (1, 7, 16, 33):
+            gs = self.make_state()
+            loop = FixedStepLoop(step_ms=1)
+            now = 0
+            while now < 21000:
+                now += frame_ms
+                for tick in loop.steps(now):
+                    gs.update(tick)
+            results.append((round(gs.hp, 6), gs.combo, int((gs.hit_objects.flags & FLAG_MISSED != 0).sum())))
+        self.assertEqual(len(set(results)), 1, results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# tests/test_hit_index.py
+import unittest
+import math
+import random
+from hit_objects import HitObjectTable, TYPE_CIRCLE, FLAG_HIT
+from hit_index import HitTestIndex
+
+
+class TestHitIndex(unittest.TestCase):
+    def brute_force(self, table, x, y, t, radius, window, approach):
+        for i in range(len(table)):
+            obj = table[i]
+            if obj['hit'] or obj['missed']:
+                continue
+            if obj['start_time'] - approach <= t <= obj['start_time'] + window \
+                    and abs(t - obj['start_time']) <= window \
+                    and math.hypot(obj['x'] - x, obj['y'] - y) <= radius:
+                return i
+        return None
+
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        # Плотный "стрим" со стаками, чтобы в ячейках было много объектов
+        start_times = sorted(rng.randrange(0, 20000) for _ in range(800))
+        xs = [rng.choice([960, rng.randrange(0, 1920)]) for _ in start_times]
+        ys = [rng.choice([540, rng.randrange(0, 1080)]) for _ in start_times]
+        table = HitObjectTable(xs, ys, start_times, [t + 100 for t in start_times],
+                               [TYPE_CIRCLE] * len(xs))
+        index = HitTestIndex(table, 75, 240, 600)
+
+        for _ in range(500):
+            x, y = rng.randrange(0, 1920), rng.randrange(0, 1080)
+            if rng.random() < 0.5:
+                x, y = 960 + rng.randrange(-80, 80), 540 + rng.randrange(-80, 80)
+            t = rng.randrange(-500, 21000)
+            expected = self.brute_force(table, x, y, t, 75, 240, 600)
+            self.assertEqual(index.find(x, y, t), expected)
+            if expected is not None and rng.random() < 0.5:
+                table.flags[expected] |= FLAG_HIT
+
+
+if __name__ == '__main__':
+    unittest.main()
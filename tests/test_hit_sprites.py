@@ -0,0 +1,29 @@
+# tests/test_hit_sprites.py
+import unittest
+from hit_sprites import HitCircleAtlas, APPROACH_STEPS, FADE_STEPS
+
+
+class TestHitSprites(unittest.TestCase):
+    def setUp(self):
+        self.atlas = HitCircleAtlas(50, 25, 300, (255, 255, 255), (255, 255, 255), (255, 200, 0))
+
+    def test_approach_rings_cover_range(self):
+        self.assertLessEqual(len(self.atlas.approach), APPROACH_STEPS)
+        self.assertEqual(self.atlas.approach_radii[0], 25)
+        self.assertEqual(self.atlas.approach_radii[-1], 300)
+        # Берётся ближайший размер, за границами - крайний
+        self.assertEqual(self.atlas.approach_sprite(10).get_width(), 2 * 25 + 2)
+        self.assertEqual(self.atlas.approach_sprite(1000).get_width(), 2 * 300 + 2)
+        ring = self.atlas.approach_sprite(120)
+        radius = self.atlas.approach_radii[self.atlas.approach.index(ring)]
+        self.assertLess(abs(radius - 120), 120 * 0.05)
+
+    def test_fade_steps(self):
+        self.assertEqual(len(self.atlas.fade), FADE_STEPS)
+        self.assertIs(self.atlas.fade_sprite(255), self.atlas.fade[-1])
+        self.assertIs(self.atlas.fade_sprite(0), self.atlas.fade[0])
+        self.assertLess(self.atlas.fade_sprite(40).get_alpha(), self.atlas.fade_sprite(200).get_alpha())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# tests/test_hitsounds.py
+import unittest
+import os
+import wave
+import shutil
+import tempfile
+import pygame
+from osu_parser import OsuParser
+from map_cache import map_cache
+from hitsounds import HitSoundBank
+
+
+def write_wav(path):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(22050)
+        f.writeframes(b'\0\0' * 100)
+
+
+class TestHitSounds(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            raise unittest.SkipTest("Нет аудиоустройства")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Разобранные карты кэшируются во временной папке, а не в posu/cache
+        self.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(self.tmp_dir, "cache")
+        with open(os.path.join(self.tmp_dir, "map.osu"), "w", encoding="utf-8") as f:
+            f.write("""osu file format v14
+
+[General]
+AudioFilename: audio.mp3
+SampleSet: Soft
+
+[TimingPoints]
+0,500,4,2,2,60,1,0
+2000,-100,4,3,0,80,0,0
+
+[HitObjects]
+256,192,1000,1,0,0:0:0:0:
+256,192,1500,1,8,0:0:0:0:
+256,192,2500,1,2,0:1:3:0:
+256,192,3000,1,0,0:0:0:0:
+""")
+        for name in ("soft-hitnormal2.wav", "SOFT-hitclap2.wav", "normal-hitwhistle3.wav"):
+            write_wav(os.path.join(self.tmp_dir, name))
+        self.beatmap = OsuParser.parse_file(os.path.join(self.tmp_dir, "map.osu"))
+
+    def tearDown(self):
+        map_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def test_samples_resolved_from_timing_points(self):
+        bank = HitSoundBank(self.beatmap, channels=4)
+        self.assertEqual(len(bank.objects[0][0]), 1)    # soft-hitnormal2
+        self.assertEqual(bank.objects[0][1], 0.6)
+        self.assertEqual(len(bank.objects[1][0]), 2)    # + soft-hitclap2 (регистр не важен)
+        # drum-hitnormal3 нет, свисток из набора normal с индексом 3 из объекта
+        self.assertEqual(len(bank.objects[2][0]), 1)
+        self.assertEqual(bank.objects[2][1], 0.8)
+        # Индекс 0 - сэмплы скина, а скин не задан
+        self.assertEqual(bank.objects[3][0], ())
+        self.assertIsNone(bank.sounds[('drum-hitnormal3', False)])
+
+    def test_channels_are_reserved_and_reused(self):
+        bank = HitSoundBank(self.beatmap, channels=4)
+        self.assertEqual(len(bank.channels), 4)
+        for _ in range(3):
+            bank.play(1)
+        self.assertEqual(bank.next_channel, 6 % 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+# tests/test_hud_text.py
+import unittest
+import pygame
+from hud_text import GlyphAtlas, HudCounter
+
+
+class TestHudText(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.font.init()
+        cls.font = pygame.font.Font(None, 36)
+
+    def test_counter_rerenders_only_on_change(self):
+        counter = HudCounter(GlyphAtlas(self.font, (255, 255, 255)), "{:,}".format)
+        first = counter.render(1200)
+        self.assertIs(counter.render(1200), first)
+        self.assertIsNot(counter.render(1500), first)
+
+    def test_glyphs_are_reused_and_text_matches_font_width(self):
+        atlas = GlyphAtlas(self.font, (255, 255, 255))
+        glyph = atlas.glyph("7")
+        atlas.render("777")
+        self.assertIs(atlas.glyph("7"), glyph)
+        # Символ не из набора добавляется при первой встрече
+        self.assertNotIn("!", atlas.glyphs)
+        atlas.render("7!")
+        self.assertIn("!", atlas.glyphs)
+        self.assertEqual(atlas.render("1,234").get_width(),
+                         sum(self.font.size(c)[0] for c in "1,234"))
+
+    def test_shadow_is_under_text(self):
+        atlas = GlyphAtlas(self.font, (255, 255, 255), (0, 0, 0), (2, 2))
+        surface = atlas.render("8x")
+        self.assertEqual(surface.get_height(), self.font.get_height() + 2)
+        self.assertEqual(surface.get_width(), sum(self.font.size(c)[0] for c in "8x") + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
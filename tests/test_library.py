@@ -0,0 +1,120 @@
+# tests/test_library.py
+import unittest
+import os
+import shutil
+import tempfile
+from library import Library, LibraryView, parse_search
+
+
+def write_map(maps_dir, folder, title, artist, bpm_beat_length, last_time):
+    os.makedirs(os.path.join(maps_dir, folder))
+    with open(os.path.join(maps_dir, folder, f"{title}.osu"), "w", encoding="utf-8") as f:
+        f.write(f"""osu file format v14
+
+[General]
+AudioFilename: audio.mp3
+
+[Metadata]
+Title:{title}
+Artist:{artist}
+Version:Normal
+
+[Difficulty]
+ApproachRate:9
+
+[Events]
+0,0,"bg.jpg",0,0
+
+[TimingPoints]
+0,{bpm_beat_length},4,2,0,100,1,0
+
+[HitObjects]
+256,192,1000,1,0,0:0:0:0:
+256,192,{last_time},1,0,0:0:0:0:
+""")
+
+
+class TestLibrary(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.maps_dir = os.path.join(self.tmp_dir, "maps")
+        os.makedirs(self.maps_dir)
+        write_map(self.maps_dir, "1 Alpha", "Alpha", "Zed", 500, 90000)    # 120 BPM
+        write_map(self.maps_dir, "2 Beta", "Beta", "Amy", 300, 60000)      # 200 BPM
+        write_map(self.maps_dir, "3 Gamma", "Gamma", "Bob", 400, 120000)   # 150 BPM
+        self.library = Library(os.path.join(self.tmp_dir, "library.db"), self.maps_dir)
+
+    def tearDown(self):
+        self.library.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_folders_are_listed_before_scan(self):
+        self.assertEqual(self.library.sync_folders(), 3)
+        view = LibraryView(self.library)
+        self.assertEqual(list(view), ["1 Alpha", "2 Beta", "3 Gamma"])
+        # Заголовки ещё не читались
+        self.assertEqual(view.row(0)[3], None)
+
+    def test_sorted_and_filtered_queries(self):
+        self.library.sync_folders()
+        self.assertEqual(self.library.scan_pending(), 3)
+        self.assertEqual(self.library.scan_pending(), 0)
+
+        by_artist = self.library.query_mapsets(sort='artist')
+        self.assertEqual([row[2] for row in by_artist], ["Amy", "Bob", "Zed"])
+        self.assertEqual(by_artist[0][3], "bg.jpg")
+
+        fast = self.library.query_mapsets(sort='bpm', filters={'bpm': (140, None)})
+        self.assertEqual([row[0] for row in fast], ["3 Gamma", "2 Beta"])
+
+        short = self.library.query_mapsets(filters={'length': (None, 95000)})
+        self.assertEqual([row[0] for row in short], ["1 Alpha", "2 Beta"])
+
+        self.assertEqual([row[0] for row in self.library.query_mapsets(search="gam")], ["3 Gamma"])
+
+    def test_search_filters(self):
+        self.assertEqual(parse_search("gam"), ("gam", None))
+        self.assertEqual(parse_search("BPM>=140 length<95 stars=2.5 x"),
+                         ("x", {'bpm': (140, None), 'length': (None, 95000), 'stars': (2.5, 2.5)}))
+        self.assertEqual(parse_search("bpm>100 bpm<160"), (None, {'bpm': (100, 160)}))
+
+        self.library.sync_folders()
+        self.library.scan_pending()
+        view = LibraryView(self.library)
+        search, filters = parse_search("a bpm>140")
+        view.set_query(search=search, sort='bpm', filters=filters)
+        self.assertEqual(list(view), ["3 Gamma", "2 Beta"])
+
+    def test_view_pages_and_removed_folders(self):
+        self.library.sync_folders()
+        view = LibraryView(self.library, sort='title')
+        view.PAGE_SIZE = 2
+        self.assertEqual(view[2], "3 Gamma")
+
+        shutil.rmtree(os.path.join(self.maps_dir, "2 Beta"))
+        self.library.sync_folders()
+        self.assertEqual(list(view), ["1 Alpha", "3 Gamma"])
+
+    def test_position_follows_rows_after_changes(self):
+        self.library.sync_folders()
+        view = LibraryView(self.library, sort='title')
+        self.assertEqual(view.position("2 Beta"), 1)
+        # Новый мапсет встаёт перед выбранным - строка выбранного сдвигается
+        write_map(self.maps_dir, "0 Aardvark", "Aardvark", "Ann", 500, 30000)
+        self.library.sync_folders()
+        self.assertEqual(view[1], "1 Alpha")
+        self.assertEqual(view.position("2 Beta"), 2)
+        view.set_query(search="Gamma", sort='title')
+        self.assertEqual(view.position("3 Gamma"), 0)
+        self.assertIsNone(view.position("2 Beta"))
+        self.assertIsNone(view.position(None))
+
+    def test_map_offsets(self):
+        path = os.path.join(self.maps_dir, "1 Alpha", "Alpha.osu")
+        self.assertEqual(self.library.get_offset(path), 0)
+        self.library.set_offset(path, -12.5)
+        self.assertEqual(self.library.get_offset(path), -12.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
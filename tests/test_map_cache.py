@@ -0,0 +1,62 @@
+# tests/test_map_cache.py
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from hit_objects import HitObjectTable, TYPE_CIRCLE
+from map_cache import MapCache
+
+
+class TestMapCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = MapCache(os.path.join(self.tmp_dir, "cache"))
+        self.osu_path = self.write_osu("map.osu", "256,192,1000,1,0,0:0:0:0:")
+        self.table = HitObjectTable([960], [540], [1000], [1100], [TYPE_CIRCLE])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_osu(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_roundtrip(self):
+        self.cache.store(self.osu_path, {'audio_file': 'audio.mp3', 'difficulty': {'ar': 9.5}}, self.table)
+        meta, hit_objects = self.cache.load(self.osu_path)
+        self.assertEqual(meta['audio_file'], 'audio.mp3')
+        self.assertEqual(meta['difficulty']['ar'], 9.5)
+        self.assertEqual(hit_objects[0]['x'], 960)
+        self.assertEqual(hit_objects[0]['start_time'], 1000)
+
+    def test_touched_file_with_same_content_is_still_cached(self):
+        self.cache.store(self.osu_path, {}, self.table)
+        later = time.time() + 100
+        os.utime(self.osu_path, (later, later))
+        self.assertIsNotNone(self.cache.load(self.osu_path))
+
+    def test_changed_file_is_not_cached(self):
+        self.cache.store(self.osu_path, {}, self.table)
+        self.write_osu("map.osu", "256,192,2000,1,0,0:0:0:0:")
+        self.assertIsNone(self.cache.load(self.osu_path))
+
+    def test_lru_eviction(self):
+        first = self.write_osu("first.osu", "first")
+        second = self.write_osu("second.osu", "second")
+        self.cache.store(first, {}, self.table)
+        entry_size = sum(os.path.getsize(os.path.join(self.cache.cache_dir, name))
+                         for name in os.listdir(self.cache.cache_dir))
+        self.cache.max_bytes = entry_size + entry_size // 2
+
+        # Делаем первую запись заведомо старой, вторая её вытеснит
+        os.utime(os.path.join(self.cache.cache_dir, os.listdir(self.cache.cache_dir)[0]), (0, 0))
+        self.cache.store(second, {}, self.table)
+        self.assertIsNone(self.cache.load(first))
+        self.assertIsNotNone(self.cache.load(second))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# tests/test_map_loader.py
+import unittest
+import os
+import shutil
+import zipfile
+import tempfile
+from library import Library
+from map_loader import ImportJob
+
+
+class TestMapLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.import_dir = os.path.join(self.tmp_dir, "import")
+        self.maps_dir = os.path.join(self.tmp_dir, "maps")
+        os.makedirs(self.import_dir)
+        os.makedirs(self.maps_dir)
+        self.library = Library(os.path.join(self.tmp_dir, "library.db"), self.maps_dir)
+
+    def tearDown(self):
+        self.library.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def make_osz(self, name, title):
+        path = os.path.join(self.import_dir, name + ".osz")
+        with zipfile.ZipFile(path, "w") as zf:
+            # Фиксированная дата, чтобы одинаковые архивы совпадали побайтово
+            info = zipfile.ZipInfo(f"{title}.osu", date_time=(2024, 1, 1, 0, 0, 0))
+            zf.writestr(info, f"[Metadata]\nTitle:{title}\nVersion:Normal\n")
+        return path
+
+    def run_import(self, paths):
+        job = ImportJob([(path, self.maps_dir) for path in paths], self.library, max_workers=2)
+        job.start().wait()
+        return job
+
+    def test_parallel_import_updates_library(self):
+        paths = [self.make_osz(f"{i} Song", f"Song {i}") for i in range(4)]
+        job = self.run_import(paths)
+
+        self.assertEqual((job.done, job.failed, job.skipped), (4, 0, 0))
+        self.assertEqual(sorted(os.listdir(self.maps_dir)), [f"{i} Song" for i in range(4)])
+        self.assertFalse(os.listdir(self.import_dir))
+        titles = sorted(row[1] for row in self.library.query_mapsets())
+        self.assertEqual(titles, [f"Song {i}" for i in range(4)])
+
+    def test_same_archive_is_skipped(self):
+        self.run_import([self.make_osz("1 Song", "Song")])
+        job = self.run_import([self.make_osz("1 Song (copy)", "Song")])
+
+        self.assertEqual(job.skipped, 1)
+        self.assertEqual(os.listdir(self.maps_dir), ["1 Song"])
+
+    def test_duplicates_in_one_batch_extract_once(self):
+        paths = [self.make_osz("1 Song", "Song"), self.make_osz("1 Song (copy)", "Song"),
+                 self.make_osz("2 Other", "Other")]
+        job = self.run_import(paths)
+
+        self.assertEqual((job.done, job.failed, job.skipped), (3, 0, 1))
+        self.assertEqual(len(os.listdir(self.maps_dir)), 2)
+        self.assertFalse(os.listdir(self.import_dir))
+
+    def test_skin_hash_is_recorded(self):
+        skins_dir = os.path.join(self.tmp_dir, "skins")
+        os.makedirs(skins_dir)
+        job = ImportJob([(self.make_osz("Skin", "skin"), skins_dir)], self.library)
+        job.start().wait()
+        self.assertEqual(os.listdir(skins_dir), ["Skin"])
+        shutil.rmtree(os.path.join(skins_dir, "Skin"))
+
+        job = ImportJob([(self.make_osz("Skin", "skin"), skins_dir)], self.library)
+        job.start().wait()
+        self.assertEqual(job.skipped, 1)
+        self.assertEqual(os.listdir(skins_dir), [])
+
+    def test_broken_archive(self):
+        path = os.path.join(self.import_dir, "broken.osz")
+        with open(path, "wb") as f:
+            f.write(b"not a zip")
+        job = self.run_import([path])
+        self.assertEqual(job.failed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
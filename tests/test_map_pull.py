@@ -0,0 +1,42 @@
+# tests/test_map_pull.py
+import unittest
+import pygame
+from map_pull import MapPull
+
+
+class TestMapPull(unittest.TestCase):
+    def setUp(self):
+        pygame.font.init()
+        self.pull = MapPull(1920, 1080)
+        self.pull.load_previews([f"map{i}" for i in range(1000)])
+
+    def test_visible_range_follows_scroll(self):
+        step = self.pull.item_step
+        self.assertEqual(self.pull.visible_range(), (0, 1080 // step + 1))
+        self.pull.current_scroll = 500 * step + 5
+        first, last = self.pull.visible_range()
+        self.assertEqual(first, 500)
+        self.assertLessEqual(last - first, 1080 // step + 2)
+
+    def test_clicked_map_by_position(self):
+        x = 1920 - self.pull.item_width - self.pull.right_margin + 10
+        step = self.pull.item_step
+        self.pull.current_scroll = 40 * step
+
+        self.assertEqual(self.pull.get_clicked_map((x, 3 * step + 20)), "map43")
+        self.assertEqual(self.pull.selected_index, 43)
+        # Промежуток между картами и место левее списка
+        self.assertIsNone(self.pull.get_clicked_map((x, 3 * step + self.pull.item_height + 2)))
+        self.assertIsNone(self.pull.get_clicked_map((10, 3 * step + 20)))
+
+    def test_scaled_previews_are_reused(self):
+        preview = pygame.Surface((self.pull.item_width, self.pull.item_height))
+        first = self.pull.get_scaled_preview("map0", preview, 0.701)
+        self.assertIs(self.pull.get_scaled_preview("map0", preview, 0.699), first)
+        # Превью перезагрузили - масштабируем заново
+        other = pygame.Surface((self.pull.item_width, self.pull.item_height))
+        self.assertIsNot(self.pull.get_scaled_preview("map0", other, 0.7), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,75 @@
 # tests/test_mechanics.py
 import unittest
+import os
+import shutil
+import tempfile
+import pygame
 from main import GameState
+from benchmark import synthetic_osu
+from osu_parser import OsuParser
+from map_cache import map_cache
+from slider_curves import SliderPath
 
 class TestMechanics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.font.init()
+
     def test_hp_mechanics(self):
-        gs = GameState()
+        gs = GameState(None, None)
         gs.hp = 50
         gs.hp = min(100, gs.hp + 10)
         self.assertEqual(gs.hp, 60)
 
+    def test_atlas_built_before_draw(self):
+        gs = GameState(None, None)
+        gs.build_atlas()
+        atlas = gs.atlas
+        gs.draw(pygame.Surface((640, 480)), 0)
+        # Кадр только рисует из готового атласа
+        self.assertIs(gs.atlas, atlas)
+        # Новые CS/AR - атлас пересобирается сразу, а не в кадре
+        gs.apply_difficulty({'ar': 9, 'cs': 7, 'hp': 5, 'od': 8,
+                             'slider_multiplier': 1.4, 'slider_tick_rate': 1})
+        self.assertIsNot(gs.atlas, atlas)
+        self.assertLess(gs.atlas.circle.get_width(), atlas.circle.get_width())
+    def test_slider_bodies_prepared_ahead(self):
+        tmp_dir = tempfile.mkdtemp()
+        cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(tmp_dir, "cache")
+        try:
+            path = os.path.join(tmp_dir, "map.osu")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(synthetic_osu(60, seed=2))
+            beatmap = OsuParser.parse_file(path)
+        finally:
+            map_cache.cache_dir = cache_dir
+            shutil.rmtree(tmp_dir)
+        gs = GameState(None, None)
+        gs.apply_difficulty(beatmap.difficulty)
+        gs.set_hit_objects(beatmap.hit_objects, beatmap.sliders)
+        gs.build_atlas()
+        gs.prepare_slider_bodies(0, None)
+        objs = gs.hit_objects
+        # При загрузке - только тела первых слайдеров
+        for i, slider in gs.slider_paths.items():
+            soon = objs.start_time[i] - gs.approach_time <= 2000
+            self.assertEqual(slider._body is not None, bool(soon))
+
+        rendered = []
+        render = SliderPath._render_body
+        SliderPath._render_body = lambda path, *args: rendered.append(path) or render(path, *args)
+        try:
+            screen = pygame.Surface((1920, 1080))
+            for t in range(0, int(objs.end_time.max()), 16):
+                gs.update(t)
+                gs.draw(screen, t)
+                # В кадре тела только blit'ятся
+                self.assertEqual(rendered, [])
+                gs.prepare_slider_bodies(t)
+                rendered.clear()
+        finally:
+            SliderPath._render_body = render
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -6,11 +6,16 @@ from main import OsuParser, MAPS_DIR
 import unittest
 import os
 import shutil
+import tempfile
 from main import OsuParser, MAPS_DIR
+from map_cache import map_cache
 
 class TestParser(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
+        # Разобранные карты кэшируются во временной папке, а не в posu/cache
+        cls.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = tempfile.mkdtemp()
         cls.test_map_dir = os.path.join(MAPS_DIR, "unittest_map")
         os.makedirs(cls.test_map_dir, exist_ok=True)
         
@@ -48,6 +53,8 @@ CircleSize:4.2
     def tearDownClass(cls):
         # Удаляем тестовые данные
         shutil.rmtree(cls.test_map_dir)
+        shutil.rmtree(map_cache.cache_dir)
+        map_cache.cache_dir = cls.cache_dir
 
     # tests/test_parser.py
     def test_circle_parsing(self):
@@ -58,5 +65,79 @@ CircleSize:4.2
         self.assertEqual(hit_objects[0]['x'], 256)
         self.assertEqual(hit_objects[0]['y'], 192)
 
+class TestMapsetParser(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = tempfile.mkdtemp()
+        cls.test_map_dir = tempfile.mkdtemp()
+        for version in ("Easy", "Hard"):
+            osu_content = f"""osu file format v14
+
+[General]
+AudioFilename: Audio.MP3
+
+[Metadata]
+Title:Test
+Artist:Tester
+Version:{version}
+
+[Difficulty]
+OverallDifficulty:7
+SliderMultiplier:1.4
+
+[Events]
+0,0,"bg.jpg",0,0
+2,5000,6000
+Sprite,Foreground,Centre,"sb/star.png",320,240
+ F,0,1000,2000,0,1
+
+[TimingPoints]
+0,500,4,2,0,100,1,0
+1000,-50,4,2,0,100,0,0
+
+[HitObjects]
+256,192,500,1,0,0:0:0:0:
+100,100,1000,2,0,B|200:100|200:200,2,140
+256,192,3000,12,0,4000,0:0:0:0:
+"""
+            with open(os.path.join(cls.test_map_dir, f"test [{version}].osu"), "w", encoding="utf-8") as f:
+                f.write(osu_content)
+        open(os.path.join(cls.test_map_dir, "audio.mp3"), "wb").close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_map_dir)
+        shutil.rmtree(map_cache.cache_dir)
+        map_cache.cache_dir = cls.cache_dir
+
+    def test_all_difficulties_and_sections(self):
+        beatmaps = OsuParser.parse_mapset(self.test_map_dir)
+        self.assertEqual([b.metadata['Version'] for b in beatmaps], ["Easy", "Hard"])
+
+        beatmap = beatmaps[0]
+        self.assertEqual(beatmap.difficulty['ar'], 7.0)  # AR не задан - берётся OD
+        self.assertTrue(beatmap.audio_path.endswith("audio.mp3"))
+        self.assertEqual(beatmap.events['background'], "bg.jpg")
+        self.assertEqual(beatmap.events['breaks'], [[5000, 6000]])
+        self.assertEqual(beatmap.events['storyboard'][1], " F,0,1000,2000,0,1")
+        self.assertEqual(len(beatmap.timing_points), 2)
+        self.assertFalse(beatmap.timing_points[1].uninherited)
+
+        self.assertEqual(len(beatmap.hit_objects), 3)
+        slider = beatmap.sliders[0]
+        self.assertEqual(slider.curve_type, 'B')
+        self.assertEqual(slider.points, [[100, 100], [200, 100], [200, 200]])
+        # 140 px при SV 2.0 и множителе 1.4 - полдоли (250 мс), туда и обратно
+        self.assertEqual(beatmap.hit_objects.end_time[slider.index], 1000 + 500)
+        self.assertEqual(beatmap.spinners[0].end_time, 4000)
+
+    def test_headers_only(self):
+        beatmaps = OsuParser.read_headers(self.test_map_dir)
+        self.assertEqual(beatmaps[1].metadata['Version'], "Hard")
+        self.assertEqual(len(beatmaps[1].hit_objects), 0)
+        self.assertEqual(beatmaps[1].timing_points, [])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+# tests/test_profiler.py
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import pygame
+from profiler import FrameProfiler, STAGE_EVENTS, STAGE_DRAW, STAGE_NAMES
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        pygame.font.init()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_frames(self, profiler, count):
+        for _ in range(count):
+            profiler.begin_frame()
+            profiler.mark(STAGE_EVENTS)
+            sum(range(2000))
+            profiler.mark(STAGE_DRAW)
+            profiler.end_frame()
+
+    def test_disabled_records_nothing(self):
+        profiler = FrameProfiler(enabled=False)
+        self.run_frames(profiler, 5)
+        self.assertEqual(profiler.frames, 0)
+        self.assertEqual(profiler.summary(), {})
+        self.assertIsNone(profiler.draw(pygame.Surface((800, 600))))
+
+    def test_ring_buffer_keeps_last_frames(self):
+        profiler = FrameProfiler(enabled=True, capacity=8)
+        self.run_frames(profiler, 20)
+        starts, durations = profiler.recorded()
+        self.assertEqual(profiler.frames, 20)
+        self.assertEqual(len(durations), 8)
+        self.assertTrue((starts[1:] > starts[:-1]).all())
+        self.assertTrue((durations[:, STAGE_DRAW] > 0).all())
+        summary = profiler.summary()
+        self.assertGreaterEqual(summary['frame']['max'], summary['draw']['max'])
+
+    def test_exports(self):
+        profiler = FrameProfiler(enabled=True)
+        self.run_frames(profiler, 3)
+        trace_path = os.path.join(self.tmp_dir, "profiles", "trace.json")
+        profiler.export_chrome_trace(trace_path)
+        with open(trace_path, encoding="utf-8") as f:
+            events = json.load(f)['traceEvents']
+        frames = [e for e in events if e['name'] == 'frame']
+        self.assertEqual(len(frames), 3)
+        draws = [e for e in events if e['name'] == 'draw']
+        # Стадия лежит внутри своего кадра
+        self.assertGreaterEqual(draws[0]['ts'], frames[0]['ts'])
+        self.assertLessEqual(draws[0]['ts'] + draws[0]['dur'], frames[0]['ts'] + frames[0]['dur'] + 1e-6)
+
+        json_path = os.path.join(self.tmp_dir, "summary.json")
+        profiler.export_json(json_path)
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(data['stages'], list(STAGE_NAMES))
+        self.assertEqual(len(data['frames']), 3)
+
+    def test_overlay(self):
+        profiler = FrameProfiler(enabled=True)
+        screen = pygame.Surface((800, 600))
+        self.assertIsNotNone(profiler.draw(screen))
+        self.run_frames(profiler, 40)
+        rect = profiler.draw(screen)
+        self.assertEqual(rect.right, 790)
+        self.assertEqual(rect.bottom, 590)
+
+
+if __name__ == '__main__':
+    unittest.main()
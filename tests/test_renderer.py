@@ -0,0 +1,61 @@
+# tests/test_renderer.py
+import unittest
+import pygame
+from renderer import DirtyRenderer
+
+
+class TestDirtyRenderer(unittest.TestCase):
+    def setUp(self):
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((200, 100))
+
+    def draw_box(self, x):
+        return pygame.draw.rect(self.screen, (255, 255, 255), (x, 10, 20, 20))
+
+    def test_previous_rects_are_erased(self):
+        renderer = DirtyRenderer(self.screen)
+        self.screen.fill((0, 0, 255))  # Мусор до первого кадра
+        renderer.clear()
+        renderer.present([self.draw_box(10)])
+        self.assertEqual(self.screen.get_at((150, 50))[:3], (0, 0, 0))
+
+        # Во втором кадре стирается только прошлый прямоугольник
+        self.screen.fill((0, 255, 0), (150, 50, 5, 5))
+        renderer.clear()
+        renderer.present([self.draw_box(100)])
+        self.assertEqual(self.screen.get_at((15, 15))[:3], (0, 0, 0))
+        self.assertEqual(self.screen.get_at((105, 15))[:3], (255, 255, 255))
+        self.assertEqual(self.screen.get_at((150, 50))[:3], (0, 255, 0))
+        self.assertEqual(renderer.previous, [pygame.Rect(100, 10, 20, 20)])
+
+    def test_full_redraw_after_invalidate_or_none(self):
+        renderer = DirtyRenderer(self.screen)
+        renderer.clear()
+        renderer.present([])
+        renderer.present(None)
+        self.assertTrue(renderer.full_redraw)
+        renderer.present([])
+        renderer.invalidate()
+        self.screen.fill((0, 255, 0))
+        renderer.clear()
+        self.assertEqual(self.screen.get_at((150, 50))[:3], (0, 0, 0))
+
+    def test_surface_background(self):
+        background = pygame.Surface((200, 100))
+        background.fill((10, 20, 30))
+        renderer = DirtyRenderer(self.screen)
+        renderer.set_background(background)
+        self.assertTrue(renderer.full_redraw)
+        renderer.clear()
+        self.assertEqual(self.screen.get_at((150, 50))[:3], (10, 20, 30))
+        renderer.present([self.draw_box(10)])
+
+        # Прошлый прямоугольник стирается кусочком фона, остальное не трогается
+        self.screen.fill((0, 255, 0), (150, 50, 5, 5))
+        renderer.clear()
+        self.assertEqual(self.screen.get_at((15, 15))[:3], (10, 20, 30))
+        self.assertEqual(self.screen.get_at((150, 50))[:3], (0, 255, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# tests/test_replay.py
+import unittest
+import os
+import math
+import shutil
+import tempfile
+import numpy as np
+import pygame
+from osu_parser import OsuParser
+from map_cache import map_cache
+from input_handler import InputHandler
+from replay import ReplayRecorder, Replay
+from simulation import HeadlessSimulation, SimulationResult, autoplay_frames, KEY_1
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Разобранные карты кэшируются во временной папке, а не в posu/cache
+        self.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.path = os.path.join(self.tmp_dir, "replays", "play.posr")
+
+    def tearDown(self):
+        map_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip_across_chunks(self):
+        recorder = ReplayRecorder(self.path, "maps/map [Hard].osu", chunk_frames=7)
+        expected = []
+        for t in range(100):
+            frame = (t * 3, 960 + (t * 37) % 500 - 250, 540 - t, KEY_1 if t % 4 else 0)
+            recorder.record(*frame)
+            expected.append(frame)
+            if t % 10 == 0:
+                # Кадр без изменений не пишется
+                recorder.record(t * 3 + 1, *frame[1:])
+        recorder.close()
+
+        replay = Replay.load(self.path)
+        self.assertEqual(replay.beatmap_path, "maps/map [Hard].osu")
+        self.assertEqual([tuple(f) for f in replay.input_frames()], expected)
+
+    def test_empty_replay(self):
+        ReplayRecorder(self.path, "map.osu").close()
+        self.assertEqual(len(Replay.load(self.path)), 0)
+
+    def test_replay_reproduces_score(self):
+        osu_path = os.path.join(self.tmp_dir, "map.osu")
+        with open(osu_path, "w", encoding="utf-8") as f:
+            f.write("osu file format v14\n\n[Difficulty]\nOverallDifficulty:8\nApproachRate:9\n\n[HitObjects]\n")
+            f.write("".join(f"{64 + i % 5 * 80},{64 + i % 3 * 100},{1000 + i * 150},1,0,0:0:0:0:\n" for i in range(40)))
+        beatmap = OsuParser.parse_file(osu_path)
+        simulation = HeadlessSimulation(beatmap)
+        # Немного опаздываем на каждую ноту
+        frames = [f._replace(time=f.time + 30) for f in autoplay_frames(beatmap.hit_objects)]
+        expected = simulation.run(frames)
+
+        recorder = ReplayRecorder(self.path, osu_path, chunk_frames=16)
+        for frame in frames:
+            recorder.record(*frame)
+        recorder.close()
+        self.assertEqual(simulation.run(Replay.load(self.path).input_frames()), expected)
+
+    def test_live_input_events_are_recorded(self):
+        pygame.display.init()
+        osu_path = os.path.join(self.tmp_dir, "map.osu")
+        with open(osu_path, "w", encoding="utf-8") as f:
+            f.write("osu file format v14\n\n[Difficulty]\nOverallDifficulty:8\nApproachRate:9\n\n[HitObjects]\n")
+            f.write("".join(f"{64 + i % 5 * 80},{64 + i % 3 * 100},{1000 + i * 150},1,0,0:0:0:0:\n" for i in range(20)))
+        beatmap = OsuParser.parse_file(osu_path)
+        objs = beatmap.hit_objects
+        simulation = HeadlessSimulation(beatmap)
+        gs = simulation.game_state
+
+        class Settings:
+            selected_keys = {'key1': 'Z', 'key2': 'X', 'smoke': 'C'}
+        gs.settings_menu = Settings()
+        gs.set_hit_objects(objs, [])
+
+        recorder = ReplayRecorder(self.path, osu_path)
+        for i in range(len(objs)):
+            t = int(objs.start_time[i]) + 20
+            # Нажатие и отпускание внутри одного кадра игры
+            events = [pygame.event.Event(pygame.MOUSEMOTION, pos=(int(objs.x[i]), int(objs.y[i])), rel=(0, 0), buttons=(0, 0, 0)),
+                      pygame.event.Event(pygame.KEYDOWN, key=pygame.K_z, mod=0, unicode='z'),
+                      pygame.event.Event(pygame.KEYUP, key=pygame.K_z, mod=0, unicode='z')]
+            simulation.advance(t)
+            InputHandler.handle_input(events, gs, t, recorder.record)
+        simulation.advance(simulation.end_time + int(gs.hit_window_50))
+        recorder.close()
+        live = SimulationResult(gs.score, gs.accuracy(), gs.combo, gs.hp, dict(gs.hit_counts))
+        self.assertEqual(live.hit_counts[300], len(objs))
+        self.assertEqual(simulation.run(Replay.load(self.path).input_frames()), live)
+
+    def test_ten_minutes_is_compact(self):
+        recorder = ReplayRecorder(self.path, "map.osu")
+        # 10 минут движения курсора с опросом 1 кГц
+        for t in range(600000):
+            angle = t / 700
+            keys = KEY_1 if (t // 120) % 3 == 0 else 0
+            recorder.record(t, int(960 + 400 * math.cos(angle)), int(540 + 300 * math.sin(angle * 1.3)), keys)
+        recorder.close()
+        self.assertLess(os.path.getsize(self.path), 500 * 1024)
+        frames = Replay.load(self.path).frames
+        self.assertGreater(frames['time'][-1], 599000)
+        self.assertTrue(np.all(np.diff(frames['time']) > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
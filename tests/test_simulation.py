@@ -0,0 +1,218 @@
+# tests/test_simulation.py
+import unittest
+import os
+import time
+import shutil
+import tempfile
+import pygame
+from osu_parser import OsuParser
+from map_cache import map_cache
+from input_handler import InputHandler
+from simulation import HeadlessSimulation, InputFrame, SimulationResult, autoplay_frames, KEY_1, KEY_2
+
+
+def write_map(path, objects):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("""osu file format v14
+
+[General]
+AudioFilename: audio.mp3
+
+[Difficulty]
+HPDrainRate:5
+CircleSize:4
+OverallDifficulty:8
+ApproachRate:9
+SliderMultiplier:1.4
+SliderTickRate:1
+
+[TimingPoints]
+0,500,4,1,0,100,1,0
+
+[HitObjects]
+""")
+        f.write("\n".join(objects) + "\n")
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Разобранные карты кэшируются во временной папке, а не в posu/cache
+        self.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.path = os.path.join(self.tmp_dir, "map.osu")
+
+    def tearDown(self):
+        map_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def load(self, objects):
+        write_map(self.path, objects)
+        return OsuParser.parse_file(self.path)
+
+    def test_autoplay_full_combo(self):
+        beatmap = self.load([
+            "64,64,1000,1,0,0:0:0:0:",
+            "256,192,1200,1,0,0:0:0:0:",
+            "100,300,1300,2,0,B|200:300|300:200,1,140",
+            "400,100,2500,1,0,0:0:0:0:",
+            "256,192,3000,12,0,4000,0:0:0:0:",
+        ])
+        result = HeadlessSimulation(beatmap).autoplay()
+        self.assertEqual(result.hit_counts, {300: 4, 100: 0, 50: 0, 0: 0})
+        self.assertEqual(result.combo, 4)
+        self.assertEqual(result.score, 1200)
+        self.assertAlmostEqual(result.accuracy, 100.0)
+
+    def test_no_input_misses_everything(self):
+        beatmap = self.load(["64,64,1000,1,0,0:0:0:0:", "256,192,2000,1,0,0:0:0:0:"])
+        result = HeadlessSimulation(beatmap).run([])
+        self.assertEqual(result.hit_counts[0], 2)
+        self.assertEqual(result.score, 0)
+        self.assertEqual(result.combo, 0)
+
+    def test_late_press_and_held_key(self):
+        beatmap = self.load(["64,64,1000,1,0,0:0:0:0:", "64,64,1500,1,0,0:0:0:0:"])
+        x, y = int(beatmap.hit_objects.x[0]), int(beatmap.hit_objects.y[0])
+        simulation = HeadlessSimulation(beatmap)
+        window_100 = simulation.game_state.hit_window_100
+        # Вторая нота приходится на ещё зажатую клавишу - нового нажатия нет
+        frames = [InputFrame(1000 + int(window_100), x, y, KEY_1), InputFrame(1500, x, y, KEY_1)]
+        result = simulation.run(frames)
+        self.assertEqual(result.hit_counts, {300: 0, 100: 1, 50: 0, 0: 1})
+
+    def test_runs_are_repeatable(self):
+        beatmap = self.load([f"{64 + i % 5 * 80},{64 + i % 3 * 100},{1000 + i * 150},1,0,0:0:0:0:" for i in range(50)])
+        simulation = HeadlessSimulation(beatmap)
+        first = simulation.autoplay()
+        self.assertEqual(simulation.run([]).hit_counts[0], 50)
+        self.assertEqual(simulation.autoplay(), first)
+
+    def test_faster_than_real_time(self):
+        count = 2000
+        beatmap = self.load([f"{64 + i % 7 * 60},{64 + i % 4 * 80},{1000 + i * 250},1,0,0:0:0:0:" for i in range(count)])
+        simulation = HeadlessSimulation(beatmap)
+        frames = list(autoplay_frames(beatmap.hit_objects))
+        started = time.perf_counter()
+        result = simulation.run(frames)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.assertEqual(result.hit_counts[300], count)
+        self.assertLess(elapsed_ms * 100, count * 250)
+
+
+class Settings:
+    selected_keys = {'key1': 'Z', 'key2': 'X', 'smoke': 'C'}
+
+
+KEY_CODES = {KEY_1: pygame.K_z, KEY_2: pygame.K_x}
+
+
+def live_events(frame, held):
+    """События pygame, которые дал бы кадр ввода после состояния клавиш held"""
+    events = [pygame.event.Event(pygame.MOUSEMOTION, pos=(frame.x, frame.y), rel=(0, 0), buttons=(0, 0, 0))]
+    for bit, code in KEY_CODES.items():
+        if frame.keys & bit and not held & bit:
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=code, mod=0, unicode=''))
+        elif held & bit and not frame.keys & bit:
+            events.append(pygame.event.Event(pygame.KEYUP, key=code, mod=0, unicode=''))
+    # Движение после нажатия в том же кадре не должно быть ещё одним нажатием
+    events.append(events[0])
+    return events
+
+
+class TestLiveInput(unittest.TestCase):
+    """InputHandler.handle_input (игра) судит так же, как HeadlessSimulation"""
+
+    @classmethod
+    def setUpClass(cls):
+        pygame.display.init()  # Курсор и коды клавиш
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Разобранные карты кэшируются во временной папке, а не в posu/cache
+        self.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.path = os.path.join(self.tmp_dir, "map.osu")
+
+    def tearDown(self):
+        map_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def run_live(self, beatmap, frames):
+        simulation = HeadlessSimulation(beatmap)
+        gs = simulation.game_state
+        gs.settings_menu = Settings()
+        beatmap.hit_objects.reset_flags()
+        gs.reset()
+        gs.set_hit_objects(beatmap.hit_objects, [])
+        held = 0
+        for frame in frames:
+            simulation.advance(frame.time)
+            InputHandler.handle_input(live_events(frame, held), gs, frame.time)
+            held = frame.keys
+        simulation.advance(simulation.end_time + int(gs.hit_window_50))
+        return SimulationResult(gs.score, gs.accuracy(), gs.combo, gs.hp, dict(gs.hit_counts))
+
+    def test_motion_after_hit_is_not_a_press(self):
+        write_map(self.path, ["64,64,1000,1,0,0:0:0:0:", "300,300,3000,1,0,0:0:0:0:"])
+        beatmap = OsuParser.parse_file(self.path)
+        x, y = int(beatmap.hit_objects.x[0]), int(beatmap.hit_objects.y[0])
+        simulation = HeadlessSimulation(beatmap)
+        gs = simulation.game_state
+        gs.settings_menu = Settings()
+        gs.set_hit_objects(beatmap.hit_objects, [])
+        simulation.advance(1000)
+        InputHandler.handle_input(live_events(InputFrame(1000, x, y, KEY_1), 0), gs, 1000)
+        hp = gs.hp
+        self.assertEqual((gs.score, gs.combo), (300, 1))
+        # Клавиша всё ещё зажата: следующий кадр с движением ничего не судит
+        InputHandler.handle_input(live_events(InputFrame(1000, x, y, KEY_1), KEY_1), gs, 1000)
+        self.assertEqual((gs.score, gs.combo, gs.hp), (300, 1, hp))
+
+    def test_live_matches_simulation(self):
+        write_map(self.path, [f"{64 + i % 5 * 80},{64 + i % 3 * 100},{1000 + i * 200},1,0,0:0:0:0:" for i in range(30)])
+        beatmap = OsuParser.parse_file(self.path)
+        objs = beatmap.hit_objects
+        frames = []
+        for i in range(len(objs)):
+            x, y, t = int(objs.x[i]), int(objs.y[i]), int(objs.start_time[i])
+            if i % 4 == 3:
+                continue    # Пропущенная нота
+            # Часть нажатий поздние, часть - второй клавишей поверх ещё зажатой первой
+            press = t + (i % 3) * 30
+            keys = KEY_1 | KEY_2 if i % 5 == 0 else (KEY_1 if i % 2 else KEY_2)
+            frames += [InputFrame(press, x, y, keys), InputFrame(press + 20, x + 200, y, keys),
+                       InputFrame(press + 60, x, y, 0)]
+        expected = HeadlessSimulation(beatmap).run(frames)
+        self.assertEqual(self.run_live(beatmap, frames), expected)
+        self.assertGreater(expected.hit_counts[0], 0)
+
+    def test_frame_press_judged_before_ticks(self):
+        from main import Game
+        from fixed_step import FixedStepLoop
+        from profiler import FrameProfiler
+        write_map(self.path, ["64,64,1000,1,0,0:0:0:0:", "300,300,3000,1,0,0:0:0:0:"])
+        beatmap = OsuParser.parse_file(self.path)
+        x, y = int(beatmap.hit_objects.x[0]), int(beatmap.hit_objects.y[0])
+        simulation = HeadlessSimulation(beatmap)
+        gs = simulation.game_state
+        gs.settings_menu = Settings()
+        gs.set_hit_objects(beatmap.hit_objects, [])
+        # Прошлый тик - последняя мс окна ноты; кадр пришёл уже после его закрытия
+        last_tick = 1000 + int(gs.hit_window_50) - 1
+        simulation.advance(last_tick)
+        game = Game.__new__(Game)
+        game.game_state = gs
+        game.replay = None
+        game.profiler = FrameProfiler(False)
+        game.sim_loop = FixedStepLoop(1, start_time=last_tick)
+        game.events = live_events(InputFrame(last_tick, x, y, KEY_1), 0)
+        game.play_step(last_tick + 30)
+        # Нажатие сделано, пока окно было открыто: попадание, а не промах
+        self.assertEqual(gs.hit_counts[0], 0)
+        self.assertEqual((gs.score, gs.combo), (50, 1))
+        self.assertEqual(game.sim_loop.time, last_tick + 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# tests/test_slider_curves.py
+import unittest
+import math
+import numpy as np
+import pygame
+from slider_curves import SliderPath, flatten_curve
+
+
+class TestSliderCurves(unittest.TestCase):
+    def test_linear_path_is_cut_and_extended_to_length(self):
+        path = SliderPath('L', [(0, 0), (100, 0)], 60, scale=(1, 1))
+        self.assertAlmostEqual(path.length, 60)
+        self.assertEqual(path.tail, (60, 0))
+
+        path = SliderPath('L', [(0, 0), (0, 100)], 150, scale=(1, 1))
+        self.assertEqual(path.tail, (0, 150))
+
+    def test_perfect_circle_goes_through_middle_point(self):
+        points = flatten_curve('P', [(0, 0), (50, 50), (100, 0)])
+        radii = np.hypot(points[:, 0] - 50, points[:, 1])
+        self.assertTrue(np.allclose(radii, 50))
+        self.assertGreater(points[:, 1].max(), 49.9)
+
+        path = SliderPath('P', [(0, 0), (50, 50), (100, 0)], math.pi * 50, scale=(1, 1))
+        x, y = path.position_at(0.5)
+        self.assertAlmostEqual(x, 50, delta=1)
+        self.assertAlmostEqual(y, 50, delta=1)
+
+    def test_collinear_perfect_circle_falls_back_to_bezier(self):
+        points = flatten_curve('P', [(0, 0), (50, 0), (100, 0)])
+        self.assertTrue(np.allclose(points[:, 1], 0))
+        self.assertAlmostEqual(points[-1, 0], 100)
+
+    def test_bezier_red_points_split_segments(self):
+        points = flatten_curve('B', [(0, 0), (100, 0), (100, 0), (100, 100)])
+        # Излом остаётся точкой ломаной, оба куска - прямые
+        self.assertTrue(any(np.allclose(p, (100, 0)) for p in points))
+        self.assertAlmostEqual(float(np.hypot(*np.diff(points, axis=0).T).sum()), 200)
+
+    def test_catmull_passes_through_control_points(self):
+        control = [(0, 0), (50, 80), (120, 40)]
+        points = flatten_curve('C', control)
+        for p in control:
+            self.assertTrue(np.hypot(*(points - p).T).min() < 1e-6)
+
+    def test_repeats_return_ball_to_head(self):
+        path = SliderPath('L', [(0, 0), (100, 0)], 100, slides=2, scale=(1, 1))
+        self.assertEqual(path.position_at(0.5), (100, 0))
+        self.assertEqual(path.position_at(0.75), (50, 0))
+        self.assertEqual(path.tail, (0, 0))
+
+    def test_body_is_rendered_once(self):
+        path = SliderPath('B', [(10, 10), (200, 50), (300, 200)], 250)
+        body = path.body(40, (100, 100, 100), (0, 255, 0), 3)
+        self.assertIs(path.body(40, (100, 100, 100), (0, 255, 0), 3), body)
+        surface, (left, top) = body
+        self.assertLessEqual(left, path.head[0] - 40)
+        self.assertGreater(surface.get_width(), 80)
+        path.release()
+        self.assertIsNot(path.body(40, (100, 100, 100), (0, 255, 0), 3), body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# tests/test_star_rating.py
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+from osu_parser import OsuParser
+from map_cache import map_cache
+from library import Library
+from star_rating import decayed_strain, weighted_peaks, star_rating, StarRatingJob, SECTION_MS, PEAK_WEIGHT
+
+
+def reference_strain(values, times, decay_base):
+    strains, strain, last = [], 0.0, None
+    for value, time in zip(values, times):
+        if last is not None:
+            strain *= decay_base ** ((time - last) / 1000)
+        strain += value
+        strains.append(strain)
+        last = time
+    return np.array(strains)
+
+
+def reference_peaks(strains, times, decay_base):
+    peaks = {}
+    for i, (strain, time) in enumerate(zip(strains, times)):
+        section = int(time // SECTION_MS)
+        if section not in peaks and i > 0:
+            peaks[section] = strains[i - 1] * decay_base ** ((section * SECTION_MS - times[i - 1]) / 1000)
+        peaks[section] = max(peaks.get(section, 0.0), strain)
+    ordered = sorted(peaks.values(), reverse=True)
+    return sum(peak * PEAK_WEIGHT ** i for i, peak in enumerate(ordered))
+
+
+def write_map(path, spacing, gap_ms, count=200):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("osu file format v14\n\n[Metadata]\nVersion:Test\n\n[Difficulty]\nCircleSize:4\n\n[HitObjects]\n")
+        for i in range(count):
+            x = 256 + (spacing // 2 if i % 2 else -spacing // 2)
+            f.write(f"{x},192,{1000 + i * gap_ms},1,0,0:0:0:0:\n")
+
+
+class TestStarRating(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Разобранные карты кэшируются во временной папке, а не в posu/cache
+        self.cache_dir = map_cache.cache_dir
+        map_cache.cache_dir = os.path.join(self.tmp_dir, "cache")
+
+    def tearDown(self):
+        map_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def test_strain_matches_loop(self):
+        rng = np.random.default_rng(1)
+        # Длинная карта с паузами - свёртка разбивается на несколько блоков
+        times = np.cumsum(rng.integers(0, 3000, 2000)).astype(np.float64)
+        values = rng.random(2000) * 10
+        for decay_base in (0.15, 0.3):
+            strains = decayed_strain(values, times, decay_base)
+            np.testing.assert_allclose(strains, reference_strain(values, times, decay_base), rtol=1e-9)
+            self.assertAlmostEqual(weighted_peaks(strains, times, decay_base),
+                                   reference_peaks(strains, times, decay_base), places=6)
+
+    def load(self, name, spacing, gap_ms):
+        path = os.path.join(self.tmp_dir, name)
+        write_map(path, spacing, gap_ms)
+        return OsuParser.parse_file(path)
+
+    def test_harder_patterns_rate_higher(self):
+        easy = star_rating(self.load("easy.osu", 60, 500))
+        jumps = star_rating(self.load("jumps.osu", 300, 500))
+        stream = star_rating(self.load("stream.osu", 60, 100))
+        self.assertGreater(jumps, easy)
+        self.assertGreater(stream, easy)
+        self.assertGreater(easy, 0)
+
+    def test_single_object(self):
+        path = os.path.join(self.tmp_dir, "one.osu")
+        write_map(path, 0, 100, count=1)
+        self.assertEqual(star_rating(OsuParser.parse_file(path)), 0)
+
+    def test_job_fills_library(self):
+        maps_dir = os.path.join(self.tmp_dir, "maps")
+        os.makedirs(os.path.join(maps_dir, "set"))
+        write_map(os.path.join(maps_dir, "set", "a.osu"), 100, 300)
+        write_map(os.path.join(maps_dir, "set", "b.osu"), 250, 200)
+        library = Library(os.path.join(self.tmp_dir, "library.db"), maps_dir)
+        try:
+            library.sync_folders()
+            library.start_background_scan()
+            job = StarRatingJob(library, max_workers=2).start()
+            job.wait()
+            self.assertEqual(job.done, 2)
+            self.assertEqual(library.unrated_beatmaps(), [])
+            stars = [row[2] for row in library.query_beatmaps("set")]
+            self.assertTrue(all(s > 0 for s in stars))
+        finally:
+            library.close()
+
+    def test_import_finished_during_rating_is_rated(self):
+        maps_dir = os.path.join(self.tmp_dir, "maps")
+        os.makedirs(os.path.join(maps_dir, "set"))
+        write_map(os.path.join(maps_dir, "set", "a.osu"), 100, 300)
+        library = Library(os.path.join(self.tmp_dir, "library.db"), maps_dir)
+        try:
+            library.sync_folders()
+            library.start_background_scan()
+            job = StarRatingJob(library, max_workers=1)
+            # Первый проход задерживается, пока не закончится "импорт"
+            first_pass, resume = threading.Event(), threading.Event()
+            rate_unrated = job.rate_unrated
+
+            def rate_and_wait():
+                rate_unrated()
+                if not first_pass.is_set():
+                    first_pass.set()
+                    resume.wait(10)
+            job.rate_unrated = rate_and_wait
+            job.start()
+            self.assertTrue(first_pass.wait(10))
+
+            os.makedirs(os.path.join(maps_dir, "imported"))
+            write_map(os.path.join(maps_dir, "imported", "b.osu"), 250, 200)
+            library.scan_folder("imported")
+            job.start()     # Как Game.update_import после импорта
+            resume.set()
+            job.wait()
+            self.assertFalse(job.is_running)
+            self.assertEqual(library.unrated_beatmaps(), [])
+            self.assertGreater(library.query_beatmaps("imported")[0][2], 0)
+        finally:
+            library.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+# tests/test_storyboard.py
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+import pygame
+from storyboard import (Storyboard, parse_storyboard, read_osb, ease, EASINGS,
+                        LAYER_BACKGROUND, LAYER_OVERLAY)
+
+
+class TestStoryboardParsing(unittest.TestCase):
+    def test_commands_shorthand_and_move(self):
+        sprites = parse_storyboard([
+            'Sprite,Foreground,Centre,"SB\\a.png",320,240',
+            ' F,0,100,200,0,1,0.5',
+            ' M,0,0,1000,100,200,300,400',
+            ' P,0,500,,H',
+        ])
+        self.assertEqual(len(sprites), 1)
+        segments = sprites[0].segments
+        fades = [s for s in segments if s[0] == 'opacity']
+        # Цепочка значений - два сегмента подряд той же длины
+        self.assertEqual([(s[2], s[3], s[4], s[5]) for s in fades],
+                         [(100, 200, (0.0,), (1.0,)), (200, 300, (1.0,), (0.5,))])
+        self.assertEqual([s[4:] for s in segments if s[0] == 'x'], [((100.0,), (300.0,))])
+        self.assertEqual([s[4:] for s in segments if s[0] == 'y'], [((200.0,), (400.0,))])
+        self.assertIn(('flip_h', 0, 500, 500, (0.0,), (1.0,)), segments)
+
+    def test_loop_is_expanded_and_trigger_skipped(self):
+        sprites = parse_storyboard([
+            'Sprite,Background,TopLeft,"b.png",0,0',
+            ' L,1000,3',
+            '  R,0,0,500,0,1',
+            '  F,0,500,,1',
+            ' T,HitSoundClap,0,5000',
+            '  S,0,0,100,1,2',
+            '_S,0,0,,0.5',
+        ])
+        segments = sprites[0].segments
+        rotations = [(s[2], s[3]) for s in segments if s[0] == 'rotation']
+        self.assertEqual(rotations, [(1000, 1500), (1500, 2000), (2000, 2500)])
+        # Из триггера ничего не попало, команда после него - да
+        self.assertEqual([s[2:] for s in segments if s[0] == 'scale'], [(0, 0, (0.5,), (0.5,))])
+
+    def test_osb_variables(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "map.osb")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[Variables]\n$pos=320,240\n[Events]\n'
+                        '//Storyboard Layer 0 (Background)\n'
+                        'Sprite,Background,Centre,"bg.png",$pos\n F,0,0,100,1\n')
+            lines, variables = read_osb(path)
+            sprites = parse_storyboard(lines, variables)
+            self.assertEqual((sprites[0].x, sprites[0].y), (320.0, 240.0))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_easings_keep_endpoints(self):
+        progress = np.array([0.0, 1.0] * len(EASINGS))
+        kinds = np.repeat(np.arange(len(EASINGS)), 2)
+        result = ease(progress, kinds)
+        np.testing.assert_allclose(result, progress, atol=1e-3)
+
+
+class TestStoryboard(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.folder, "SB"))
+        white = pygame.Surface((10, 10))
+        white.fill((255, 255, 255))
+        pygame.image.save(white, os.path.join(self.folder, "SB", "Red.png"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def storyboard(self, lines, approximate=False):
+        return Storyboard(parse_storyboard(lines), self.folder, approximate)
+
+    def test_channel_interpolation(self):
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\red.png",0,0',
+            ' MX,0,1000,2000,100,200',
+            ' MX,1,3000,4000,200,300',
+        ])
+        x = board.channels['x']
+        sprites = np.array([0])
+        values = [float(x.evaluate(sprites, t)[0, 0]) for t in (0, 1500, 2500, 3500, 5000)]
+        # До первой команды - её начальное значение, между командами - конец прошлой
+        self.assertEqual(values[:3], [100.0, 150.0, 200.0])
+        self.assertAlmostEqual(values[3], 200 + 100 * (1 - 0.5 ** 2))  # Easing Out
+        self.assertEqual(values[4], 300.0)
+
+    def test_sprite_lifetime_and_layers(self):
+        board = self.storyboard([
+            'Sprite,Overlay,Centre,"SB\\red.png",320,240',
+            ' F,0,1000,2000,1,1',
+            'Sprite,Background,Centre,"SB\\red.png",320,240',
+            ' F,0,0,500,1,1',
+        ])
+        # Сортировка по слоям: фон первым
+        self.assertEqual(board.layer.tolist(), [LAYER_BACKGROUND, LAYER_OVERLAY])
+        self.assertEqual(board.active(250, (LAYER_BACKGROUND,)).tolist(), [0])
+        self.assertEqual(board.active(750, (LAYER_BACKGROUND,)).tolist(), [])
+        self.assertEqual(board.active(1500, (LAYER_OVERLAY,)).tolist(), [1])
+
+    def test_draw_position_and_cached_frames(self):
+        board = self.storyboard([
+            'Sprite,Background,TopLeft,"SB\\red.png",100,100',
+            ' S,0,0,1000,2',
+            ' C,0,0,1000,255,128,0',
+        ])
+        screen = pygame.Surface((640, 480))
+        board.prepare(screen)
+        for _ in range(3):
+            screen.fill((0, 0, 0))
+            rects = board.draw(screen, 500)
+        # 640x480 - масштаб сторибоарда 1:1; S 2 - картинка 20x20
+        self.assertEqual(rects, [pygame.Rect(100, 100, 20, 20)])
+        # Цвет C умножается на белую текстуру
+        self.assertEqual(screen.get_at((110, 110))[:3], (255, 128, 0))
+        self.assertEqual(screen.get_at((125, 110))[:3], (0, 0, 0))
+        # Спрайт не менялся - рисуется из готового слоя, копия текстуры одна
+        self.assertEqual(board.composite_count, 1)
+        self.assertEqual(len(board.textures.variants), 1)
+
+    def test_large_rotation_is_cached(self):
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\red.png",320,240',
+            ' S,0,0,2000,120',
+            ' R,0,0,2000,0,12.566371',
+        ], approximate=True)
+        screen = pygame.Surface((640, 480))
+        board.prepare(screen)
+        # 1200x1200 - крупный поворот; через оборот (1000 мс) угол тот же
+        first = board.draw(screen, 250)
+        again = board.draw(screen, 1250)
+        self.assertEqual(first, again)
+        self.assertEqual(len(board.textures.rotations), 1)
+        # Соседний кадр - в пределах шага угла крупных поворотов
+        board.draw(screen, 251)
+        self.assertEqual(len(board.textures.rotations), 1)
+
+    def test_budget_reuses_last_copy(self):
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\red.png",100,100',
+            ' S,0,0,1000,1,3',
+        ])
+        screen = pygame.Surface((640, 480))
+        board.prepare(screen)
+        self.assertEqual(board.draw(screen, 100)[0].size, (12, 12))
+        # Время кадра на новые копии кончилось - спрайт рисуется прошлой
+        board.textures.budget_ns = 0
+        for _ in range(2):
+            self.assertEqual(board.draw(screen, 500)[0].size, (12, 12))
+            self.assertIn(0, board.textures.stale)
+        # Прошлая копия не запекается в неизменный слой
+        self.assertEqual(board.composite_count, 0)
+        board.textures.budget_ns = 10 ** 9
+        self.assertEqual(board.draw(screen, 500)[0].size, (20, 20))
+
+    def test_prepare_and_preload_run_ahead(self):
+        for name in ("a.png", "b.png", "c.png"):
+            shutil.copy(os.path.join(self.folder, "SB", "Red.png"), os.path.join(self.folder, "SB", name))
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\a.png",320,240', ' F,0,0,1000,1',
+            'Sprite,Background,Centre,"SB\\b.png",320,240', ' F,0,8000,9000,1',
+            'Sprite,Background,Centre,"SB\\c.png",320,240', ' F,0,16000,17000,1',
+        ])
+        screen = pygame.Surface((640, 480))
+        board.prepare(screen)
+        self.assertEqual(board.textures.loaded.tolist(), [True, False, False])
+        for t in range(0, 18000, 50):
+            board.draw(screen, t)
+        # Ни одна текстура не грузилась в кадре, где она уже нужна
+        self.assertEqual(board.late_loads, 0)
+        self.assertTrue(board.textures.loaded.all())
+
+    def test_exact_without_approximation(self):
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\red.png",320,240',
+            ' S,0,0,2000,120',
+            ' R,0,0,2000,0,12.566371',
+        ])
+        screen = pygame.Surface((640, 480))
+        board.prepare(screen)
+        board.draw(screen, 251)
+        # Без приближений крупный поворот - полный, с точным углом (720 градусов за 2000 мс)
+        self.assertEqual(len(board.textures.rotations), 0)
+        angles = [key[2] for key in board.textures.variants.surfaces]
+        self.assertTrue(any(abs(angle - 90.36) < 1e-3 for angle in angles))
+
+    def test_textures_decoded_off_the_main_thread(self):
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\red.png",320,240', ' F,0,0,1000,1',
+            'Sprite,Background,Centre,"SB\\red.png",100,100', ' S,0,0,1000,2',
+        ])
+        loads = []
+        load = pygame.image.load
+        pygame.image.load = lambda *args: loads.append(threading.current_thread()) or load(*args)
+        try:
+            screen = pygame.Surface((640, 480))
+            # Без prepare: первый кадр только отдаёт текстуру потоку, спрайты появляются позже
+            self.assertEqual(board.draw(screen, 0), [])
+            deadline = time.time() + 5
+            while not board.draw(screen, 10) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            pygame.image.load = load
+        self.assertEqual(len(board.drawn_params), 2)
+        self.assertEqual(len(loads), 1)
+        self.assertIsNot(loads[0], threading.main_thread())
+        self.assertGreater(board.late_loads, 0)
+
+    def test_oversized_sprite_scales_visible_part(self):
+        board = self.storyboard([
+            'Sprite,Background,Centre,"SB\\red.png",320,240',
+            ' S,0,0,1000,200',
+        ])
+        screen = pygame.Surface((640, 480))
+        board.prepare(screen)
+        # 2000x2000 на экране 640x480 - масштабируется только видимая часть
+        self.assertEqual(board.draw(screen, 500), [screen.get_rect()])
+        self.assertEqual(screen.get_at((0, 0))[:3], (255, 255, 255))
+        self.assertEqual(len(board.textures.variants), 0)
+
+    def test_load_from_mapset(self):
+        with open(os.path.join(self.folder, "set.osb"), 'w', encoding='utf-8') as f:
+            f.write('[Events]\nSprite,Background,Centre,"SB\\red.png",320,240\n F,0,0,100,1\n'
+                    'Sprite,Background,Centre,"unused.png",320,240\n')
+
+        class Beatmap:
+            folder = self.folder
+            events = {'storyboard': ['Sprite,Foreground,Centre,"SB\\red.png",0,0', ' F,0,0,100,1']}
+
+        board = Storyboard.load(Beatmap)
+        # Спрайт без команд не показывается и не загружается
+        self.assertEqual(len(board), 2)
+        self.assertTrue(board.uses_file("sb/RED.png"))
+        self.assertFalse(board.uses_file("unused.png"))
+
+
+if __name__ == '__main__':
+    unittest.main()
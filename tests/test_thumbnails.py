@@ -0,0 +1,79 @@
+# tests/test_thumbnails.py
+import unittest
+import os
+import time
+import shutil
+import tempfile
+import pygame
+from thumbnails import ThumbnailLoader
+
+
+class TestThumbnails(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for i in range(3):
+            image = pygame.Surface((800, 400))
+            image.fill((i * 80, 0, 0))
+            pygame.image.save(image, os.path.join(self.tmp_dir, f"bg{i}.png"))
+        self.cache_dir = os.path.join(self.tmp_dir, "thumbs")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_loader(self, budget_bytes):
+        return ThumbnailLoader(
+            (40, 20), lambda name: os.path.join(self.tmp_dir, name) if name != "none" else None,
+            workers=2, budget_bytes=budget_bytes, cache_dir=self.cache_dir
+        )
+
+    def load(self, loader, keys):
+        for priority, key in enumerate(keys):
+            loader.request(key, priority, key)
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            loader.begin_frame()
+            if all(loader.get(key) is not None or key in loader.failed for key in keys):
+                return
+            time.sleep(0.01)
+        self.fail("превью не загрузились")
+
+    def test_thumbnails_are_scaled_and_cached_on_disk(self):
+        loader = self.make_loader(10 ** 6)
+        self.load(loader, ["bg0.png", "bg1.png", "none"])
+        self.assertEqual(loader.get("bg0.png").get_size(), (40, 20))
+        self.assertIn("none", loader.failed)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        loader = self.make_loader(10 ** 6)
+        self.load(loader, ["bg0.png", "bg1.png", "bg2.png"])
+        one = loader.cache_bytes // 3
+
+        loader.get("bg0.png")  # bg1 становится самым старым
+        loader.budget_bytes = 2 * one
+        loader.begin_frame()
+        self.assertIsNone(loader.get("bg1.png"))
+        self.assertIsNotNone(loader.get("bg0.png"))
+        self.assertEqual(loader.cache_bytes, 2 * one)
+
+    def test_disk_cache_evicts_oldest(self):
+        loader = self.make_loader(10 ** 6)
+        self.load(loader, ["bg0.png", "bg1.png"])
+        thumbs = {name: loader._thumb_path(os.path.join(self.tmp_dir, name)) for name in ("bg0.png", "bg1.png")}
+        # bg1 открывали давно, bg0 - недавно
+        os.utime(thumbs["bg1.png"], (1000, 1000))
+        os.utime(thumbs["bg0.png"], (2000, 2000))
+        # Места хватает на bg0 и новое превью, но не на все три
+        kept = os.path.getsize(thumbs["bg0.png"]) + os.path.getsize(thumbs["bg1.png"]) * 3 // 2
+
+        loader = self.make_loader(10 ** 6)
+        loader.max_disk_bytes = kept
+        self.load(loader, ["bg2.png"])
+        self.assertFalse(os.path.exists(thumbs["bg1.png"]))
+        self.assertTrue(os.path.exists(thumbs["bg0.png"]))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertLessEqual(loader.disk_bytes, kept)
+
+
+if __name__ == '__main__':
+    unittest.main()
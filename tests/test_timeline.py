@@ -0,0 +1,120 @@
+# tests/test_timeline.py
+import unittest
+import random
+import pygame
+from game_state import GameState
+from hit_objects import HitObjectTable, TYPE_CIRCLE, FLAG_HIT, FLAG_MISSED
+from timeline import Timeline
+
+
+class ReferenceState:
+    """Старая реализация GameState.update на списке словарей - эталон для сравнения"""
+
+    def __init__(self, hit_objects, approach_time, hit_window_50, hp_drain_rate):
+        self.hit_objects = hit_objects
+        self.active_objects = []
+        self.approach_time = approach_time
+        self.hit_window_50 = hit_window_50
+        self.hp_drain_rate = hp_drain_rate
+        self.hp = 100
+        self.combo = 0
+        self.last_time = None
+
+    def update(self, current_time):
+        # Дренаж по времени (раньше было 0.01 за кадр, столько же при 120 FPS)
+        if self.last_time is not None:
+            self.hp = max(0, self.hp - self.hp_drain_rate * 0.0012 * (current_time - self.last_time))
+        self.last_time = current_time
+
+        for obj in self.active_objects:
+            if obj['type'] == 'circle' and not obj.get('hit') and not obj.get('missed'):
+                if current_time > obj['start_time'] + self.hit_window_50:
+                    self.combo = 0
+                    self.hp = max(0, self.hp - 5)
+                    obj['missed'] = True
+
+        new_objects = [
+            obj for obj in self.hit_objects
+            if (obj['start_time'] - self.approach_time) <= current_time
+            and obj not in self.active_objects
+        ]
+        self.active_objects.extend(new_objects)
+
+        self.active_objects = [
+            obj for obj in self.active_objects
+            if current_time <= obj['start_time'] + self.hit_window_50
+        ]
+
+
+class TestTimeline(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.font.init()
+
+    def make_map(self, count, seed):
+        rng = random.Random(seed)
+        start_times = sorted(rng.randrange(500, count * 120) for _ in range(count))
+        xs = [rng.randrange(0, 1920) for _ in range(count)]
+        ys = [rng.randrange(0, 1080) for _ in range(count)]
+        return xs, ys, start_times
+
+    def test_cursors_only_move_forward(self):
+        timeline = Timeline([100, 200, 300], spawn_lead=50, expire_lag=20)
+        spawned, expired = timeline.advance(160)
+        self.assertEqual(spawned, slice(0, 2))
+        self.assertEqual(expired, slice(0, 1))
+        self.assertEqual(timeline.active, slice(1, 2))
+
+        spawned, expired = timeline.advance(0)
+        self.assertEqual(spawned, slice(2, 2))
+        self.assertEqual(expired, slice(1, 1))
+        self.assertEqual(timeline.active, slice(1, 2))
+
+    def test_matches_reference_update(self):
+        for seed in range(5):
+            xs, ys, start_times = self.make_map(300, seed)
+            rng = random.Random(seed)
+
+            gs = GameState(None, None)
+            gs.ar = 9.0
+            gs.overall_difficulty = 8.0
+            gs.update_metrics()
+            table = HitObjectTable(xs, ys, start_times, [t + 100 for t in start_times],
+                                   [TYPE_CIRCLE] * len(xs))
+            gs.set_hit_objects(table.sort_by_time())
+
+            reference = ReferenceState(
+                [{'type': 'circle', 'x': x, 'y': y, 'start_time': t, 'end_time': t + 100}
+                 for x, y, t in zip(xs, ys, start_times)],
+                gs.approach_time, gs.hit_window_50, gs.hp_drain_rate
+            )
+
+            current_time = 0
+            while current_time < start_times[-1] + 1000:
+                # Неровный шаг кадра, иногда с большими пропусками
+                current_time += rng.choice([4, 8, 8, 16, 33, 250])
+                gs.update(current_time)
+                reference.update(current_time)
+
+                active = gs.active_objects
+                self.assertEqual(
+                    [int(t) for t in gs.hit_objects.start_time[active]],
+                    [obj['start_time'] for obj in reference.active_objects]
+                )
+                self.assertEqual(gs.combo, reference.combo)
+                self.assertAlmostEqual(gs.hp, reference.hp)
+
+                # Случайно "попадаем" по части активных нот в обеих реализациях
+                for k, obj in enumerate(reference.active_objects):
+                    if not obj.get('hit') and not obj.get('missed') and rng.random() < 0.1:
+                        obj['hit'] = True
+                        gs.hit_objects.flags[active.start + k] |= FLAG_HIT
+
+            self.assertEqual(
+                [bool(f & FLAG_MISSED) for f in gs.hit_objects.flags],
+                [bool(obj.get('missed')) for obj in reference.hit_objects]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
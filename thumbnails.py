@@ -0,0 +1,167 @@
+import os
+import heapq
+import hashlib
+import threading
+from collections import OrderedDict, deque
+import pygame
+from env import THUMBS_DIR, PREVIEW_CACHE_BYTES
+
+
+# Запрос, который не повторяли столько кадров, считается устаревшим (карта ушла с экрана)
+STALE_FRAMES = 30
+THUMBS_MAX_BYTES = 32 * 1024 * 1024  # Превью на диске; сверх - удаляются давно не открытые
+
+
+class ThumbnailLoader:
+    """Загрузка превью карт фиксированным пулом потоков.
+
+    Превью уменьшаются один раз и сохраняются на диск в THUMBS_DIR, в памяти
+    держатся в LRU с ограничением по байтам. Меньший priority грузится раньше.
+    Дисковый кэш ограничен max_disk_bytes: как в MapCache, mtime файла
+    обновляется при чтении, и вытесняются самые старые.
+    """
+
+    def __init__(self, size, find_image, workers=2, budget_bytes=PREVIEW_CACHE_BYTES,
+                 cache_dir=THUMBS_DIR, max_disk_bytes=THUMBS_MAX_BYTES):
+        self.size = size
+        self.find_image = find_image  # find_image(*args) -> путь к картинке или None
+        self.budget_bytes = budget_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_bytes = None      # Размер превью на диске, считается при первой записи
+        self.disk_lock = threading.Lock()
+
+        self.cache = OrderedDict()  # key -> Surface, от старых к новым
+        self.cache_bytes = 0
+        self.failed = set()
+        self.loading = set()
+        self.pending = {}           # key -> (priority, frame, args)
+        self.heap = []
+        self.ready = deque()        # (key, surface) от рабочих потоков
+        self.frame = 0
+        self.condition = threading.Condition()
+
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def get(self, key):
+        surface = self.cache.get(key)
+        if surface is not None:
+            self.cache.move_to_end(key)
+        return surface
+
+    def request(self, key, priority, *args):
+        """Просим загрузить превью; повторный запрос обновляет приоритет"""
+        if key in self.cache or key in self.failed:
+            return
+        with self.condition:
+            if key in self.loading:
+                return
+            old = self.pending.get(key)
+            if old and old[0] <= priority:
+                self.pending[key] = (old[0], self.frame, args)
+                return
+            self.pending[key] = (priority, self.frame, args)
+            heapq.heappush(self.heap, (priority, key))
+            self.condition.notify()
+
+    def begin_frame(self):
+        """Вызывается раз в кадр: забираем готовые превью в LRU"""
+        self.frame += 1
+        while self.ready:
+            key, surface = self.ready.popleft()
+            with self.condition:
+                self.loading.discard(key)
+            if surface is None:
+                self.failed.add(key)
+                continue
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            self.cache[key] = surface
+            self.cache_bytes += self._surface_bytes(surface)
+        while self.cache_bytes > self.budget_bytes and len(self.cache) > 1:
+            _, surface = self.cache.popitem(last=False)
+            self.cache_bytes -= self._surface_bytes(surface)
+
+    @staticmethod
+    def _surface_bytes(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while True:
+                    while not self.heap:
+                        self.condition.wait()
+                    priority, key = heapq.heappop(self.heap)
+                    entry = self.pending.get(key)
+                    # Запись в куче могла устареть: приоритет обновили или карта ушла с экрана
+                    if entry is None or entry[0] != priority:
+                        continue
+                    del self.pending[key]
+                    if self.frame - entry[1] > STALE_FRAMES:
+                        continue
+                    args = entry[2]
+                    self.loading.add(key)
+                    break
+            self.ready.append((key, self._load(args)))
+
+    def _thumb_path(self, source):
+        stat = os.stat(source)
+        name = f"{os.path.abspath(source)}|{stat.st_mtime_ns}|{stat.st_size}|{self.size[0]}x{self.size[1]}"
+        return os.path.join(self.cache_dir, hashlib.sha1(name.encode('utf-8')).hexdigest() + '.jpg')
+
+    def _load(self, args):
+        try:
+            source = self.find_image(*args)
+            if not source:
+                return None
+            thumb_path = self._thumb_path(source)
+            if os.path.isfile(thumb_path):
+                image = pygame.image.load(thumb_path)
+                os.utime(thumb_path)  # Отметка для LRU
+                return image
+
+            image = pygame.image.load(source)
+            try:
+                image = pygame.transform.smoothscale(image, self.size)
+            except ValueError:
+                # smoothscale умеет только 24/32 бита
+                image = pygame.transform.scale(image, self.size)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(image, thumb_path)
+            self._stored(thumb_path)
+            return image
+        except (pygame.error, OSError) as e:
+            print(f"Ошибка загрузки превью: {str(e)}")
+            return None
+
+    def _stored(self, thumb_path):
+        """Учитывает новое превью на диске и вытесняет старые сверх max_disk_bytes"""
+        with self.disk_lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir)
+                                      if entry.name.endswith('.jpg'))
+            else:
+                self.disk_bytes += os.path.getsize(thumb_path)
+            if self.disk_bytes > self.max_disk_bytes:
+                self.evict()
+
+    def evict(self):
+        """Удаляет давно не открытые превью, пока кэш больше max_disk_bytes"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.disk_bytes = total
@@ -0,0 +1,37 @@
+class Timeline:
+    """Курсоры появления и исчезновения по отсортированным по времени объектам.
+
+    Оба курсора двигаются только вперёд, поэтому стоимость кадра зависит
+    только от числа объектов, которые появились или исчезли в этом кадре.
+    """
+
+    def __init__(self, start_times, spawn_lead, expire_lag):
+        self.start_times = [int(t) for t in start_times]
+        self.spawn_lead = spawn_lead    # Объект появляется за spawn_lead мс до start_time
+        self.expire_lag = expire_lag    # и исчезает через expire_lag мс после
+        self.spawn_cursor = 0   # Объекты [0, spawn_cursor) уже появились
+        self.expire_cursor = 0  # Объекты [0, expire_cursor) уже исчезли
+
+    @property
+    def active(self):
+        """Срез объектов, которые сейчас на экране"""
+        return slice(self.expire_cursor, self.spawn_cursor)
+
+    def advance(self, current_time):
+        """Сдвигает курсоры до current_time.
+
+        Возвращает пару срезов (spawned, expired) - объекты, которые появились
+        и исчезли за этот шаг.
+        """
+        start_times = self.start_times
+        count = len(start_times)
+
+        old_spawn = self.spawn_cursor
+        while self.spawn_cursor < count and start_times[self.spawn_cursor] - self.spawn_lead <= current_time:
+            self.spawn_cursor += 1
+
+        old_expire = self.expire_cursor
+        while self.expire_cursor < self.spawn_cursor and current_time > start_times[self.expire_cursor] + self.expire_lag:
+            self.expire_cursor += 1
+
+        return slice(old_spawn, self.spawn_cursor), slice(old_expire, self.expire_cursor)